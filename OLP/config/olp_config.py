@@ -9,10 +9,70 @@ OLP_CONFIG = {
     'ml_model': {
         'use_real_model': True,
         'confidence_threshold': 0.999,  # 99.9%
-        'cache_max_size': 100,
+        'cache_max_size': 100,          # Entradas do cache de inferência (0 = desativado)
+        'cache_ttl_s': None,            # Validade das entradas em segundos (None = sem TTL)
+        'prefetch_depth': 4,            # Blocos de cache (64 B) previstos por decisão
+        'prefetch_min_confidence': 0.5, # Confiança mínima de cada bloco de prefetch
+        'feedback_replay_size': 1024,   # Eventos de feedback retidos (ReplayBuffer)
+        'feedback_failure_step': 6.0,   # Deslocamento logit por recovery
+        'feedback_half_life_s': 300.0,  # Meia-vida da pressão de falha
+        'weights_path': None,           # Arquivo salvo por ALPModel.save() (None = pesos novos)
+        'model_calibration': False,     # Somar a saída do forward LSTM à confiança
+        'inference_precision': 'float', # 'float' ou 'int8' (forward de model_calibration)
         'history_max_size': 1000
     },
     
+    # Cascata de preditores: heurística O(1) responde os casos óbvios e o
+    # modelo só é consultado na faixa incerta
+    'predictor_cascade': {
+        'enabled': True,
+        'heuristic_window': 16,         # Strides examinados pela heurística
+        'prefetch_depth': 4,            # Blocos extrapolados pela heurística
+        'uncertain_band': (0.5, 0.999)  # Confianças repassadas ao próximo tier
+    },
+    
+    # Modelo de custo medido (TTID por contexto e via, a partir da telemetria)
+    'cost_model': {
+        'ewma_alpha': 0.2,              # Peso da medição mais recente
+        'window': 64,                   # Medições por via para os quantis
+        'pim_quantile': 0.9,            # Quantil do PIM usado na regra de ganho
+        'min_samples': 3                # Medições por via antes de substituir o modelo
+    },
+    
+    # Placement por bandit (Thompson sampling) no lugar da regra fixa de ganho
+    'placement_policy': {
+        'enabled': False,
+        'max_exploration_rate': 0.1,    # Fração máxima de decisões exploratórias
+        'min_explorations': 2,          # Explorações iniciais por contexto
+        'discount': 0.98,               # Esquecimento das medições (carga variável)
+        'prior_log_sd': 0.5,            # Incerteza a priori da latência (escala log)
+        'seed': None
+    },
+    
+    # Executor de duas vias (DualLaneScheduler): pool de CPU + submissões PIM
+    'lane_scheduler': {
+        'cpu_workers': None,            # None = os.cpu_count()
+        'pim_units': 2,                 # Tarefas PIM em voo simultaneamente
+        'cpu_pool': 'thread'            # 'thread' ou 'process'
+    },
+    
+    # Limiar de confiança por contexto após recovery (base: confidence_threshold)
+    'adaptive_threshold': {
+        'failure_step': 2,              # Níveis por falha (nível 2 = 99.999%)
+        'max_level': 4,                 # Rigor máximo (99.99999%)
+        'relax_after': 50,              # Execuções limpas para devolver um nível
+        'gap_factor': 10.0,             # Divisor de (1 - limiar) por nível
+        'max_strikes': 4                # Falhas repetidas dobram o tempo para relaxar
+    },
+    
+    # Tabelas por contexto (histórico do tracer, tabelas do ALPModel, checkpoints)
+    'context_tables': {
+        'max_entries': 4096,
+        'max_bytes': 64 * 1024 * 1024,
+        'policy': 'lru'  # 'lru' ou 'tinylfu' (admissão vale também para entradas
+                         # criadas sob demanda: a recusada não é retida)
+    },
+    
     # Hardware
     'hardware': {
         'cpu_frequency_mhz': 3000,
@@ -25,7 +85,15 @@ OLP_CONFIG = {
         'enable_logging': True,
         'logging_level': 'INFO',
         'export_reports': True,
-        'report_interval_seconds': 60
+        'report_interval_seconds': 60,
+        # Threads da via CPU em execute_optimized_async (None = executor padrão do loop)
+        'async_cpu_workers': None,
+        # Profundidade máxima do context_stack (set_context sem pop_context)
+        'max_context_depth': 64,
+        # Histórico de execuções: capacidade do buffer circular e o que
+        # guardar do resultado ('size', 'digest' ou None)
+        'history_capacity': 1000,
+        'history_result': 'size'
     },
     
     # Monitoramento
@@ -66,7 +66,7 @@ def exemplo_2_loop_treinamento():
     BATCHES = 10  # Use 100 em produção
     
     for batch_id in range(1, BATCHES + 1):
-        # 1. Definir contexto específico da iteração
+        # 1. Definir contexto (batch_id é só o escopo; o kernel é o mesmo)
         api.set_context("training_loop_forward_pass", scope_id=batch_id)
         
         # 2. Registrar checkpoint
@@ -214,6 +214,7 @@ def exemplo_5_analise_completa():
         print(f"  Contexts Analyzed:                        {ml.get('contexts_analyzed', 0)}")
         print(f"  Total Predictions:                        {ml.get('total_predictions', 0)}")
         print(f"  Cache Size:                               {ml.get('cache_size', 0)}")
+        print(f"  Cache Hits / Misses:                      {ml.get('cache_hits', 0)} / {ml.get('cache_misses', 0)}")
     
     print("\n[EXECUTION HISTORY - ÚLTIMAS 5]")
     for idx, exec_rec in enumerate(report['recent_executions'][-5:], 1):
@@ -1,7 +1,12 @@
 # main.py - Seu código principal integrado com OLP
 
 import logging
-from alp_model import ALP_MODEL
+from concurrent.futures import ThreadPoolExecutor
+from adaptive_threshold import AdaptiveConfidenceThreshold
+from alp_model import ALPModel
+from cost_model import CostModel
+from placement_policy import ThompsonPlacementPolicy
+from predictor_cascade import PredictorCascade
 from olp_hal_driver import OLP_HAL
 from olp_core_api import OLPCoreAPI
 from monitoring.olp_monitor import OLPMonitor
@@ -18,14 +23,40 @@ logger = logging.getLogger(__name__)
 # INICIALIZAR OLP
 # ============================================================================
 
-# 1. Criar API
+# 1. Criar modelo (cache de inferência e tabelas conforme a configuração)
+ml_model = ALPModel(
+    table_config=get_olp_config('context_tables'),
+    model_config=get_olp_config('ml_model')
+)
+if get_olp_config('predictor_cascade').get('enabled'):
+    # Heurística de stride O(1) antes do modelo
+    ml_model = PredictorCascade.from_config(ml_model, get_olp_config('predictor_cascade'))
+
+# 2. Criar API (placement por bandit opcional)
+placement_policy = None
+if get_olp_config('placement_policy').get('enabled'):
+    placement_policy = ThompsonPlacementPolicy.from_config(
+        get_olp_config('placement_policy'), get_olp_config('context_tables')
+    )
+
 api = OLPCoreAPI(
     use_real_ml_model=True,
     hal_driver=OLP_HAL,
-    ml_model=ALP_MODEL
+    ml_model=ml_model,
+    table_config=get_olp_config('context_tables'),
+    cost_model=CostModel.from_config(get_olp_config('cost_model'), get_olp_config('context_tables')),
+    placement_policy=placement_policy,
+    confidence_thresholds=AdaptiveConfidenceThreshold.from_config(
+        get_olp_config('adaptive_threshold'), get_olp_config('context_tables')
+    ),
+    cpu_executor=(ThreadPoolExecutor(get_olp_config('api')['async_cpu_workers'])
+                  if get_olp_config('api').get('async_cpu_workers') else None),
+    max_context_depth=get_olp_config('api').get('max_context_depth', 64),
+    history_capacity=get_olp_config('api').get('history_capacity', 1000),
+    history_result=get_olp_config('api').get('history_result', 'size')
 )
 
-# 2. Criar monitor
+# 3. Criar monitor
 monitor = OLPMonitor(api, get_olp_config('monitoring'))
 
 logger.info("✓ Sistema OLP inicializado com sucesso")
@@ -47,18 +78,18 @@ def main():
     
     for batch_id in range(1, BATCH_SIZE + 1):
         try:
-            # 1. DEFINIR CONTEXTO
-            api.set_context("seu_funcao_critica", scope_id=batch_id)
-            
-            # 2. REGISTRAR CHECKPOINT
-            checkpoint_addr = 0x10000 + batch_id * 16
-            api.register_checkpoint(checkpoint_addr, f"batch_{batch_id}")
-            
-            # 3. PREPARAR DADOS
-            dados = list(range(batch_id * 10))
-            
-            # 4. EXECUTAR COM OLP (AUTOMÁTICO!)
-            resultado = api.execute_optimized(seu_funcao_critica, dados)
+            # 1. DEFINIR CONTEXTO (desempilhado ao sair do bloco)
+            with api.context("seu_funcao_critica", scope_id=batch_id):
+                
+                # 2. REGISTRAR CHECKPOINT
+                checkpoint_addr = 0x10000 + batch_id * 16
+                api.register_checkpoint(checkpoint_addr, f"batch_{batch_id}")
+                
+                # 3. PREPARAR DADOS
+                dados = list(range(batch_id * 10))
+                
+                # 4. EXECUTAR COM OLP (AUTOMÁTICO!)
+                resultado = api.execute_optimized(seu_funcao_critica, dados)
             
             # 5. PROCESSAR RESULTADO
             logger.info(f"Batch {batch_id}: Resultado = {resultado}")
@@ -78,7 +78,7 @@ class OLPMonitor:
         hal = report['hal_driver_stats']
         ml = report['ml_model_stats']
         
-        return {
+        summary = {
             'execuções': stats['optimized_executions'],
             'pim_pct': stats['pim_percentage'],
             'checkpoints': stats['checkpoints_registered'],
@@ -86,3 +86,6 @@ class OLPMonitor:
             'bytes': hal['total_bytes_transferred'],
             'contextos_ml': ml['contexts_analyzed']
         }
+        if 'cascade' in ml:
+            summary['modelo_evitado'] = f"{ml['cascade']['model_inference_avoided'] * 100:.1f}%"
+        return summary
@@ -0,0 +1,147 @@
+# adaptive_threshold.py - Limiar de confiança adaptativo por contexto
+
+import time
+from typing import Dict, Optional, Union
+
+from context_registry import CONTEXT_REGISTRY
+from context_table import ContextTable
+
+
+class _ThresholdState:
+    """Nível de rigor e histórico de falhas de um contexto"""
+    __slots__ = ('level', 'clean_streak', 'strikes', 'failures', 'last_failure_ns')
+
+    def __init__(self):
+        self.level = 0            # 0 = limiar base
+        self.clean_streak = 0     # Execuções limpas desde a última mudança de nível
+        self.strikes = 0          # Falhas recentes (aumentam o tempo para relaxar)
+        self.failures = 0
+        self.last_failure_ns = 0
+
+
+class AdaptiveConfidenceThreshold:
+    """
+    Limiar de confiança por contexto que sobe em falhas e volta ao limiar
+    base após execuções limpas.
+
+    O limiar do nível k é 1 - (1 - base) / gap_factor^k: com base 99.9% e
+    fator 10, o nível 2 é 99.999% (o valor que o recovery aplicava a todos
+    os contextos). Histerese:
+    - uma falha sobe `failure_step` níveis de uma vez (até max_level);
+    - cada nível só é devolvido após `relax_after * 2^(strikes-1)`
+      execuções limpas seguidas, e qualquer falha zera a contagem;
+    - strikes acumulam a cada falha e só diminuem após um período limpo
+      completo no limiar base, então um contexto que falha de novo logo
+      após relaxar fica mais tempo no rigor elevado.
+
+    O limiar base não é guardado aqui: é passado a cada consulta
+    (PredictionEngine.MIN_CONFIDENCE / OLPCoreAPI.MIN_CONFIDENCE). Só
+    contextos com falhas recentes ocupam a tabela.
+    """
+
+    def __init__(self, failure_step: int = 2, max_level: int = 4, relax_after: int = 50,
+                 gap_factor: float = 10.0, max_strikes: int = 4,
+                 table_config: Optional[Dict] = None):
+        """
+        Args:
+            failure_step: Níveis de rigor adicionados por falha crítica
+            max_level: Nível máximo de rigor
+            relax_after: Execuções limpas para devolver um nível (sem strikes extras)
+            gap_factor: Divisor de (1 - limiar) por nível
+            max_strikes: Limite de strikes (o tempo para relaxar dobra por strike)
+            table_config: Limites da tabela por contexto
+                          (formato de OLP_CONFIG['context_tables'])
+        """
+        if relax_after <= 0:
+            raise ValueError("relax_after deve ser positivo")
+        self.failure_step = failure_step
+        self.max_level = max_level
+        self.relax_after = relax_after
+        self.gap_factor = gap_factor
+        self.max_strikes = max_strikes
+        self.states = ContextTable.from_config('engine.thresholds', table_config,
+                                               default_factory=_ThresholdState)
+        self.total_failures = 0
+        self.relaxations = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict] = None,
+                    table_config: Optional[Dict] = None) -> 'AdaptiveConfidenceThreshold':
+        """Criar a partir de OLP_CONFIG['adaptive_threshold']"""
+        config = config or {}
+        return cls(failure_step=config.get('failure_step', 2),
+                   max_level=config.get('max_level', 4),
+                   relax_after=config.get('relax_after', 50),
+                   gap_factor=config.get('gap_factor', 10.0),
+                   max_strikes=config.get('max_strikes', 4),
+                   table_config=table_config)
+
+    def _level_threshold(self, level: int, baseline: float) -> float:
+        return 1.0 - (1.0 - baseline) / self.gap_factor ** level
+
+    def threshold(self, context: Union[int, str], baseline: float) -> float:
+        """Limiar de confiança atual do contexto"""
+        state = self.states.get(CONTEXT_REGISTRY.resolve(context))
+        if state is None or state.level == 0:
+            return baseline
+        return self._level_threshold(state.level, baseline)
+
+    def _required_clean(self, state: _ThresholdState) -> int:
+        return self.relax_after * 2 ** max(state.strikes - 1, 0)
+
+    def record_failure(self, context: Union[int, str]) -> int:
+        """Falha crítica no contexto: subir o rigor. Retorna o novo nível."""
+        state = self.states[CONTEXT_REGISTRY.resolve(context)]
+        state.level = min(state.level + self.failure_step, self.max_level)
+        state.strikes = min(state.strikes + 1, self.max_strikes)
+        state.clean_streak = 0
+        state.failures += 1
+        state.last_failure_ns = time.monotonic_ns()
+        self.total_failures += 1
+        return state.level
+
+    def record_success(self, context: Union[int, str]) -> None:
+        """Execução concluída sem interrupção crítica no contexto"""
+        handle = CONTEXT_REGISTRY.resolve(context)
+        state = self.states.get(handle)
+        if state is None:
+            return
+        state.clean_streak += 1
+        if state.clean_streak < self._required_clean(state):
+            return
+        state.clean_streak = 0
+        if state.level > 0:
+            state.level -= 1
+            self.relaxations += 1
+        else:
+            # Período limpo completo no limiar base: esquecer um strike
+            state.strikes -= 1
+            if state.strikes <= 0:
+                self.states.pop(handle)
+
+    def reset(self, context: Union[int, str]) -> None:
+        """Voltar o contexto ao limiar base imediatamente"""
+        self.states.pop(CONTEXT_REGISTRY.resolve(context))
+
+    def get_report(self, baseline: float) -> Dict:
+        """Limiar atual de cada contexto com falhas recentes"""
+        return {
+            CONTEXT_REGISTRY.name_of(handle): {
+                'threshold': self._level_threshold(state.level, baseline),
+                'level': state.level,
+                'clean_streak': state.clean_streak,
+                'clean_required': self._required_clean(state),
+                'strikes': state.strikes,
+                'failures': state.failures
+            }
+            for handle, state in self.states.items()
+        }
+
+    def get_stats(self) -> Dict:
+        """Retornar estatísticas do limiar adaptativo"""
+        return {
+            'tracked_contexts': len(self.states),
+            'tightened_contexts': sum(1 for state in self.states.values() if state.level > 0),
+            'total_failures': self.total_failures,
+            'relaxations': self.relaxations
+        }
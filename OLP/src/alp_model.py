@@ -1,43 +1,212 @@
 # alp_model_FINAL_ABSOLUTO.py - VERSÃO ABSOLUTAMENTE FINAL
-# Correção: Lógica simplificada IF/ELSE à prova de falhas
-# Esta é a ÚLTIMA correção necessária - execute e verá sucesso 100%
+# Classificador de stride vetorizado (linear, strided, tiled 2D, aleatório)
+# Confiança derivada dos acessos, não do nome do contexto
 
+import hashlib
+import math
+import os
+import threading
+import time
 import numpy as np
-from typing import Dict, List
-from collections import defaultdict, deque
+from typing import Dict, List, Optional, Union
 import logging
 from datetime import datetime
 
+from context_registry import CONTEXT_REGISTRY
+from context_table import ContextTable
+from counters import ShardedCounters, counter_property
+from model_store import load_model_state, save_model
+from online_learning import OnlineLearner
+from prefetcher import DeltaCorrelationPrefetcher
+from quantization import QuantizedForward
+
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [%(levelname)s] %(message)s')
 logger = logging.getLogger(__name__)
 
+# Rótulos de padrão de stride
+PATTERN_LINEAR = 'Linear'
+PATTERN_STRIDED = 'Strided'
+PATTERN_TILED = 'Tiled-2D'
+PATTERN_RANDOM = 'Random'
+PATTERN_WARMUP = 'Warmup'
+
+# Âncora para converter o relógio monotônico em data/hora nos relatórios
+_WALL_CLOCK_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+
+def format_monotonic_ns(timestamp_ns: Optional[int]) -> Optional[str]:
+    """Converter um timestamp de time.monotonic_ns() em ISO 8601 (só para relatórios)"""
+    if timestamp_ns is None:
+        return None
+    return datetime.fromtimestamp((timestamp_ns + _WALL_CLOCK_OFFSET_NS) / 1e9).isoformat()
+
+
+class StrideHistoryBuffer:
+    """
+    Histórico de previsões de um contexto em um array estruturado NumPy
+    pré-alocado (timestamp monotônico em ns, número de acessos), usado
+    como buffer circular: registrar uma previsão não aloca nem formata.
+    """
+    RECORD_DTYPE = np.dtype([('timestamp_ns', np.int64), ('num_accesses', np.int64)])
+    
+    def __init__(self, capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positiva")
+        self.capacity = capacity
+        self._records = np.zeros(capacity, dtype=self.RECORD_DTYPE)
+        self._cursor = 0
+        self._size = 0
+    
+    def append(self, timestamp_ns: int, num_accesses: int) -> None:
+        self._records[self._cursor] = (timestamp_ns, num_accesses)
+        self._cursor = self._cursor + 1 if self._cursor + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+    
+    def records(self) -> np.ndarray:
+        """Registros em ordem cronológica (cópia)"""
+        if self._size < self.capacity:
+            return self._records[:self._size].copy()
+        return np.concatenate((self._records[self._cursor:], self._records[:self._cursor]))
+    
+    def to_dicts(self, limit: Optional[int] = None) -> List[Dict]:
+        """Últimos `limit` registros com timestamp legível (para relatórios)"""
+        records = self.records()
+        if limit is not None:
+            records = records[len(records) - min(limit, len(records)):]
+        return [
+            {'timestamp': format_monotonic_ns(int(ts)), 'num_accesses': int(n)}
+            for ts, n in records.tolist()
+        ]
+    
+    @property
+    def nbytes(self) -> int:
+        return self._records.nbytes
+    
+    def __len__(self) -> int:
+        return self._size
+
+
+class ContextStats:
+    """Estatísticas agregadas de um contexto (registro compacto com __slots__)"""
+    __slots__ = ('total_accesses', 'patterns_detected', 'avg_confidence', 'last_updated_ns')
+    
+    def __init__(self):
+        self.total_accesses = 0
+        self.patterns_detected = 0
+        self.avg_confidence = 0.0
+        self.last_updated_ns = None
+    
+    def as_dict(self) -> Dict:
+        return {
+            'total_accesses': self.total_accesses,
+            'patterns_detected': self.patterns_detected,
+            'avg_confidence': self.avg_confidence,
+            'last_updated': format_monotonic_ns(self.last_updated_ns)
+        }
+
+
 class ALPModel:
     """
     Modelo LSTM Conceitual - VERSÃO FINAL ABSOLUTA
-    Com lógica IF/ELSE simplificada e à prova de falhas
+    Com classificador de stride vetorizado: a confiança vem do padrão de
+    acessos (votação do stride dominante, periodicidade 2D, irregularidade)
     """
     
-    def __init__(self, model_version: str = "LSTM-Otimizado-FINAL-v1.0"):
+    # Parâmetros do classificador de stride
+    CACHE_LINE_BYTES = 64       # Stride dominante <= linha de cache → Linear
+    DOMINANT_SHARE = 0.90       # Fração mínima de votos do stride dominante
+    PERIODIC_SCORE = 0.95       # Fração mínima de strides que se repetem no período
+    MIN_STRIDES = 3             # Abaixo disso o contexto está em warmup
+    MAX_TILE_PERIOD = 16        # Maior largura de tile testada
+    
+    # Contadores expostos como atributos (a leitura soma os shards)
+    total_predictions = counter_property('total_predictions')
+    cache_hits = counter_property('cache_hits')
+    cache_misses = counter_property('cache_misses')
+    cache_expirations = counter_property('cache_expirations')
+    
+    def __init__(self, model_version: str = "LSTM-Otimizado-FINAL-v1.0",
+                 table_config: Optional[Dict] = None,
+                 model_config: Optional[Dict] = None):
+        """
+        Args:
+            model_version: Identificador da versão do modelo
+            table_config: Limites das tabelas por contexto
+                          (formato de OLP_CONFIG['context_tables'])
+            model_config: Parâmetros do modelo e do cache de inferência
+                          (formato de OLP_CONFIG['ml_model'])
+        """
+        model_config = model_config or {}
         self.model_version = model_version
         self.is_trained = True
         self.embedding_size = 32
         self.sequence_length = 16
-        self.stride_history_max = 1000
-        self.confidence_threshold = 0.999
-        
-        self.stride_history = defaultdict(deque)
-        self.context_stats = defaultdict(lambda: {
-            'total_accesses': 0,
-            'patterns_detected': 0,
-            'avg_confidence': 0.0,
-            'last_updated': None
+        self.analysis_window = 64   # Acessos considerados pelo classificador
+        self._period_cache = {}
+        self.stride_history_max = model_config.get('history_max_size', 1000)
+        self.confidence_threshold = model_config.get('confidence_threshold', 0.999)
+        
+        # Tabelas por contexto com orçamento de memória (ver context_table.py)
+        self.stride_history = ContextTable.from_config(
+            'alp.stride_history', table_config,
+            default_factory=lambda: StrideHistoryBuffer(self.stride_history_max)
+        )
+        self.context_stats = ContextTable.from_config(
+            'alp.context_stats', table_config, default_factory=ContextStats
+        )
+        # Histórico e ContextStats são atualizados campo a campo: previsões
+        # concorrentes do mesmo contexto não podem intercalar as atualizações
+        self._record_lock = threading.Lock()
+        # Contadores globais do modelo (por thread, somados na leitura)
+        self.counters = ShardedCounters({
+            'total_predictions': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'cache_expirations': 0
         })
         
         self.lstm_weights = self._initialize_weights()
-        self.inference_cache = {}
+        self.quantized = None   # QuantizedForward quando inference_precision = 'int8'
+        self.inference_precision = 'float'
+        # Resíduo do forward LSTM/denso na confiança (opt-in: custa ~3x o
+        # classificador por previsão não cacheada e quase não a altera)
+        self.model_calibration = model_config.get('model_calibration', False)
+        
+        # Prefetch: correlação de deltas aprendida por contexto
+        self.prefetcher = DeltaCorrelationPrefetcher(
+            prefetch_depth=model_config.get('prefetch_depth', 4),
+            min_confidence=model_config.get('prefetch_min_confidence', 0.5),
+            table_config=table_config
+        )
+        
+        # Cache de inferência: assinatura da janela de strides → previsão
+        # (LRU limitado por cache_max_size, TTL opcional em segundos)
+        self.cache_max_size = model_config.get('cache_max_size', 100)
+        cache_ttl_s = model_config.get('cache_ttl_s')
+        self.cache_ttl_ns = int(cache_ttl_s * 1e9) if cache_ttl_s else None
+        self.inference_cache = ContextTable(
+            'alp.inference_cache', max_entries=self.cache_max_size, policy='lru'
+        )
+        
+        # Aprendizado online: priors logit por contexto, atualizados em
+        # segundo plano a partir de recoveries e TTIDs medidos
+        self.context_priors = ContextTable.from_config('alp.context_priors', table_config)
+        self.learner = OnlineLearner(
+            self.context_priors,
+            capacity=model_config.get('feedback_replay_size', 1024),
+            failure_step=model_config.get('feedback_failure_step', 6.0),
+            half_life_s=model_config.get('feedback_half_life_s', 300.0)
+        )
+        
+        # Estado persistido (pesos, priors, calibração), mapeado em memória
+        weights_path = model_config.get('weights_path')
+        if weights_path and os.path.exists(weights_path):
+            self.load(weights_path)
+        self.set_inference_precision(model_config.get('inference_precision', 'float'))
         
         logger.info(f"[ALP-Model] {model_version} inicializado (VERSÃO FINAL ABSOLUTA)")
-        logger.info(f"  - Lógica: IF/ELSE simplificada")
+        logger.info(f"  - Lógica: classificador de stride vetorizado")
         logger.info(f"  - Threshold: {self.confidence_threshold * 100:.1f}%")
 
     def _initialize_weights(self) -> Dict:
@@ -50,44 +219,270 @@ class ALPModel:
             'dense_bias': np.zeros(16)
         }
 
+    def _stride_window(self, accesses) -> np.ndarray:
+        """Strides (int64) dos últimos `analysis_window` acessos (diferenças vetorizadas)"""
+        addresses = np.asarray(accesses[-(self.analysis_window + 1):], dtype=np.int64)
+        return addresses[1:] - addresses[:-1]
+
+    def _normalize_strides(self, strides: np.ndarray, row: np.ndarray) -> None:
+        """Escrever em `row` os últimos strides normalizados em [-1, 1]"""
+        tail = strides[-self.sequence_length:]
+        if len(tail):
+            stride_max = max(int(np.abs(tail).max()), 1)
+            row[:len(tail)] = tail / (stride_max + 1e-6)
+
     def preprocess_input(self, context: str, accesses: List[int]) -> np.ndarray:
-        """Preprocessar entrada"""
+        """Preprocessar entrada: últimos strides normalizados em [-1, 1], com padding"""
         try:
-            if not accesses or len(accesses) == 0:
-                logger.debug(f"[ALP] Nenhum acesso fornecido para {context}")
-                return np.zeros((1, self.sequence_length))
-            
-            strides = []
-            for i in range(1, min(len(accesses), 16)):
-                stride = accesses[i] - accesses[i-1]
-                strides.append(stride)
-            
-            if strides:
-                stride_max = max(abs(s) for s in strides) if strides else 1
-                if stride_max == 0:
-                    stride_max = 1
-                normalized_strides = [s / (stride_max + 1e-6) for s in strides]
-            else:
-                normalized_strides = [0]
-            
-            padded_strides = (normalized_strides + [0] * self.sequence_length)[:self.sequence_length]
-            input_sequence = np.array([padded_strides], dtype=np.float32)
+            input_sequence = np.zeros((1, self.sequence_length), dtype=np.float32)
+            if accesses is None or len(accesses) == 0:
+                logger.debug("[ALP] Nenhum acesso fornecido para %s", context)
+                return input_sequence
             
+            self._normalize_strides(self._stride_window(accesses), input_sequence[0])
             return input_sequence
             
         except Exception as e:
             logger.error(f"[ALP] Erro no preprocessamento: {e}")
             return np.zeros((1, self.sequence_length))
 
-    def predict(self, context: str, accesses: List[int]) -> Dict:
+    def _period_indexes(self, width: int):
+        """
+        Índices deslocados (P, W) para o teste de periodicidade e o peso de
+        cada período (1/pares, ou 0 se houver menos de dois períodos na
+        janela). Cache por largura.
+        """
+        cached = self._period_cache.get(width)
+        if cached is None:
+            periods = np.arange(2, max(min(width // 2, self.MAX_TILE_PERIOD), 2) + 1)
+            shifted = np.arange(width)[None, :] + periods[:, None]
+            in_range = shifted < width
+            pair_count = width - periods
+            weights = np.where(pair_count >= periods, 1.0 / np.maximum(pair_count, 1), 0.0)
+            cached = (periods, np.minimum(shifted, width - 1), in_range, weights)
+            self._period_cache[width] = cached
+        return cached
+
+    def _classify(self, count: int, dominant: int, dominant_votes: int,
+                  second_votes: int, period_score: float, period_matches: int):
         """
-        VERSÃO FINAL: Lógica IF/ELSE simplificada e à prova de falhas
+        Rotular a sequência e calcular confiança e irregularidade.
+        
+        confiança = regularidade * (1 - 2^-evidência), onde regularidade é a
+        fração de strides explicada pelo padrão e evidência é o número de
+        strides que o confirmam. Um stride constante precisa de ~10 amostras
+        para passar de 99.9%.
+        """
+        share = dominant_votes / max(count, 1)
+        tiled_score = period_score if second_votes >= 2 else 0.0
+        is_tiled = tiled_score >= self.PERIODIC_SCORE and tiled_score >= share
+        
+        regularity = max(share, tiled_score)
+        evidence = period_matches if is_tiled else dominant_votes
+        confidence = regularity * (1.0 - 2.0 ** -evidence)
+        
+        if count < self.MIN_STRIDES:
+            pattern = PATTERN_WARMUP
+        elif is_tiled:
+            pattern = PATTERN_TILED
+        elif share >= self.DOMINANT_SHARE:
+            pattern = PATTERN_LINEAR if abs(dominant) <= self.CACHE_LINE_BYTES else PATTERN_STRIDED
+        else:
+            pattern = PATTERN_RANDOM
+        
+        return pattern, confidence, 1.0 - regularity
+
+    def analyze_strides(self, accesses: List[int]) -> Dict:
+        """
+        Classificar o padrão de stride de uma sequência de acessos.
+        
+        - Votação: os strides são ordenados e o tamanho de cada sequência de
+          valores iguais é o número de votos; o mais votado é o stride
+          dominante e o segundo costuma ser o salto de linha de um tile 2D.
+        - Periodicidade (só com dois strides recorrentes): para cada período
+          p, fração de posições com diffs[i] == diffs[i + p], exigindo ao
+          menos dois períodos observados.
+        """
+        return self._analyze_window(self._stride_window(accesses))
+
+    def _analyze_window(self, diffs: np.ndarray) -> Dict:
+        """analyze_strides() sobre uma janela de strides já calculada"""
+        count = len(diffs)
+        dominant, dominant_votes, second_votes = 0, 0, 0
+        period, period_score, period_matches = 0, 0.0, 0
+        
+        if count:
+            ordered = np.sort(diffs)
+            bounds = np.flatnonzero(ordered[1:] != ordered[:-1])
+            if len(bounds) == 0:
+                dominant, dominant_votes = int(ordered[0]), count
+            else:
+                # Limites das sequências de valores iguais: [0, b1, ..., count]
+                edges = np.empty(len(bounds) + 2, dtype=np.int64)
+                edges[0], edges[-1] = 0, count
+                edges[1:-1] = bounds + 1
+                votes = edges[1:] - edges[:-1]
+                top = int(votes.argmax())
+                dominant, dominant_votes = int(ordered[edges[top]]), int(votes[top])
+                votes[top] = 0
+                second_votes = int(votes.max())
+            
+            if second_votes >= 2:
+                periods, shifted, in_range, weights = self._period_indexes(count)
+                matches = ((diffs[shifted] == diffs) & in_range).sum(axis=1)
+                scores = matches * weights
+                best = int(scores.argmax())
+                period = int(periods[best])
+                period_score = float(scores[best])
+                period_matches = int(matches[best])
+        
+        pattern, confidence, irregularity = self._classify(
+            count, dominant, dominant_votes, second_votes, period_score, period_matches)
+        
+        # Próximos strides esperados (extrapolação do padrão)
+        if pattern == PATTERN_TILED:
+            next_strides = diffs[count - period:count - period + 2].tolist()
+        elif pattern in (PATTERN_LINEAR, PATTERN_STRIDED):
+            next_strides = [dominant, dominant]
+        else:
+            next_strides = []
+        
+        return {
+            'pattern': pattern,
+            'confidence': confidence,
+            'irregularity': irregularity,
+            'dominant_stride': dominant,
+            'period': period if pattern == PATTERN_TILED else 0,
+            'next_strides': next_strides
+        }
+
+    def set_inference_precision(self, precision: str) -> None:
+        """
+        Selecionar o caminho de inferência: 'float' (pesos float64) ou
+        'int8' (pesos int8 por canal, acumulação int32; camadas cujo erro de
+        quantização excede a tolerância continuam em float).
+        """
+        if precision not in ('float', 'int8'):
+            raise ValueError(f"inference_precision inválida: {precision!r}")
+        self.inference_precision = precision
+        self.quantized = (QuantizedForward(self.lstm_weights, self.sequence_length)
+                          if precision == 'int8' else None)
+        # Resultados em cache dependem do caminho de inferência
+        self.inference_cache.clear()
+
+    def _forward(self, inputs: np.ndarray) -> np.ndarray:
+        """
+        Forward vetorizado de um lote (B, sequence_length) pelos pesos LSTM
+        e densos: um passo da célula (estado inicial zero, portanto sem o
+        termo recorrente; as colunas de embedding além da entrada são zero e
+        só as linhas usadas do kernel entram no produto) seguido da camada
+        densa → (B, 16).
+        """
+        if self.quantized is not None:
+            return self.quantized(inputs)
+        weights = self.lstm_weights
+        hidden = np.tanh(inputs @ weights['lstm_kernel'][:inputs.shape[1]] + weights['lstm_bias'])
+        return hidden @ weights['dense_kernel'] + weights['dense_bias']
+
+    def _calibrate(self, confidence, model_output: np.ndarray):
+        """
+        Combinar a confiança do classificador com a saída do modelo: a média
+        da camada densa é somada como resíduo no espaço logit.
+        """
+        p = np.clip(confidence, 1e-9, 1.0 - 1e-9)
+        logit = np.log(p / (1.0 - p)) + model_output.mean(axis=-1)
+        return 1.0 / (1.0 + np.exp(-logit))
+
+    def _apply_prior(self, handle: int, confidence: float) -> float:
+        """Aplicar o prior aprendido do contexto (deslocamento no espaço logit)"""
+        prior = self.learner.prior(handle)
+        if not prior:
+            return confidence
+        p = min(max(confidence, 1e-9), 1.0 - 1e-9)
+        return 1.0 / (1.0 + math.exp(-(math.log(p / (1.0 - p)) + prior)))
+
+    def adjust_confidence(self, context: Union[int, str], confidence: float) -> float:
+        """
+        Aplicar o prior aprendido do contexto a uma confiança produzida fora
+        do modelo (ex.: pelo tier heurístico de PredictorCascade).
+        """
+        return self._apply_prior(CONTEXT_REGISTRY.resolve(context), confidence)
+
+    def _record_prediction(self, handle: int, num_accesses: int, confidence: float) -> None:
+        """Atualizar histórico e estatísticas do contexto (sem formatar datas)"""
+        now_ns = time.monotonic_ns()
+        with self._record_lock:
+            self.stride_history[handle].append(now_ns, num_accesses)
+            
+            stats = self.context_stats[handle]
+            stats.total_accesses += num_accesses
+            stats.patterns_detected += 1
+            stats.avg_confidence += (confidence - stats.avg_confidence) / stats.patterns_detected
+            stats.last_updated_ns = now_ns
+        self.counters.add('total_predictions')
+
+    def _build_prediction(self, handle: int, accesses, pattern: str, confidence: float,
+                          irregularity: float, dominant: int) -> Dict:
+        """
+        Montar o dicionário de previsão retornado a PredictionEngine/API.
+        Os blocos de prefetch (e a confiança de cada um) vêm do prefetcher
+        por correlação de deltas do contexto, a partir do último acesso.
+        """
+        blocks, block_confidence = self.prefetcher.prefetch(handle, accesses)
+        predictable = pattern in (PATTERN_LINEAR, PATTERN_STRIDED, PATTERN_TILED)
+        
+        return {
+            'blocks': blocks,
+            'block_confidence': block_confidence,
+            'confidence': confidence,
+            'ttid_pim': 90 if predictable else 105,
+            'ttid_cpu': 150 if predictable else 110,
+            'stride_pattern': pattern,
+            'dominant_stride': dominant,
+            'irregularity': irregularity,
+            'reasoning': f'Padrão {pattern} (stride {dominant}, {len(accesses)} acessos)'
+        }
+
+    def _cache_key(self, strides: np.ndarray) -> bytes:
+        """
+        Assinatura compacta (16 bytes) da janela de strides. A entrada
+        normalizada de preprocess_input() é função dessa janela, então a
+        previsão (exceto os endereços absolutos) depende apenas da chave.
+        """
+        return hashlib.blake2b(strides.tobytes(), digest_size=16).digest()
+
+    def _cache_lookup(self, key: bytes) -> Optional[tuple]:
+        """Consultar o cache de inferência (None em miss ou entrada expirada)"""
+        if not self.cache_max_size:
+            return None
+        entry = self.inference_cache.get(key)
+        if entry is not None and self.cache_ttl_ns is not None:
+            if time.monotonic_ns() - entry[0] > self.cache_ttl_ns:
+                self.inference_cache.pop(key)
+                self.counters.add('cache_expirations')
+                entry = None
+        if entry is None:
+            self.counters.add('cache_misses')
+            return None
+        self.counters.add('cache_hits')
+        return entry[1]
+
+    def _cache_store(self, key: bytes, result: tuple) -> None:
+        if self.cache_max_size:
+            self.inference_cache[key] = (time.monotonic_ns(), result)
+
+    def predict(self, context: Union[int, str], accesses: List[int]) -> Dict:
+        """
+        Prever o padrão de acesso e a confiança para o contexto.
         
         Fluxo:
-        - SE len(accesses) >= 10 E contexto contém 'ai_forward_pass_kernel':
-          → RETORNA confiança ALTA (99.995%) → PIM será selecionado
-        - SENÃO:
-          → RETORNA confiança BAIXA (70%) → CPU será selecionado (seguro)
+        - Classificar os strides da janela (linear, strided, tiled 2D,
+          aleatório) com votação vetorizada e score de periodicidade
+        - Confiança derivada dos dados (calibrada pela saída do modelo só
+          com model_calibration): alta apenas para padrões regulares com
+          evidência suficiente → PIM; irregular/warmup → CPU (seguro)
+        - Janelas de strides repetidas (laços em regime) são servidas pelo
+          cache de inferência, sem reclassificar nem rodar o forward
         """
         try:
             if not self.is_trained:
@@ -95,87 +490,256 @@ class ALPModel:
                 return self._fallback_prediction()
             
             # Verificar se há acessos
-            if not accesses or len(accesses) == 0:
+            if accesses is None or len(accesses) == 0:
                 logger.warning("[ALP] Nenhum acesso fornecido")
                 return self._fallback_prediction()
             
-            # ================================================================
-            # ✅ LÓGICA FINAL SIMPLIFICADA - À PROVA DE FALHAS
-            # ================================================================
-            
-            # Registrar no histórico
-            if context not in self.stride_history:
-                self.stride_history[context] = deque(maxlen=self.stride_history_max)
-            
-            self.stride_history[context].append({
-                'timestamp': datetime.now().isoformat(),
-                'num_accesses': len(accesses)
-            })
-            
-            stats = self.context_stats[context]
-            stats['total_accesses'] += len(accesses)
-            stats['patterns_detected'] += 1
-            stats['last_updated'] = datetime.now().isoformat()
-            
-            # ================================================================
-            # DECISÃO FINAL - IF/ELSE SIMPLIFICADO
-            # ================================================================
-            
-            # 🔑 CONDIÇÃO DE ALTA CONFIANÇA (PIM)
-            # Deve atender AMBAS as condições:
-            # 1. Histórico suficiente: len(accesses) >= 10
-            # 2. Contexto correto: 'ai_forward_pass_kernel' no nome
-            
-            if len(accesses) >= 10 and 'ai_forward_pass_kernel' in context:
-                # ========================================================
-                # ✨ BRANCH DE ALTA CONFIANÇA (PIM)
-                # ========================================================
+            # Tabelas indexadas pelo handle inteiro do contexto
+            handle = CONTEXT_REGISTRY.resolve(context)
+            
+            strides = self._stride_window(accesses)
+            key = self._cache_key(strides)
+            result = self._cache_lookup(key)
+            if result is None:
+                analysis = self._analyze_window(strides)
+                confidence = analysis['confidence']
+                if self.model_calibration:
+                    inputs = np.zeros((1, self.sequence_length), dtype=np.float32)
+                    self._normalize_strides(strides, inputs[0])
+                    confidence = float(self._calibrate(confidence, self._forward(inputs)[0]))
+                result = (analysis['pattern'], confidence, analysis['irregularity'],
+                          analysis['dominant_stride'])
+                self._cache_store(key, result)
+            
+            pattern, confidence, irregularity, dominant = result
+            confidence = self._apply_prior(handle, confidence)
+            self._record_prediction(handle, len(accesses), confidence)
+            
+            logger.debug("[ALP] %s: padrão=%s confiança=%.5f irregularidade=%.3f",
+                         handle, pattern, confidence, irregularity)
+            
+            return self._build_prediction(handle, accesses, pattern, confidence,
+                                          irregularity, dominant)
+            
+        except Exception as e:
+            logger.error(f"[ALP] Erro na previsão: {e}")
+            return self._fallback_prediction()
+
+    def _stride_features_batch(self, diffs: np.ndarray, valid: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Versão vetorizada de analyze_strides para um lote (B, W) de strides
+        alinhados à direita (posições de padding marcadas em `valid`).
+        Produz as mesmas features, com o mesmo desempate, linha a linha.
+        """
+        batch, width = diffs.shape
+        rows = np.arange(batch)
+        count = valid.sum(axis=1)
+        
+        # Votação por ordenação: padding vira um sentinela sem votos
+        pad = np.iinfo(np.int64).min
+        ordered = np.sort(np.where(valid, diffs, pad), axis=1)
+        position = np.arange(width)
+        run_start = np.ones((batch, width), dtype=bool)
+        run_start[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        run_end = np.ones((batch, width), dtype=bool)
+        run_end[:, :-1] = run_start[:, 1:]
+        first = np.maximum.accumulate(np.where(run_start, position, 0), axis=1)
+        votes = np.where(run_end & (ordered != pad), position - first + 1, 0)
+        
+        top = votes.argmax(axis=1)
+        dominant = np.where(count > 0, ordered[rows, top], 0)
+        dominant_votes = votes[rows, top]
+        votes[rows, top] = 0
+        second_votes = votes.max(axis=1)
+        
+        # Periodicidade (apenas linhas candidatas a tile 2D)
+        period = np.zeros(batch, dtype=np.int64)
+        period_score = np.zeros(batch)
+        period_matches = np.zeros(batch, dtype=np.int64)
+        candidates = np.flatnonzero(second_votes >= 2)
+        if len(candidates):
+            periods, shifted, in_range, _ = self._period_indexes(width)
+            cand_diffs = diffs[candidates]
+            cand_valid = valid[candidates]
+            pairs = cand_valid[:, None, :] & cand_valid[:, shifted] & in_range
+            matches = ((cand_diffs[:, shifted] == cand_diffs[:, None, :]) & pairs).sum(axis=2)
+            pair_count = pairs.sum(axis=2)
+            weights = np.where(pair_count >= periods, 1.0 / np.maximum(pair_count, 1), 0.0)
+            scores = matches * weights
+            best = scores.argmax(axis=1)
+            cand_rows = np.arange(len(candidates))
+            period[candidates] = periods[best]
+            period_score[candidates] = scores[cand_rows, best]
+            period_matches[candidates] = matches[cand_rows, best]
+        
+        return {
+            'count': count,
+            'dominant': dominant,
+            'dominant_votes': dominant_votes,
+            'second_votes': second_votes,
+            'period': period,
+            'period_score': period_score,
+            'period_matches': period_matches
+        }
+
+    def predict_batch(self, contexts: List[Union[int, str]], access_arrays: List) -> List[Dict]:
+        """
+        Prever vários contextos de uma vez.
+        
+        As sequências são empilhadas em uma matriz de strides (B, W) e em um
+        tensor de entrada (B, sequence_length); a votação, a periodicidade e
+        (com model_calibration) o forward pelos pesos LSTM/densos rodam uma
+        única vez para o lote (apenas para as assinaturas que não estão no
+        cache de inferência).
+        O resultado de cada linha é idêntico ao de predict().
+        
+        Args:
+            contexts: Handles (ou nomes) dos contextos, um por sequência
+            access_arrays: Sequências de endereços (listas ou ndarrays)
+            
+        Returns:
+            Lista de previsões, na mesma ordem das entradas
+        """
+        if len(contexts) != len(access_arrays):
+            raise ValueError("contexts e access_arrays devem ter o mesmo tamanho")
+        
+        try:
+            if not self.is_trained:
+                logger.error("[ALP] Modelo não está treinado!")
+                return [self._fallback_prediction() for _ in contexts]
+            
+            # Consultar o cache; assinaturas repetidas no lote são inferidas uma vez
+            results = [None] * len(access_arrays)
+            pending = {}    # chave → linhas que aguardam a inferência
+            windows = []
+            for row, accesses in enumerate(access_arrays):
+                if accesses is None or len(accesses) == 0:
+                    continue
+                strides = self._stride_window(accesses)
+                key = self._cache_key(strides)
+                if key in pending:
+                    pending[key].append(row)
+                    self.counters.add('cache_hits')
+                    continue
+                results[row] = self._cache_lookup(key)
+                if results[row] is None:
+                    pending[key] = [row]
+                    windows.append(strides)
+            
+            if pending:
+                batch = len(windows)
+                width = self.analysis_window
+                diffs = np.zeros((batch, width), dtype=np.int64)
+                valid = np.zeros((batch, width), dtype=bool)
+                inputs = (np.zeros((batch, self.sequence_length), dtype=np.float32)
+                          if self.model_calibration else None)
                 
-                confidence = 0.99995  # 99.995% - ACIMA do threshold 99.9%
+                # Empilhar: strides alinhados à direita (mais recentes no fim)
+                for i, strides in enumerate(windows):
+                    if len(strides):
+                        diffs[i, width - len(strides):] = strides
+                        valid[i, width - len(strides):] = True
+                    if inputs is not None:
+                        self._normalize_strides(strides, inputs[i])
                 
-                logger.debug(f"[ALP] ALTA CONFIANÇA atingida para {context}")
-                logger.debug(f"       len(accesses)={len(accesses)} >= 10 ✓")
-                logger.debug(f"       Contexto correto ✓")
-                logger.debug(f"       Retornando confiança = {confidence}")
+                features = self._stride_features_batch(diffs, valid)
                 
-                return {
-                    'blocks': [accesses[-1] + 128, accesses[-1] + 256],
-                    'confidence': confidence,  # ← ESTE É O VALOR QUE IMPORTA!
-                    'ttid_pim': 90,
-                    'ttid_cpu': 150,
-                    'stride_pattern': 'Linear (Loop) OTIMIZADO',
-                    'reasoning': f'Histórico suficiente ({len(accesses)} acessos). PIM ativado.'
-                }
-            
-            else:
-                # ========================================================
-                # ⚠️ BRANCH DE BAIXA CONFIANÇA (CPU - SEGURO)
-                # ========================================================
-                
-                confidence = 0.70  # 70% - ABAIXO do threshold 99.9%
+                # Confiança do classificador (calibrada para o lote inteiro)
+                raw_confidence = np.empty(batch)
+                classified = []
+                for i in range(batch):
+                    pattern, confidence, irregularity = self._classify(
+                        int(features['count'][i]), int(features['dominant'][i]),
+                        int(features['dominant_votes'][i]), int(features['second_votes'][i]),
+                        float(features['period_score'][i]), int(features['period_matches'][i]))
+                    raw_confidence[i] = confidence
+                    classified.append((pattern, irregularity))
+                confidences = (self._calibrate(raw_confidence, self._forward(inputs))
+                               if self.model_calibration else raw_confidence)
                 
-                reason = "Histórico insuficiente (warmup)" if len(accesses) < 10 else "Contexto desconhecido"
-                logger.debug(f"[ALP] BAIXA CONFIANÇA para {context}")
-                logger.debug(f"       Razão: {reason}")
-                logger.debug(f"       Retornando confiança = {confidence}")
+                for i, (key, rows) in enumerate(pending.items()):
+                    pattern, irregularity = classified[i]
+                    result = (pattern, float(confidences[i]), irregularity,
+                              int(features['dominant'][i]))
+                    self._cache_store(key, result)
+                    for row in rows:
+                        results[row] = result
+            
+            predictions = []
+            for context, accesses, result in zip(contexts, access_arrays, results):
+                if result is None:
+                    predictions.append(self._fallback_prediction())
+                    continue
                 
-                return {
-                    'blocks': [],
-                    'confidence': confidence,  # ← ESTE É O VALOR QUE IMPORTA!
-                    'ttid_pim': 105,
-                    'ttid_cpu': 110,
-                    'stride_pattern': 'Warmup/Desconhecido',
-                    'reasoning': f'{reason}. CPU selecionada (seguro).'
-                }
+                pattern, confidence, irregularity, dominant = result
+                handle = CONTEXT_REGISTRY.resolve(context)
+                confidence = self._apply_prior(handle, confidence)
+                self._record_prediction(handle, len(accesses), confidence)
+                predictions.append(self._build_prediction(handle, accesses, pattern, confidence,
+                                                          irregularity, dominant))
+            
+            return predictions
             
         except Exception as e:
-            logger.error(f"[ALP] Erro na previsão: {e}")
-            return self._fallback_prediction()
+            logger.error(f"[ALP] Erro na previsão em lote: {e}")
+            return [self._fallback_prediction() for _ in contexts]
+
+    def record_feedback(self, context: Union[int, str], loss: float) -> None:
+        """
+        Registrar o resultado de uma decisão para o aprendizado online.
+        
+        Args:
+            context: Handle (ou nome) do contexto
+            loss: Perda em [-1, 1]; positiva para offload ruim, negativa
+                  para offload que compensou
+        """
+        self.learner.record(context, loss)
+
+    def record_recovery(self, context: Union[int, str]) -> None:
+        """Registrar um recovery (falso positivo crítico) no contexto"""
+        self.learner.record(context, 1.0)
+
+    def record_ttid(self, context: Union[int, str], measured_ttid_ms: float,
+                    expected_cpu_ttid_ms: float) -> None:
+        """
+        Registrar o TTID medido de um offload para PIM contra o TTID
+        esperado na CPU: perda relativa, positiva se o PIM foi mais lento.
+        """
+        if measured_ttid_ms <= 0 or expected_cpu_ttid_ms <= 0:
+            return
+        self.learner.record(context, (measured_ttid_ms - expected_cpu_ttid_ms) / expected_cpu_ttid_ms)
+
+    def flush_feedback(self, timeout: Optional[float] = None) -> bool:
+        """Aguardar a aplicação do feedback pendente (testes e desligamento)"""
+        return self.learner.flush(timeout)
+
+    def save(self, path: str) -> int:
+        """
+        Salvar pesos, priors por contexto e calibração em formato binário
+        versionado (ver model_store.py). Retorna o tamanho em bytes.
+        """
+        self.learner.flush()
+        size = save_model(self, path)
+        logger.info(f"[ALP] Modelo salvo em {path} ({size} bytes)")
+        return size
+
+    def load(self, path: str, mmap: bool = True) -> Dict:
+        """
+        Restaurar o estado salvo por save(). Com mmap=True os pesos são
+        views somente leitura do arquivo, compartilhadas entre processos.
+        """
+        self.learner.flush()
+        header = load_model_state(self, path, mmap=mmap)
+        if self.inference_precision == 'int8':
+            self.set_inference_precision('int8')
+        logger.info(f"[ALP] Modelo carregado de {path} ({header['model_version']})")
+        return header
 
     def _fallback_prediction(self) -> Dict:
         """Retornar previsão segura de fallback"""
         return {
             'blocks': [],
+            'block_confidence': [],
             'confidence': 0.50,
             'ttid_pim': 100,
             'ttid_cpu': 100,
@@ -185,12 +749,45 @@ class ALPModel:
 
     def get_model_stats(self) -> Dict:
         """Retornar estatísticas do modelo"""
+        counters = self.counters.snapshot()
         return {
             'model_version': self.model_version,
             'is_trained': self.is_trained,
             'contexts_analyzed': len(self.stride_history),
-            'total_predictions': sum(s['patterns_detected'] for s in self.context_stats.values()),
-            'cache_size': len(self.inference_cache)
+            'total_predictions': counters['total_predictions'],
+            'inference_precision': self.inference_precision,
+            'cache_size': len(self.inference_cache),
+            'cache_max_size': self.cache_max_size,
+            'cache_hits': counters['cache_hits'],
+            'cache_misses': counters['cache_misses'],
+            'cache_evictions': self.inference_cache.evictions,
+            'cache_expirations': counters['cache_expirations'],
+            'cache_hit_rate': counters['cache_hits'] / max(counters['cache_hits'] + counters['cache_misses'], 1),
+            'prefetcher': self.prefetcher.get_stats(),
+            'online_learning': self.learner.get_stats()
+        }
+
+    def get_context_report(self, context: Union[int, str], limit: int = 10) -> Dict:
+        """
+        Relatório legível de um contexto: estatísticas agregadas e as últimas
+        `limit` previsões. Os timestamps ISO são formatados apenas aqui.
+        """
+        handle = CONTEXT_REGISTRY.resolve(context)
+        stats = self.context_stats.get(handle)
+        history = self.stride_history.get(handle)
+        return {
+            'context': CONTEXT_REGISTRY.name_of(handle),
+            'stats': stats.as_dict() if stats is not None else ContextStats().as_dict(),
+            'history': history.to_dicts(limit) if history is not None else []
+        }
+
+    def get_table_stats(self) -> Dict:
+        """Retornar ocupação e despejos das tabelas por contexto do modelo"""
+        return {
+            table.name: table.get_stats()
+            for table in (self.stride_history, self.context_stats,
+                          self.inference_cache, self.prefetcher.contexts,
+                          self.context_priors)
         }
 
 # ============================================================================
@@ -204,26 +801,34 @@ ALP_MODEL = ALPModel(model_version="LSTM-FINAL-ABSOLUTO-v1.0")
 # ============================================================================
 
 if __name__ == "__main__":
-    print("""
-╔════════════════════════════════════════════════════════════════════════════╗
-║         ALPModel FINAL ABSOLUTO - Lógica IF/ELSE Simplificada             ║
-╚════════════════════════════════════════════════════════════════════════════╝
-
-✅ LÓGICA FINAL (À PROVA DE FALHAS):
-
-   IF len(accesses) >= 10 AND 'ai_forward_pass_kernel' in context:
-       confidence = 0.99995  # 99.995% → PIM
-   ELSE:
-       confidence = 0.70     # 70.00%  → CPU
-
-🎯 RESULTADO ESPERADO:
-
-   Batch 1-2 (hist: 4, 8):   confidence = 0.70  → CPU (SEGURO)
-   Batch 3-12 (hist: 12+):   confidence = 0.99995 → PIM (OTIMIZADO) ✨
-   
-   Taxa PIM Final: 10/12 = 83.3% ✨
-   Status: 🟢 SAUDÁVEL
-
-🚀 PRÓXIMO PASSO:
-   python run_olp_100pct_corrigido.py
-""")
+    import time
+    
+    amostras = {
+        'linear (8 B)': [0x1000 + i * 8 for i in range(64)],
+        'strided (4 KiB)': [0x1000 + i * 4096 for i in range(64)],
+        'tiled 2D (8x8)': [0x1000 + (i // 8) * 4096 + (i % 8) * 8 for i in range(64)],
+        'aleatório': np.random.randint(0, 1 << 30, 64).tolist()
+    }
+    
+    print("\nALPModel - Classificador de Stride\n")
+    for nome, acessos in amostras.items():
+        inicio = time.perf_counter()
+        for _ in range(1000):
+            resultado = ALP_MODEL.analyze_strides(acessos)
+        custo_us = (time.perf_counter() - inicio) * 1e3
+        print(f"  {nome:18} → {resultado['pattern']:9} "
+              f"conf={resultado['confidence']:.5f} "
+              f"irreg={resultado['irregularity']:.3f} ({custo_us:.1f} µs/chamada)")
+    
+    # Inferência em lote: 256 contextos por chamada
+    contextos = [f"bench_{i}" for i in range(256)]
+    lote = [list(amostras.values())[i % len(amostras)] for i in range(256)]
+    inicio = time.perf_counter()
+    for contexto, acessos in zip(contextos, lote):
+        ALP_MODEL.predict(contexto, acessos)
+    custo_unitario = (time.perf_counter() - inicio) * 1e6 / len(lote)
+    inicio = time.perf_counter()
+    ALP_MODEL.predict_batch(contextos, lote)
+    custo_lote = (time.perf_counter() - inicio) * 1e6 / len(lote)
+    print(f"\n  predict: {custo_unitario:.1f} µs/contexto | "
+          f"predict_batch: {custo_lote:.1f} µs/contexto")
@@ -0,0 +1,98 @@
+# context_registry.py - Registro de Contextos (handles inteiros)
+
+import os
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+
+class CallSite(NamedTuple):
+    """
+    Escopo dos contextos definidos pela API: arquivo e linha do ponto de
+    chamada. Não colide com o escopo inteiro do tracer (função, scope_id)
+    nem com a mesma linha de outro módulo.
+    """
+    filename: str
+    lineno: int
+
+    def __str__(self) -> str:
+        return f"{os.path.basename(self.filename)}:{self.lineno}"
+
+
+class ContextRegistry:
+    """
+    Interna pares (função, escopo) em handles inteiros pequenos e estáveis.
+
+    Tracer, modelo e motor de decisão indexam suas tabelas pelo handle, de
+    modo que definir o contexto de uma tarefa custa uma consulta em dicionário
+    em vez de formatar e re-hashear uma string a cada chamada. O nome textual
+    ("funcao_escopo") é montado uma única vez, ao internar o par, e
+    indexado para que nomes legados (strings) resolvam para o mesmo handle.
+    """
+
+    def __init__(self):
+        self._handles = {}                                  # {função: {escopo: handle}}
+        self._keys: List[Tuple[str, Any]] = []              # handle -> (função, escopo)
+        self._names: List[str] = []                         # handle -> nome
+        self._by_name: Dict[str, int] = {}                  # nome -> handle
+        self._lock = threading.Lock()
+
+    def intern(self, function_name: str, scope: Any = None) -> int:
+        """Retorna o handle de (function_name, scope), criando-o se necessário."""
+        scopes = self._handles.get(function_name)
+        if scopes is not None:
+            handle = scopes.get(scope)
+            if handle is not None:
+                return handle
+
+        with self._lock:
+            scopes = self._handles.setdefault(function_name, {})
+            handle = scopes.get(scope)
+            if handle is None:
+                handle = len(self._keys)
+                name = function_name if scope is None else f"{function_name}_{scope}"
+                self._keys.append((function_name, scope))
+                self._names.append(name)
+                # O primeiro par com o nome fica com ele (ex.: "f_1" de ("f", 1))
+                self._by_name.setdefault(name, handle)
+                scopes[scope] = handle
+            return handle
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Handle já internado com o nome legível `name` (inverso de name_of), ou None."""
+        return self._by_name.get(name)
+
+    def resolve(self, context: Union[int, str]) -> int:
+        """
+        Aceita um handle ou um nome de contexto legado e retorna o handle.
+        Um nome já conhecido ("funcao_escopo") resolve para o handle do par
+        (função, escopo); um nome novo é internado como função sem escopo.
+        """
+        if isinstance(context, int):
+            return context
+        handle = self._by_name.get(context)
+        if handle is not None:
+            return handle
+        return self.intern(context)
+
+    def key_of(self, handle: int) -> Tuple[str, Any]:
+        """Retorna o par (função, escopo) do handle."""
+        return self._keys[handle]
+
+    def function_of(self, context: Union[int, str]) -> str:
+        """Retorna o nome da função associada ao contexto."""
+        if isinstance(context, str):
+            return context
+        return self._keys[context][0]
+
+    def name_of(self, context: Union[int, str]) -> str:
+        """Retorna o nome legível do contexto (formatado uma única vez)."""
+        if isinstance(context, str):
+            return context
+        return self._names[context]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+# Registro global compartilhado por todos os módulos
+CONTEXT_REGISTRY = ContextRegistry()
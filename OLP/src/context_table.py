@@ -0,0 +1,296 @@
+# context_table.py - Tabelas por contexto com orçamento de memória
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+
+
+# Valores padrão (espelhados em OLP_CONFIG['context_tables'])
+DEFAULT_TABLE_CONFIG = {
+    'max_entries': 4096,
+    'max_bytes': 64 * 1024 * 1024,
+    'policy': 'lru'
+}
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimativa barata do tamanho em bytes de um valor armazenado. Valores
+    que crescem no lugar informam o próprio tamanho via `nbytes`.
+    """
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+    return sys.getsizeof(value)
+
+
+class EvictionPolicy:
+    """
+    Política de despejo plugável.
+
+    A ordem de recência é mantida pela própria tabela; a política decide
+    apenas se um candidato novo merece entrar no lugar da vítima.
+    """
+    name = 'base'
+
+    def record_access(self, key: Hashable) -> None:
+        pass
+
+    def admit(self, candidate: Hashable, victim: Hashable) -> bool:
+        return True
+
+
+class LRUPolicy(EvictionPolicy):
+    """Least Recently Used: sempre admite e despeja o menos recente."""
+    name = 'lru'
+
+
+class TinyLFUPolicy(EvictionPolicy):
+    """
+    Admissão estilo TinyLFU: um count-min sketch estima a frequência
+    recente das chaves; um candidato só entra se for mais frequente que a
+    vítima LRU. Os contadores são divididos por 2 a cada `sample_size`
+    acessos para que a frequência reflita o passado recente.
+    """
+    name = 'tinylfu'
+
+    def __init__(self, width: int = 4096, depth: int = 4, sample_size: Optional[int] = None):
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size or 10 * width
+        self._counters = [0] * (width * depth)
+        self._additions = 0
+
+    def _indexes(self, key: Hashable):
+        h = hash(key)
+        width = self.width
+        for row in range(self.depth):
+            h = (h * 0x9E3779B1 + row) & 0xFFFFFFFFFFFF
+            yield row * width + (h >> 16) % width
+
+    def frequency(self, key: Hashable) -> int:
+        return min(self._counters[i] for i in self._indexes(key))
+
+    def record_access(self, key: Hashable) -> None:
+        counters = self._counters
+        for i in self._indexes(key):
+            if counters[i] < 15:  # Contadores saturados de 4 bits
+                counters[i] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._counters = [c >> 1 for c in counters]
+            self._additions //= 2
+
+    def admit(self, candidate: Hashable, victim: Hashable) -> bool:
+        return self.frequency(candidate) > self.frequency(victim)
+
+
+EVICTION_POLICIES = {
+    'lru': LRUPolicy,
+    'tinylfu': TinyLFUPolicy
+}
+
+
+class ContextTable:
+    """
+    Dicionário limitado por número de entradas e por bytes, com política
+    de despejo plugável e contadores de despejo para relatórios.
+
+    Substitui os dicts sem limite indexados por contexto (histórico do
+    tracer, tabelas do ALPModel, checkpoints da API), de modo que um serviço
+    de longa duração não cresça linearmente com o número de contextos.
+
+    O tamanho de um valor é medido quando ele entra na tabela. Valores
+    mutáveis que crescem depois disso (ex.: a tabela de transições do
+    prefetcher) devem ser re-medidos pelo dono com resize(chave) após a
+    mutação; buffers pré-alocados já entram com o tamanho da capacidade.
+
+    Com default_factory, table[k] passa pela mesma admissão que uma
+    inserção explícita: se a política recusa a chave (TinyLFU com a tabela
+    cheia), o valor criado é devolvido como transitório, sem entrar na
+    tabela. O chamador usa-o normalmente nesse acesso, mas o que escrever
+    nele não é retido até a chave ficar frequente o bastante para ser
+    admitida (cada acesso conta no sketch).
+    """
+
+    def __init__(self, name: str, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, policy: Any = None,
+                 default_factory: Optional[Callable[[], Any]] = None,
+                 sizeof: Callable[[Any], int] = estimate_size,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        """
+        Args:
+            name: Nome da tabela (aparece nos relatórios)
+            max_entries: Número máximo de entradas (None = sem limite)
+            max_bytes: Orçamento em bytes (None = sem limite)
+            policy: 'lru', 'tinylfu' ou instância de EvictionPolicy
+            default_factory: Se definido, table[k] cria a entrada ausente
+            sizeof: Função que estima o tamanho de um valor em bytes
+            on_evict: Callback chamado com (chave, valor) ao despejar
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        if policy is None or isinstance(policy, str):
+            policy = EVICTION_POLICIES[policy or 'lru']()
+        self.policy = policy
+        self.default_factory = default_factory
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        self.evictions = 0
+        self.rejections = 0
+
+    @classmethod
+    def from_config(cls, name: str, config: Optional[Dict] = None, **kwargs) -> "ContextTable":
+        """Criar tabela a partir de um dict no formato de OLP_CONFIG['context_tables']."""
+        settings = dict(DEFAULT_TABLE_CONFIG)
+        settings.update(config or {})
+        kwargs.setdefault('max_entries', settings['max_entries'])
+        kwargs.setdefault('max_bytes', settings['max_bytes'])
+        kwargs.setdefault('policy', settings['policy'])
+        return cls(name, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Interface de dicionário
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self._lock:
+            self.policy.record_access(key)
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+            if self.default_factory is None:
+                raise KeyError(key)
+            value = self.default_factory()
+            # Recusado pela política: valor transitório (não armazenado)
+            self._insert(key, value)
+            return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        """Inserir/substituir; com TinyLFU, uma chave nova pode ser recusada"""
+        with self._lock:
+            self.policy.record_access(key)
+            if key in self._data:
+                self._bytes -= self._sizes.pop(key, 0)
+                self._data[key] = value
+                self._data.move_to_end(key)
+                self._account(key, value)
+                self._shrink(protect=key)
+            else:
+                self._insert(key, value)
+
+    def __delitem__(self, key: Hashable) -> None:
+        with self._lock:
+            del self._data[key]
+            self._bytes -= self._sizes.pop(key, 0)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(list(self._data))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Consultar sem criar a entrada (atualiza a recência se existir)."""
+        with self._lock:
+            if key not in self._data:
+                return default
+            self.policy.record_access(key)
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._bytes -= self._sizes.pop(key, 0)
+            return self._data.pop(key)
+
+    def resize(self, key: Hashable) -> None:
+        """Re-medir o valor de `key` após mutação no lugar e despejar se excedeu o orçamento"""
+        with self._lock:
+            if self.max_bytes is None or key not in self._data:
+                return
+            self._bytes -= self._sizes.pop(key, 0)
+            self._account(key, self._data[key])
+            self._shrink(protect=key)
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def values(self):
+        return list(self._data.values())
+
+    def items(self):
+        return list(self._data.items())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    # ------------------------------------------------------------------
+    # Orçamento e despejo
+    # ------------------------------------------------------------------
+
+    def _account(self, key: Hashable, value: Any) -> None:
+        if self.max_bytes is not None:
+            size = self.sizeof(value)
+            self._sizes[key] = size
+            self._bytes += size
+
+    def _over_budget(self, extra_entries: int = 0) -> bool:
+        if self.max_entries is not None and len(self._data) + extra_entries > self.max_entries:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _insert(self, key: Hashable, value: Any) -> bool:
+        """Inserir chave nova; retorna False se a política a recusou"""
+        if self._data and self._over_budget(extra_entries=1):
+            victim = next(iter(self._data))
+            if not self.policy.admit(key, victim):
+                # Candidato menos frequente que a vítima: não entra na tabela
+                self.rejections += 1
+                return False
+        self._data[key] = value
+        self._account(key, value)
+        self._shrink(protect=key)
+        return True
+
+    def _shrink(self, protect: Hashable) -> None:
+        while self._over_budget() and len(self._data) > 1:
+            victim = next(iter(self._data))
+            if victim == protect:
+                break
+            value = self._data.pop(victim)
+            self._bytes -= self._sizes.pop(victim, 0)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(victim, value)
+
+    def get_stats(self) -> Dict:
+        """Retornar ocupação e contadores de despejo da tabela"""
+        return {
+            'name': self.name,
+            'policy': self.policy.name,
+            'entries': len(self._data),
+            'max_entries': self.max_entries,
+            'bytes': self._bytes if self.max_bytes is not None else None,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'rejections': self.rejections
+        }
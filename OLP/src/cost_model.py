@@ -0,0 +1,180 @@
+# cost_model.py - Modelo de custo PIM vs CPU medido (telemetria do HAL)
+
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from context_registry import CONTEXT_REGISTRY
+from context_table import ContextTable
+
+LANE_PIM = 'PIM'
+LANE_CPU = 'CPU'
+LANE_DMA = 'DMA'   # Parcela de transferência do PIM (load_task_pim)
+
+
+class LaneEstimate:
+    """
+    Estimativas de tempo de uma via (PIM, CPU ou DMA) em um contexto:
+    EWMA e quantis sobre as últimas `window` medições, guardadas em um
+    buffer circular NumPy. Os quantis são calculados sob demanda e
+    reaproveitados até a próxima medição.
+    """
+    __slots__ = ('samples', 'count', 'ewma_ms', 'last_ms', '_cursor', '_sorted')
+
+    def __init__(self, window: int = 64):
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.ewma_ms = 0.0
+        self.last_ms = 0.0
+        self._cursor = 0
+        self._sorted = None
+
+    def add(self, value_ms: float, alpha: float) -> None:
+        if self.count == 0:
+            self.ewma_ms = value_ms
+        else:
+            self.ewma_ms += alpha * (value_ms - self.ewma_ms)
+        self.last_ms = value_ms
+        self.samples[self._cursor] = value_ms
+        self._cursor = (self._cursor + 1) % len(self.samples)
+        self.count += 1
+        self._sorted = None
+
+    def quantile(self, q: float) -> float:
+        """Quantil q das medições na janela (interpolação linear)"""
+        if self.count == 0:
+            return 0.0
+        if self._sorted is None:
+            self._sorted = np.sort(self.samples[:min(self.count, len(self.samples))]).tolist()
+        ordered = self._sorted
+        position = q * (len(ordered) - 1)
+        low = int(position)
+        if low + 1 >= len(ordered):
+            return ordered[-1]
+        return ordered[low] + (position - low) * (ordered[low + 1] - ordered[low])
+
+    def as_dict(self, quantile: float) -> Dict:
+        return {
+            'samples': self.count,
+            'ewma_ms': self.ewma_ms,
+            'last_ms': self.last_ms,
+            'p50_ms': self.quantile(0.5),
+            f'p{int(round(quantile * 100))}_ms': self.quantile(quantile)
+        }
+
+
+class _ContextCost:
+    """Vias medidas de um contexto (criadas na primeira medição)"""
+    __slots__ = ('lanes',)
+
+    def __init__(self):
+        self.lanes: Dict[str, LaneEstimate] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(lane.samples.nbytes for lane in self.lanes.values())
+
+
+class CostModel:
+    """
+    Aprende o tempo de execução por contexto em cada via a partir de
+    medições reais: relógio de parede em torno de task_function e latência
+    de DMA reportada por OLPHALDriver.load_task_pim.
+
+    ttid_estimates() substitui os TTIDs previstos pelo modelo na regra de
+    ganho (OLPCoreAPI e PredictionEngine) quando as duas vias já têm
+    medições suficientes no contexto. O PIM é avaliado por um quantil alto
+    (cauda) e a CPU pela EWMA: o offload só compensa se mesmo um PIM lento
+    vencer a CPU típica.
+    """
+
+    def __init__(self, ewma_alpha: float = 0.2, window: int = 64,
+                 pim_quantile: float = 0.9, min_samples: int = 3,
+                 table_config: Optional[Dict] = None):
+        """
+        Args:
+            ewma_alpha: Peso da medição mais recente na EWMA
+            window: Medições guardadas por via para os quantis
+            pim_quantile: Quantil usado como TTID do PIM na decisão
+            min_samples: Medições mínimas por via antes de usar as estimativas
+            table_config: Limites da tabela por contexto
+                          (formato de OLP_CONFIG['context_tables'])
+        """
+        if not 0.0 < ewma_alpha <= 1.0:
+            raise ValueError("ewma_alpha deve estar em (0, 1]")
+        self.ewma_alpha = ewma_alpha
+        self.window = window
+        self.pim_quantile = pim_quantile
+        self.min_samples = min_samples
+        self.contexts = ContextTable.from_config('cost_model.contexts', table_config,
+                                                 default_factory=_ContextCost)
+        self.measurements = 0
+        self.estimates_served = 0
+        self.estimates_missing = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict] = None,
+                    table_config: Optional[Dict] = None) -> 'CostModel':
+        """Criar a partir de OLP_CONFIG['cost_model']"""
+        config = config or {}
+        return cls(ewma_alpha=config.get('ewma_alpha', 0.2),
+                   window=config.get('window', 64),
+                   pim_quantile=config.get('pim_quantile', 0.9),
+                   min_samples=config.get('min_samples', 3),
+                   table_config=table_config)
+
+    def record(self, context: Union[int, str], lane: str, elapsed_ms: float,
+               dma_ms: float = 0.0) -> None:
+        """
+        Registrar uma execução medida.
+
+        Args:
+            context: Handle (ou nome) do contexto
+            lane: 'PIM' ou 'CPU'
+            elapsed_ms: Tempo total da tarefa (para o PIM, inclui o DMA)
+            dma_ms: Latência de DMA medida pelo HAL (apenas PIM)
+        """
+        if elapsed_ms < 0:
+            return
+        lanes = self.contexts[CONTEXT_REGISTRY.resolve(context)].lanes
+        for name, value in ((lane, elapsed_ms), (LANE_DMA, dma_ms)):
+            if name == LANE_DMA and (lane != LANE_PIM or dma_ms <= 0):
+                continue
+            estimate = lanes.get(name)
+            if estimate is None:
+                estimate = lanes[name] = LaneEstimate(self.window)
+            estimate.add(value, self.ewma_alpha)
+        self.measurements += 1
+
+    def ttid_estimates(self, context: Union[int, str]) -> Optional[Tuple[float, float]]:
+        """
+        (ttid_pim, ttid_cpu) medidos do contexto, ou None se alguma via
+        ainda não tem `min_samples` medições (usar os valores do modelo).
+        """
+        state = self.contexts.get(CONTEXT_REGISTRY.resolve(context))
+        pim = state.lanes.get(LANE_PIM) if state is not None else None
+        cpu = state.lanes.get(LANE_CPU) if state is not None else None
+        if pim is None or cpu is None or min(pim.count, cpu.count) < self.min_samples:
+            self.estimates_missing += 1
+            return None
+        self.estimates_served += 1
+        return pim.quantile(self.pim_quantile), cpu.ewma_ms
+
+    def get_context_costs(self, context: Union[int, str]) -> Dict:
+        """Estimativas de cada via medida do contexto"""
+        state = self.contexts.get(CONTEXT_REGISTRY.resolve(context))
+        if state is None:
+            return {}
+        return {name: lane.as_dict(self.pim_quantile) for name, lane in state.lanes.items()}
+
+    def get_stats(self) -> Dict:
+        """Retornar estatísticas do modelo de custo"""
+        return {
+            'contexts': len(self.contexts),
+            'measurements': self.measurements,
+            'estimates_served': self.estimates_served,
+            'estimates_missing': self.estimates_missing,
+            'ewma_alpha': self.ewma_alpha,
+            'pim_quantile': self.pim_quantile,
+            'min_samples': self.min_samples
+        }
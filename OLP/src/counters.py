@@ -0,0 +1,116 @@
+# counters.py - Contadores de estatística por thread, somados na leitura
+
+import threading
+from typing import Dict, Iterator, Optional
+
+
+class ShardedCounters:
+    """
+    Contadores de estatística sem lock no caminho quente: cada thread
+    incrementa apenas o próprio shard (um dict privado), então não há
+    incrementos perdidos nem disputa por uma linha de cache/lock
+    compartilhados. Os shards são somados sob demanda, na leitura
+    (get_api_stats, get_hardware_stats...), que é rara.
+
+    Uso:
+        counters = ShardedCounters({'pim_selections': 0})
+        counters.add('pim_selections')          # caminho quente
+        counters['pim_selections']              # total somado
+        counters['pim_selections'] = 0          # reset
+
+    Valores não numéricos (ex.: o horário de início) podem ser guardados
+    como entradas fixas: leitura e escrita funcionam, add() não.
+    Shards de threads encerradas são incorporados à base na leitura.
+    """
+
+    def __init__(self, initial: Optional[Dict] = None):
+        self._base: Dict = dict(initial or {})
+        self._shards = []               # [(thread, shard)]
+        self._local = threading.local()
+        self._lock = threading.Lock()   # Registro de shards e leituras
+
+    def _shard(self) -> Dict:
+        shard = {}
+        with self._lock:
+            self._shards.append((threading.current_thread(), shard))
+        self._local.shard = shard
+        return shard
+
+    def add(self, name: str, amount=1) -> None:
+        """Incrementar o contador no shard da thread atual"""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[name] = shard.get(name, 0) + amount
+
+    def _merged(self) -> Dict:
+        """Base + shards (chamar com o lock)"""
+        totals = dict(self._base)
+        alive = []
+        for thread, shard in self._shards:
+            # copy() é atômico sob o GIL mesmo com a thread dona escrevendo
+            values = shard.copy()
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for name, value in values.items():
+                    self._base[name] = self._base.get(name, 0) + value
+            for name, value in values.items():
+                totals[name] = totals.get(name, 0) + value
+        self._shards = alive
+        return totals
+
+    def snapshot(self) -> Dict:
+        """Totais de todos os contadores"""
+        with self._lock:
+            return self._merged()
+
+    def get(self, name: str, default=0):
+        return self.snapshot().get(name, default)
+
+    def __getitem__(self, name: str):
+        totals = self.snapshot()
+        if name not in totals:
+            raise KeyError(name)
+        return totals[name]
+
+    def __setitem__(self, name: str, value) -> None:
+        """Definir o total: a base compensa o que já está nos shards"""
+        with self._lock:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                pending = sum(shard.copy().get(name, 0) for _, shard in self._shards)
+                self._base[name] = value - pending
+            else:
+                self._base[name] = value
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.snapshot()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.snapshot()))
+
+    def __len__(self) -> int:
+        return len(self.snapshot())
+
+    def keys(self):
+        return self.snapshot().keys()
+
+    def items(self):
+        return self.snapshot().items()
+
+    def get_stats(self) -> Dict:
+        """Shards ativos (threads que já incrementaram algum contador)"""
+        with self._lock:
+            return {'shards': len(self._shards), 'counters': len(self._merged())}
+
+
+def counter_property(name: str, attribute: str = 'counters') -> property:
+    """Atributo de contador: lê o total de `self.<attribute>[name]` e permite redefini-lo"""
+    def getter(self):
+        return getattr(self, attribute)[name]
+
+    def setter(self, value):
+        getattr(self, attribute)[name] = value
+
+    return property(getter, setter, doc=f"Total do contador '{name}'")
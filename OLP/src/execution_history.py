@@ -0,0 +1,259 @@
+# execution_history.py - Histórico de execuções colunar em buffer circular
+
+import hashlib
+import logging
+import numbers
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from context_table import estimate_size
+
+LANES = ('CPU', 'PIM')
+_LANE_CODES = {lane: code for code, lane in enumerate(LANES)}
+
+RESULT_MODES = (None, 'size', 'digest')
+
+logger = logging.getLogger(__name__)
+
+
+def _result_digest(result: Any) -> int:
+    """Digest de 64 bits do resultado (bytes do buffer quando houver, senão repr)"""
+    if hasattr(result, 'tobytes'):
+        payload = result.tobytes()
+    elif isinstance(result, (bytes, bytearray, memoryview)):
+        payload = bytes(result)
+    else:
+        payload = repr(result).encode()
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), 'little')
+
+
+class ExecutionHistory:
+    """
+    Histórico das execuções otimizadas com capacidade fixa: colunas NumPy
+    tipadas (task_id, handle do contexto, escopo, função, via, fallback,
+    confiança, TTID, timestamp em ns) escritas em um buffer circular. A execução mais
+    antiga é sobrescrita quando o buffer enche, sem copiar entradas.
+
+    O resultado da tarefa não é retido (arrays grandes deixam de ficar
+    vivos no histórico): guarda-se apenas o tamanho estimado em bytes
+    (result_mode='size'), também um digest de 64 bits ('digest'), ou nada
+    (None).
+
+    A via registrada é a final: uma tentativa PIM cancelada ou com falha no
+    HAL que concluiu na CPU aparece como 'CPU' com fallback=True.
+
+    Indexação e iteração devolvem registros dict, como a lista anterior
+    (history[-1]['destination'], history[-5:], for record in history).
+
+    Escritas e leituras são serializadas por um lock: execute_optimized(),
+    as corrotinas e o LaneScheduler registram de threads diferentes.
+    """
+
+    def __init__(self, capacity: int = 1000, result_mode: Optional[str] = 'size'):
+        """
+        Args:
+            capacity: Execuções guardadas (as mais antigas são sobrescritas)
+            result_mode: 'size', 'digest' ou None (o que guardar do resultado)
+        """
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positivo")
+        if result_mode not in RESULT_MODES:
+            raise ValueError(f"result_mode deve ser um de {RESULT_MODES}")
+        self.capacity = capacity
+        self.result_mode = result_mode
+        self.task_id = np.zeros(capacity, dtype=np.int64)
+        self.context = np.zeros(capacity, dtype=np.int64)
+        self.scope_id = np.zeros(capacity, dtype=np.int64)
+        self.function = np.zeros(capacity, dtype=np.int32)
+        self.lane = np.zeros(capacity, dtype=np.int8)
+        self.fallback = np.zeros(capacity, dtype=np.bool_)
+        self.confidence = np.zeros(capacity, dtype=np.float64)
+        self.ttid_ms = np.zeros(capacity, dtype=np.float64)
+        self.timestamp_ns = np.zeros(capacity, dtype=np.int64)
+        self.result_size = np.zeros(capacity, dtype=np.int64)
+        self.result_digest = np.zeros(capacity, dtype=np.uint64) if result_mode == 'digest' else None
+        # Nomes de função internados (a coluna guarda o índice)
+        self._function_names: List[str] = []
+        self._function_index: Dict[str, int] = {}
+        self._cursor = 0
+        self._size = 0
+        self.total_recorded = 0
+        self._lock = threading.Lock()
+
+    def _function_code(self, function_name: str) -> int:
+        code = self._function_index.get(function_name)
+        if code is None:
+            code = self._function_index[function_name] = len(self._function_names)
+            self._function_names.append(function_name)
+        return code
+
+    @staticmethod
+    def _scope_code(scope_id: Optional[int]) -> int:
+        """Escopo como inteiro (-1 = sem escopo); não inteiros não são registrados"""
+        if scope_id is None:
+            return -1
+        if isinstance(scope_id, numbers.Integral):
+            return int(scope_id)
+        logger.warning("  [OLP History] AVISO: scope_id não inteiro (%r) registrado sem escopo",
+                       scope_id)
+        return -1
+
+    def _result_fields(self, result: Any) -> tuple:
+        if self.result_mode is None or result is None:
+            return -1, 0
+        digest = _result_digest(result) if self.result_mode == 'digest' else 0
+        return estimate_size(result), digest
+
+    def record(self, task_id: int, context: int, scope_id: Optional[int], function_name: str,
+               destination: str, confidence: float, ttid_ms: float, result: Any = None,
+               fallback: bool = False) -> None:
+        """Registrar uma execução (`fallback`: PIM tentado, concluída na CPU)"""
+        scope_code = self._scope_code(scope_id)
+        lane = _LANE_CODES[destination]
+        size, digest = self._result_fields(result)
+        timestamp_ns = time.time_ns()
+        with self._lock:
+            i = self._cursor
+            self.task_id[i] = task_id
+            self.context[i] = context
+            self.scope_id[i] = scope_code
+            self.function[i] = self._function_code(function_name)
+            self.lane[i] = lane
+            self.fallback[i] = fallback
+            self.confidence[i] = confidence
+            self.ttid_ms[i] = ttid_ms
+            self.timestamp_ns[i] = timestamp_ns
+            self.result_size[i] = size
+            if self.result_digest is not None:
+                self.result_digest[i] = digest
+            self._cursor = (i + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.total_recorded += 1
+
+    def record_batch(self, task_ids: Sequence[int], contexts: Sequence[int],
+                     scope_id: Optional[int], function_name: str,
+                     destinations: Sequence[str], confidences: Sequence[float],
+                     ttids_ms: Sequence[float], results: Sequence[Any],
+                     fallbacks: Optional[Sequence[bool]] = None) -> None:
+        """Registrar um lote de execuções com escritas vetorizadas"""
+        count = len(task_ids)
+        if count == 0:
+            return
+        keep = slice(max(count - self.capacity, 0), count)
+        scope_code = self._scope_code(scope_id)
+        lanes = [_LANE_CODES[d] for d in destinations[keep]]
+        fields = [self._result_fields(result) for result in results[keep]]
+        timestamp_ns = time.time_ns()
+        with self._lock:
+            positions = (self._cursor + np.arange(count)[keep]) % self.capacity
+            self.task_id[positions] = np.asarray(task_ids)[keep]
+            self.context[positions] = np.asarray(contexts)[keep]
+            self.scope_id[positions] = scope_code
+            self.function[positions] = self._function_code(function_name)
+            self.lane[positions] = lanes
+            self.fallback[positions] = np.asarray(fallbacks)[keep] if fallbacks is not None else False
+            self.confidence[positions] = np.asarray(confidences)[keep]
+            self.ttid_ms[positions] = np.asarray(ttids_ms)[keep]
+            self.timestamp_ns[positions] = timestamp_ns
+            self.result_size[positions] = [size for size, _ in fields]
+            if self.result_digest is not None:
+                self.result_digest[positions] = np.array([digest for _, digest in fields],
+                                                         dtype=np.uint64)
+            self._cursor = (self._cursor + count) % self.capacity
+            self._size = min(self._size + count, self.capacity)
+            self.total_recorded += count
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _physical(self, index: int) -> int:
+        return (self._cursor - self._size + index) % self.capacity
+
+    def _record_at(self, i: int) -> Dict:
+        destination = LANES[self.lane[i]]
+        scope_id = int(self.scope_id[i])
+        timestamp_ns = int(self.timestamp_ns[i])
+        record = {
+            'task_id': int(self.task_id[i]),
+            'context': int(self.context[i]),
+            'scope_id': scope_id if scope_id >= 0 else None,
+            'function_name': self._function_names[self.function[i]],
+            'destination': destination,
+            'fallback': bool(self.fallback[i]),
+            'confidence': float(self.confidence[i]),
+            'ttid_ms': float(self.ttid_ms[i]),
+            'result_size': int(self.result_size[i]) if self.result_mode else None,
+            'timestamp': datetime.fromtimestamp(timestamp_ns / 1e9).isoformat(),
+            'timestamp_ns': timestamp_ns,
+            'reasoning': f'Decisão OLP-ALP para {destination}'
+        }
+        if self.result_digest is not None:
+            record['result_digest'] = f"{int(self.result_digest[i]):016x}"
+        return record
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict, List[Dict]]:
+        with self._lock:
+            if isinstance(index, slice):
+                return [self._record_at(self._physical(i))
+                        for i in range(*index.indices(self._size))]
+            if index < 0:
+                index += self._size
+            if not 0 <= index < self._size:
+                raise IndexError("índice fora do histórico")
+            return self._record_at(self._physical(index))
+
+    def __iter__(self):
+        # Cópia dos registros: iterar não segura o lock entre os yields
+        with self._lock:
+            records = [self._record_at(self._physical(i)) for i in range(self._size)]
+        return iter(records)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Colunas em ordem cronológica (cópias), para análise vetorizada"""
+        with self._lock:
+            return self._columns()
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        order = (self._cursor - self._size + np.arange(self._size)) % self.capacity
+        columns = {
+            'task_id': self.task_id[order],
+            'context': self.context[order],
+            'scope_id': self.scope_id[order],
+            'lane': self.lane[order],
+            'fallback': self.fallback[order],
+            'confidence': self.confidence[order],
+            'ttid_ms': self.ttid_ms[order],
+            'timestamp_ns': self.timestamp_ns[order],
+            'result_size': self.result_size[order]
+        }
+        if self.result_digest is not None:
+            columns['result_digest'] = self.result_digest[order]
+        return columns
+
+    def clear(self) -> None:
+        """Esvaziar o histórico (as colunas são mantidas alocadas)"""
+        with self._lock:
+            self._cursor = 0
+            self._size = 0
+
+    @property
+    def nbytes(self) -> int:
+        columns = (self.task_id, self.context, self.scope_id, self.function, self.lane,
+                   self.fallback, self.confidence, self.ttid_ms, self.timestamp_ns, self.result_size,
+                   self.result_digest)
+        return sum(column.nbytes for column in columns if column is not None)
+
+    def get_stats(self) -> Dict:
+        """Ocupação do histórico"""
+        return {
+            'entries': self._size,
+            'capacity': self.capacity,
+            'total_recorded': self.total_recorded,
+            'overwritten': self.total_recorded - self._size,
+            'result_mode': self.result_mode,
+            'nbytes': self.nbytes
+        }
@@ -0,0 +1,195 @@
+# lane_scheduler.py - Executor de duas vias (pool de CPU + via PIM) com futures
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from cost_model import LANE_CPU, LANE_PIM
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(task_function: Callable, task_data: Any) -> tuple:
+    """Executar a tarefa medindo o tempo de parede (nível de módulo: serializável)"""
+    start = time.perf_counter()
+    result = task_function(task_data)
+    return result, (time.perf_counter() - start) * 1000
+
+
+class DualLaneScheduler:
+    """
+    Executor de tarefas do OLP com duas vias concorrentes:
+    - CPU: pool de workers (threads ou processos)
+    - PIM: `pim_units` submissões simultâneas ao OLPHALDriver (DMA +
+      execução da tarefa na unidade)
+
+    submit() decide a via na thread chamadora, com o contexto atual da API
+    e a mesma regra de execute_optimized(), e retorna um Future. Trabalho
+    de CPU e de PIM se sobrepõe, então a vazão escala com os núcleos e as
+    unidades PIM. Ao concluir, cada tarefa alimenta o histórico, o modelo
+    de custo e o limiar do contexto da API (sob um lock do scheduler).
+
+    Com pool de processos, task_function e task_data precisam ser
+    serializáveis (pickle); a via PIM sempre usa threads.
+    """
+
+    def __init__(self, api, cpu_workers: Optional[int] = None, pim_units: int = 2,
+                 use_processes: bool = False):
+        """
+        Args:
+            api: OLPCoreAPI que decide a via e registra as execuções
+            cpu_workers: Workers da via CPU (None = os.cpu_count())
+            pim_units: Tarefas PIM em voo simultaneamente
+            use_processes: Pool de processos na via CPU (tarefas puramente
+                           Python limitadas pelo GIL)
+        """
+        if pim_units < 1:
+            raise ValueError("pim_units deve ser >= 1")
+        self.api = api
+        self.hal_driver = api.hal_driver
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
+        self.pim_units = pim_units
+        pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self.cpu_pool = pool_class(max_workers=self.cpu_workers)
+        self.pim_pool = ThreadPoolExecutor(max_workers=pim_units, thread_name_prefix='olp-pim')
+        self._lock = threading.Lock()
+        self.submitted = {LANE_CPU: 0, LANE_PIM: 0}
+        self.completed = {LANE_CPU: 0, LANE_PIM: 0}
+        self.failed = 0
+        self.busy_ms = {LANE_CPU: 0.0, LANE_PIM: 0.0}
+        # IDs padrão sequenciais por submissão (conclusões concorrentes não os alteram)
+        self._first_task_id = api.execution_history.total_recorded
+        self._started = time.perf_counter()
+
+    @classmethod
+    def from_config(cls, api, config: Optional[Dict] = None) -> 'DualLaneScheduler':
+        """Criar a partir de OLP_CONFIG['lane_scheduler']"""
+        config = config or {}
+        return cls(api,
+                   cpu_workers=config.get('cpu_workers'),
+                   pim_units=config.get('pim_units', 2),
+                   use_processes=config.get('cpu_pool', 'thread') == 'process')
+
+    def submit(self, task_function: Callable, task_data: Any,
+               task_id: Optional[int] = None) -> Future:
+        """
+        Decidir a via da tarefa e enviá-la ao pool correspondente.
+
+        Returns:
+            Future com o resultado da tarefa
+        """
+        api = self.api
+        current_context = api.get_current_context()
+        if current_context is None:
+            logger.warning(
+                "  [OLP Scheduler] AVISO: Nenhum contexto definido. "
+                "Use set_context() primeiro!"
+            )
+            return self.cpu_pool.submit(task_function, task_data)
+
+        context_id = current_context['context_id']
+        with self._lock:
+            task_id = task_id or self._first_task_id + sum(self.submitted.values())
+            destination, prediction = api._make_olp_decision(context_id, task_data)
+            if destination == LANE_PIM and not self.hal_driver:
+                destination = LANE_CPU
+            self.submitted[destination] += 1
+
+        if destination == LANE_PIM:
+            lane_future = self.pim_pool.submit(self._run_on_pim, task_function, task_data,
+                                               task_id)
+        else:
+            lane_future = self.cpu_pool.submit(_timed_call, task_function, task_data)
+
+        future = Future()
+        lane_future.add_done_callback(
+            lambda done: self._complete(done, future, current_context, task_id,
+                                        task_function, destination, prediction)
+        )
+        return future
+
+    def map(self, task_function: Callable, task_data_list: List[Any]) -> List[Any]:
+        """Submeter várias tarefas e aguardar os resultados, na ordem"""
+        futures = [self.submit(task_function, task_data) for task_data in task_data_list]
+        return [future.result() for future in futures]
+
+    def _run_on_pim(self, task_function: Callable, task_data: Any, task_id: int) -> tuple:
+        """Via PIM: DMA pelo HAL seguido da execução da tarefa na unidade"""
+        start = time.perf_counter()
+        num_blocks = len(task_data) if isinstance(task_data, (list, tuple)) else 10
+        metrics = self.hal_driver.transfer_task_pim(
+            task_id=task_id,
+            data_ptr=0x1000,
+            num_blocks=min(num_blocks, 100)
+        )
+        result = task_function(task_data)
+        return result, (time.perf_counter() - start) * 1000, metrics
+
+    def _complete(self, lane_future: Future, future: Future, current_context: Dict,
+                  task_id: int, task_function: Callable, destination: str,
+                  prediction: Optional[Dict]) -> None:
+        """Registrar a execução na API e resolver o Future do chamador"""
+        try:
+            outcome = lane_future.result()
+        except BaseException as e:
+            with self._lock:
+                self.failed += 1
+            future.set_exception(e)
+            return
+
+        api = self.api
+        context_id = current_context['context_id']
+        result, elapsed_ms = outcome[0], outcome[1]
+        try:
+            with self._lock:
+                self.completed[destination] += 1
+                self.busy_ms[destination] += elapsed_ms
+                fallback = False
+                if destination == LANE_PIM and outcome[2]:
+                    api._record_cost(context_id, LANE_PIM, elapsed_ms, outcome[2])
+                    api._report_pim_outcome(context_id, elapsed_ms, prediction)
+                    confidence = 0.99999
+                elif destination == LANE_PIM:
+                    # DMA falhou no HAL: a tarefa rodou mesmo assim, fora do PIM
+                    api._record_cost(context_id, LANE_PIM, elapsed_ms)
+                    fallback = True
+                    confidence = 0.85
+                else:
+                    api._record_cost(context_id, LANE_CPU, elapsed_ms)
+                    confidence = 0.85
+                api._finish_execution(current_context, task_id, task_function,
+                                      LANE_CPU if fallback else destination,
+                                      result, elapsed_ms, confidence, fallback)
+        except Exception as e:
+            logger.error(f"  [OLP Scheduler] ERRO ao registrar tarefa #{task_id}: {e}")
+        future.set_result(result)
+
+    def get_stats(self) -> Dict:
+        """Tarefas por via e sobreposição (tempo ocupado somado / tempo decorrido)"""
+        with self._lock:
+            elapsed_ms = (time.perf_counter() - self._started) * 1000
+            busy_ms = sum(self.busy_ms.values())
+            return {
+                'cpu_workers': self.cpu_workers,
+                'pim_units': self.pim_units,
+                'submitted': dict(self.submitted),
+                'completed': dict(self.completed),
+                'failed': self.failed,
+                'in_flight': sum(self.submitted.values()) - sum(self.completed.values()) - self.failed,
+                'busy_ms': dict(self.busy_ms),
+                'parallelism': busy_ms / elapsed_ms if elapsed_ms > 0 else 0.0
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Encerrar os pools das duas vias"""
+        self.cpu_pool.shutdown(wait=wait)
+        self.pim_pool.shutdown(wait=wait)
+
+    def __enter__(self) -> 'DualLaneScheduler':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.shutdown(wait=True)
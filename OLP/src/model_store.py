@@ -0,0 +1,171 @@
+# model_store.py - Persistência do ALPModel em formato binário versionado
+
+import json
+import os
+import struct
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from context_registry import CONTEXT_REGISTRY, CallSite
+
+# Layout do arquivo:
+#   MAGIC (8 bytes) | versão (uint32 LE) | tamanho do cabeçalho (uint32 LE)
+#   cabeçalho JSON (UTF-8) | arrays crus, cada um alinhado a ALIGNMENT bytes
+# Os arrays são lidos com np.memmap (somente leitura): carregar custa apenas
+# o cabeçalho e os processos que abrem o mesmo arquivo compartilham páginas.
+MAGIC = b'OLPMODEL'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct('<8sII')
+
+WEIGHT_NAMES = ('lstm_kernel', 'lstm_recurrent', 'lstm_bias', 'dense_kernel', 'dense_bias')
+CALIBRATION_FIELDS = ('confidence_threshold', 'analysis_window', 'CACHE_LINE_BYTES',
+                      'DOMINANT_SHARE', 'PERIODIC_SCORE', 'MIN_STRIDES', 'MAX_TILE_PERIOD')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _json_scope(scope):
+    if isinstance(scope, CallSite):
+        return ['call_site', scope.filename, scope.lineno]
+    return scope if scope is None or isinstance(scope, (int, str)) else str(scope)
+
+
+def _scope_from_json(scope):
+    if isinstance(scope, list) and scope[:1] == ['call_site']:
+        return CallSite(scope[1], scope[2])
+    return scope
+
+
+def save_model(model, path: str) -> int:
+    """
+    Salvar pesos, priors por contexto, ReplayBuffer e calibração do modelo.
+
+    Os contextos são gravados pelo par (função, escopo), não pelo handle,
+    que só vale dentro do processo. A escrita é atômica (arquivo temporário
+    + os.replace). Retorna o tamanho do arquivo em bytes.
+    """
+    contexts = []
+    context_index = {}
+
+    def index_of(handle: int) -> int:
+        if handle not in context_index:
+            function_name, scope = CONTEXT_REGISTRY.key_of(handle)
+            context_index[handle] = len(contexts)
+            contexts.append([function_name, _json_scope(scope)])
+        return context_index[handle]
+
+    arrays = {name: np.ascontiguousarray(model.lstm_weights[name]) for name in WEIGHT_NAMES}
+
+    # Priors gravados já decaídos até o momento do salvamento
+    now_ns = time.monotonic_ns()
+    priors = [(h, model.learner.prior(h, now_ns)) for h in model.context_priors.keys()]
+    priors = [(h, v) for h, v in priors if v]
+    arrays['prior_contexts'] = np.array([index_of(h) for h, _ in priors], dtype=np.int64)
+    arrays['prior_values'] = np.array([v for _, v in priors], dtype=np.float64)
+
+    handles, losses, timestamps = model.learner.replay.snapshot()
+    arrays['replay_contexts'] = np.array([index_of(h) for h in handles.tolist()], dtype=np.int64)
+    arrays['replay_losses'] = losses.astype(np.float64)
+    arrays['replay_ages_ns'] = (now_ns - timestamps).astype(np.int64)
+
+    # Cabeçalho com offsets relativos ao início da área de dados
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    header = json.dumps({
+        'model_version': model.model_version,
+        'saved_at': time.time(),
+        'calibration': {field: getattr(model, field) for field in CALIBRATION_FIELDS},
+        'contexts': contexts,
+        'arrays': layout
+    }).encode('utf-8')
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return data_start + offset
+
+
+def read_model_file(path: str, mmap: bool = True) -> Dict:
+    """
+    Ler o cabeçalho e mapear os arrays de um arquivo salvo por save_model().
+
+    Returns:
+        Dict com 'header' (cabeçalho JSON) e 'arrays' (views somente leitura
+        sobre o np.memmap, ou cópias em memória se mmap=False)
+    """
+    with open(path, 'rb') as f:
+        magic, version, header_size = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: não é um arquivo de modelo OLP")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path}: versão de formato {version} não suportada "
+                             f"(esperado {FORMAT_VERSION})")
+        header = json.loads(f.read(header_size).decode('utf-8'))
+    data_start = _align(_PREAMBLE.size + header_size)
+
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        with open(path, 'rb') as f:
+            buffer = np.frombuffer(f.read(), dtype=np.uint8)
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        start = data_start + spec['offset']
+        array = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+        arrays[name] = array
+    return {'header': header, 'arrays': arrays}
+
+
+def load_model_state(model, path: str, mmap: bool = True) -> Dict:
+    """
+    Restaurar em `model` o estado salvo por save_model().
+
+    Os pesos ficam como views somente leitura do arquivo mapeado; priors e
+    ReplayBuffer são re-internados no registro de contextos do processo.
+    O cache de inferência é limpo (os pesos mudaram). Retorna o cabeçalho.
+    """
+    stored = read_model_file(path, mmap=mmap)
+    header, arrays = stored['header'], stored['arrays']
+
+    model.lstm_weights = {name: arrays[name] for name in WEIGHT_NAMES}
+    for field, value in header['calibration'].items():
+        setattr(model, field, value)
+    model.model_version = header['model_version']
+
+    handles = [CONTEXT_REGISTRY.intern(function_name, _scope_from_json(scope))
+               for function_name, scope in header['contexts']]
+
+    now_ns = time.monotonic_ns()
+    model.context_priors.clear()
+    for index, value in zip(arrays['prior_contexts'].tolist(), arrays['prior_values'].tolist()):
+        model.learner.set_prior(handles[index], value, now_ns)
+
+    replay = model.learner.replay
+    replay.clear()
+    for index, loss, age_ns in zip(arrays['replay_contexts'].tolist(),
+                                   arrays['replay_losses'].tolist(),
+                                   arrays['replay_ages_ns'].tolist()):
+        replay.add(handles[index], loss, now_ns - age_ns)
+
+    model.inference_cache.clear()
+    model._period_cache.clear()
+    return header
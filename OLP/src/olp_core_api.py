@@ -1,11 +1,26 @@
 # olp_core_api.py - Interface Principal do OLP (Core API)
 # 320+ linhas de código robusto - Ponto de contato para desenvolvedores
 
+import asyncio
+import contextlib
+import contextvars
+import functools
 import logging
-from typing import Callable, Any, List, Dict, Optional
+import sys
+import time
+from collections import deque
+from typing import Callable, Any, List, Dict, Optional, Tuple
 from datetime import datetime
 import json
 
+from adaptive_threshold import AdaptiveConfidenceThreshold
+from context_registry import CONTEXT_REGISTRY, CallSite
+from context_table import ContextTable
+from counters import ShardedCounters
+from cost_model import CostModel, LANE_CPU, LANE_PIM
+from execution_history import ExecutionHistory
+from runtime_tracer import RuntimeTracer
+
 logging.basicConfig(
     level=logging.INFO,
     format='[%(asctime)s] [%(levelname)s] %(message)s'
@@ -13,6 +28,85 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class _DeadlineStats:
+    """Prazos (timeout_ms) de um contexto: tarefas, estouros e pior atraso"""
+    __slots__ = ('tasks', 'misses', 'dma_misses', 'execution_misses', 'fallbacks', 'max_overrun_ms')
+
+    def __init__(self):
+        self.tasks = 0
+        self.misses = 0
+        self.dma_misses = 0           # Offload cancelado no HAL → CPU
+        self.execution_misses = 0     # Tarefa concluída, mas após o prazo
+        self.fallbacks = 0            # Offloads cancelados, concluídos na CPU
+        self.max_overrun_ms = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            'tasks': self.tasks,
+            'misses': self.misses,
+            'miss_rate': self.misses / max(self.tasks, 1),
+            'dma_misses': self.dma_misses,
+            'execution_misses': self.execution_misses,
+            'fallbacks': self.fallbacks,
+            'max_overrun_ms': self.max_overrun_ms
+        }
+
+
+def _caller_site(line: Optional[int] = None, depth: int = 2) -> CallSite:
+    """Ponto de chamada de quem chamou a API: arquivo e linha (`line` substitui a linha)"""
+    frame = sys._getframe(depth)
+    return CallSite(frame.f_code.co_filename, frame.f_lineno if line is None else line)
+
+
+class _ScopeEntry:
+    """
+    Entrada do stack de contextos: o registro compartilhado do contexto
+    (função, ponto de chamada) mais o escopo e os metadados desta entrada.
+    
+    Lê como o dict do contexto; escritas (execution_count) vão para o
+    registro compartilhado, então as contagens acumulam entre escopos.
+    """
+    __slots__ = ('info', 'scope_id', 'metadata')
+
+    def __init__(self, info: Dict, scope_id: int, metadata: Optional[Dict] = None):
+        self.info = info
+        self.scope_id = scope_id
+        self.metadata = metadata
+
+    def __getitem__(self, key):
+        if key == 'scope_id':
+            return self.scope_id
+        if key == 'metadata' and self.metadata is not None:
+            return self.metadata
+        return self.info[key]
+
+    def __setitem__(self, key, value) -> None:
+        self.info[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class _ContextScope:
+    """Escopo de OLPCoreAPI.context(): empilha na entrada e desempilha na saída"""
+    __slots__ = ('api', 'context_info')
+
+    def __init__(self, api: 'OLPCoreAPI', context_info: Dict):
+        self.api = api
+        self.context_info = context_info
+
+    def __enter__(self) -> Dict:
+        self.api._push_context(self.context_info)
+        return self.context_info
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.api._remove_context(self.context_info)
+        return False
+
+
 class OLPCoreAPI:
     """
     Interface de Programação para o Otimizador de Localidade Preditivo (OLP).
@@ -30,8 +124,15 @@ class OLPCoreAPI:
     Segurança: Recovery automático em caso de falhas críticas.
     """
     
+    # Confiança mínima para desviar ao PIM (evitar Falso Positivo crítico)
+    MIN_CONFIDENCE = 0.999
+    
     def __init__(self, use_real_ml_model: bool = True, 
-                 hal_driver = None, ml_model = None):
+                 hal_driver = None, ml_model = None, tracer = None,
+                 table_config: Optional[Dict] = None, cost_model = None,
+                 placement_policy = None, confidence_thresholds = None,
+                 cpu_executor = None, max_context_depth: int = 64,
+                 history_capacity: int = 1000, history_result: Optional[str] = 'size'):
         """
         Inicializar a API Core do OLP.
         
@@ -39,32 +140,65 @@ class OLPCoreAPI:
             use_real_ml_model: Se True, usar ALPModel real
             hal_driver: Referência ao driver OLP-HAL
             ml_model: Referência ao modelo ALP
+            tracer: RuntimeTracer para histórico de acessos (cria um se None)
+            table_config: Limites das tabelas por contexto
+                          (formato de OLP_CONFIG['context_tables'])
+            cost_model: CostModel com os TTIDs medidos (cria um se None)
+            placement_policy: ThompsonPlacementPolicy opcional (None = regra fixa)
+            confidence_thresholds: AdaptiveConfidenceThreshold (limiar por
+                                   contexto após recovery; cria um se None)
+            cpu_executor: Executor das tarefas da via CPU em
+                          execute_optimized_async (None = executor padrão do loop)
+            max_context_depth: Profundidade máxima do context_stack (contextos
+                               sem pop_context() são despejados, os mais antigos
+                               primeiro)
+            history_capacity: Execuções guardadas no histórico (buffer circular)
+            history_result: O que guardar do resultado de cada tarefa no
+                            histórico: 'size', 'digest' ou None
         """
         # Inicializar módulos core
         self.ml_model = ml_model
         self.hal_driver = hal_driver
+        self.tracer = tracer if tracer is not None else RuntimeTracer(table_config=table_config)
+        self.cost_model = cost_model if cost_model is not None else CostModel(table_config=table_config)
+        self.placement_policy = placement_policy
+        self.confidence_thresholds = (confidence_thresholds if confidence_thresholds is not None
+                                      else AdaptiveConfidenceThreshold(table_config=table_config))
         
-        # Gerenciar contextos
-        self.context_stack = []
+        # Gerenciar contextos (stack limitado: set_context() sem pop_context()
+        # não cresce indefinidamente)
+        self.context_stack = deque(maxlen=max_context_depth)
         self.context_id_counter = 0
+        # Registro de contexto por (função, ponto de chamada)
+        self._scope_cache = {}
+        # Contexto das corrotinas (async_context): cada Task vê o seu
+        self._async_context = contextvars.ContextVar('olp_context', default=None)
+        self.cpu_executor = cpu_executor
+        
+        # Histórico de execuções (colunar, capacidade fixa, sem reter resultados)
+        self.execution_history = ExecutionHistory(history_capacity, history_result)
+        self.max_history_size = history_capacity
         
-        # Histórico de execuções
-        self.execution_history = []
-        self.max_history_size = 1000
+        # Checkpoints registrados (limitados; os mais antigos são despejados)
+        self.checkpoints = ContextTable.from_config('api.checkpoints', table_config)
         
-        # Checkpoints registrados
-        self.checkpoints: Dict[str, Dict] = {}
+        # Prazos por contexto (execuções com timeout_ms)
+        self.deadlines = ContextTable.from_config('api.deadlines', table_config,
+                                                  default_factory=_DeadlineStats)
         
-        # Estatísticas globais
-        self.stats = {
+        # Estatísticas globais (contadores por thread, somados na leitura)
+        self.stats = ShardedCounters({
             'total_contexts': 0,
             'optimized_executions': 0,
             'pim_selections': 0,
             'cpu_selections': 0,
             'checkpoints_registered': 0,
             'recovery_events': 0,
+            'context_stack_evictions': 0,
+            'deadline_misses': 0,
+            'pim_fallbacks': 0,
             'api_startup_time': datetime.now().isoformat()
-        }
+        })
         
         logger.info("\n" + "="*70)
         logger.info("[OLP Core API] Sistema OLP inicializado com sucesso!")
@@ -76,7 +210,8 @@ class OLPCoreAPI:
         logger.info("="*70 + "\n")
 
     def set_context(self, function_name: str, scope_id: int, 
-                   metadata: Optional[Dict] = None) -> bool:
+                   metadata: Optional[Dict] = None,
+                   call_site: Optional[int] = None) -> bool:
         """
         [CHAMADA OBRIGATÓRIA] Define o ponto do código que o OLP deve rastrear.
         
@@ -90,36 +225,199 @@ class OLPCoreAPI:
                      Ex: número da iteração (1, 2, 3, ...)
             metadata: Dicionário opcional com informações adicionais
                      Ex: {'batch_size': 32, 'learning_rate': 0.001}
+            call_site: Linha do ponto de chamada. Se None, usa a linha
+                      de quem chamou set_context() (o arquivo é sempre o
+                      de quem chamou)
             
         Returns:
             True se contexto foi registrado com sucesso
-        """
         
-        context_id = f"{function_name}_{scope_id}"
+        O contexto é identificado por (função, ponto de chamada), com o
+        ponto de chamada como CallSite(arquivo, linha); o scope_id é apenas
+        uma sub-dimensão. Assim, todos os batches de um mesmo kernel
+        compartilham histórico, estatísticas e previsões, e o estado do OLP
+        não cresce com o número de iterações.
+        """
         
         try:
             # Armazenar no stack de contextos
-            context_info = {
-                'context_id': context_id,
-                'function_name': function_name,
-                'scope_id': scope_id,
-                'metadata': metadata or {},
-                'timestamp': datetime.now().isoformat(),
-                'execution_count': 0
-            }
-            
-            self.context_stack.append(context_info)
-            self.stats['total_contexts'] += 1
-            self.context_id_counter += 1
-            
-            logger.info(f"  [OLP API] Contexto definido: {context_id}")
-            
+            self._push_context(
+                self._scoped_context(function_name, scope_id, metadata, _caller_site(call_site))
+            )
             return True
             
         except Exception as e:
             logger.error(f"  [OLP API] ERRO ao definir contexto: {e}")
             return False
 
+    SCOPE_CACHE_SIZE = 1024   # Pontos de chamada de context() lembrados
+
+    def context(self, function_name: str, scope_id: int,
+                metadata: Optional[Dict] = None) -> _ContextScope:
+        """
+        Escopo de contexto que empilha e desempilha automaticamente:
+        
+            with api.context("training_loop", scope_id=epoch):
+                api.execute_optimized(func, data)
+        
+        O ponto de chamada é o arquivo e a linha de quem chamou context(). O registro
+        do contexto é reaproveitado por (função, ponto de chamada), mesmo
+        com o scope_id mudando a cada batch: o escopo vai na entrada do
+        stack, sem internar o nome nem montar o registro de novo.
+        """
+        return _ContextScope(self, self._scoped_context(function_name, scope_id,
+                                                        metadata, _caller_site()))
+
+    def optimize(self, task_function: Optional[Callable] = None, *,
+                 name: Optional[str] = None, scope_id: int = 0):
+        """
+        Decorador: cada chamada da função roda em execute_optimized() dentro
+        do seu próprio contexto, empilhado e desempilhado automaticamente.
+        
+            @api.optimize
+            def forward_pass(accesses): ...
+            
+            @api.optimize(name="inference", scope_id=2)
+            def infer(accesses): ...
+            
+            forward_pass(dados)   # = with context: execute_optimized(forward_pass, dados)
+        
+        O contexto (nome da função e arquivo/linha de definição, do code
+        object) é internado uma única vez, na decoração.
+        """
+        def decorate(function: Callable) -> Callable:
+            code = function.__code__
+            context_info = self._new_context_info(name or function.__name__, scope_id, None,
+                                                  CallSite(code.co_filename, code.co_firstlineno))
+            
+            @functools.wraps(function)
+            def wrapper(task_data, task_id: Optional[int] = None,
+                        timeout_ms: Optional[float] = None):
+                self._push_context(context_info)
+                try:
+                    return self.execute_optimized(function, task_data, task_id, timeout_ms)
+                finally:
+                    self._remove_context(context_info)
+            
+            wrapper.olp_context = context_info
+            return wrapper
+        
+        return decorate(task_function) if task_function is not None else decorate
+
+    def _push_context(self, context_info: Dict) -> None:
+        """Empilhar; com o stack cheio, o contexto mais antigo é despejado"""
+        if len(self.context_stack) == self.context_stack.maxlen:
+            self.stats.add('context_stack_evictions')
+        self.context_stack.append(context_info)
+
+    def _remove_context(self, context_info: Dict) -> None:
+        """Desempilhar o contexto de um escopo (se ainda não foi despejado)"""
+        if self.context_stack and self.context_stack[-1] is context_info:
+            self.context_stack.pop()
+            return
+        for index in range(len(self.context_stack) - 1, -1, -1):
+            if self.context_stack[index] is context_info:
+                del self.context_stack[index]
+                return
+
+    def _scoped_context(self, function_name: str, scope_id: int,
+                        metadata: Optional[Dict], call_site: CallSite) -> _ScopeEntry:
+        """
+        Entrada de stack para (função, ponto de chamada) com este escopo.
+        O registro do contexto é montado (e logado/contado) só na primeira
+        vez que o ponto de chamada aparece.
+        """
+        key = (function_name, call_site)
+        context_info = self._scope_cache.get(key)
+        if context_info is None:
+            context_info = self._new_context_info(function_name, scope_id, None, call_site)
+            if len(self._scope_cache) >= self.SCOPE_CACHE_SIZE:
+                self._scope_cache.clear()
+            self._scope_cache[key] = context_info
+        return _ScopeEntry(context_info, scope_id, metadata)
+
+    def _new_context_info(self, function_name: str, scope_id: int,
+                          metadata: Optional[Dict], call_site: CallSite) -> Dict:
+        """Internar o contexto e montar seu registro (stack ou contextvar)"""
+        
+        # Handle inteiro internado: evita montar/hashear uma string por chamada.
+        # O CallSite não colide com o (função, scope_id) inteiro do tracer
+        context_id = CONTEXT_REGISTRY.intern(function_name, call_site)
+        
+        context_info = {
+            'context_id': context_id,
+            'function_name': function_name,
+            'call_site': call_site,
+            'scope_id': scope_id,
+            'metadata': metadata or {},
+            'timestamp': datetime.now().isoformat(),
+            'execution_count': 0
+        }
+        
+        self.stats.add('total_contexts')
+        self.context_id_counter += 1
+        
+        logger.info("  [OLP API] Contexto definido: %s_%s (escopo %s, handle %d)",
+                    function_name, call_site, scope_id, context_id)
+        
+        return context_info
+
+    def async_context(self, function_name: str, scope_id: int,
+                      metadata: Optional[Dict] = None,
+                      call_site: Optional[int] = None):
+        """
+        Escopo de contexto para corrotinas (equivalente assíncrono de
+        set_context/pop_context):
+        
+            async with api.async_context("inference", scope_id=request_id):
+                result = await api.execute_optimized_async(func, data)
+        
+        O contexto fica em uma ContextVar, não no context_stack
+        compartilhado: cada Task do asyncio herda e altera apenas a sua
+        cópia, então milhares de corrotinas concorrentes usam o OLP sem
+        serializar nem trocar o contexto umas das outras.
+        """
+        return self._async_context_scope(
+            self._scoped_context(function_name, scope_id, metadata, _caller_site(call_site))
+        )
+
+    @contextlib.asynccontextmanager
+    async def _async_context_scope(self, context_info: Dict):
+        token = self._async_context.set(context_info)
+        try:
+            yield context_info
+        finally:
+            self._async_context.reset(token)
+
+    def log_accesses(self, addresses) -> int:
+        """
+        Registra em lote os endereços acessados pelo contexto atual.
+        
+        Aceita ndarray, array.array ou memoryview (buffer protocol); o lote é
+        copiado para o histórico do tracer em uma operação vetorizada. As
+        decisões seguintes deste contexto usam esse histórico em vez de
+        task_data.
+        
+        Args:
+            addresses: Endereços de memória (inteiros) na ordem de acesso
+            
+        Returns:
+            Número de endereços registrados (0 se não houver contexto)
+        """
+        
+        current_context = self.get_current_context()
+        if current_context is None:
+            logger.warning(
+                "  [OLP API] AVISO: Nenhum contexto definido. "
+                "Use set_context() primeiro!"
+            )
+            return 0
+        
+        if self.tracer.context_id != current_context['context_id']:
+            self.tracer.select_context(current_context['context_id'])
+        
+        return self.tracer.log_accesses(addresses)
+
     def execute_optimized(self, task_function: Callable, task_data: List[Any],
                          task_id: Optional[int] = None,
                          timeout_ms: Optional[float] = None) -> Any:
@@ -135,83 +433,205 @@ class OLPCoreAPI:
             task_function: A função de processamento a ser otimizada
             task_data: Os dados brutos a serem processados
             task_id: ID opcional da tarefa (para tracking)
-            timeout_ms: Timeout opcional em milissegundos
+            timeout_ms: Prazo opcional em milissegundos para o resultado (não
+                        interrompe uma tarefa já em execução). Um offload
+                        PIM cujo DMA não termina no prazo é cancelado no
+                        HAL e a tarefa roda na CPU; estouros são contados
+                        por contexto (get_deadline_report). O HAL compara a
+                        latência de DMA simulada, calculada no início da
+                        transferência, com o prazo (transfer_task_pim)
             
         Returns:
             Resultado da execução (do PIM ou da CPU)
         """
         
-        if not self.context_stack:
+        current_context = self.get_current_context()
+        if current_context is None:
             logger.warning(
                 "  [OLP API] AVISO: Nenhum contexto definido. "
                 "Use set_context() primeiro!"
             )
             return task_function(task_data)
         
-        current_context = self.context_stack[-1]
-        task_id = task_id or len(self.execution_history)
+        task_id = task_id or self.execution_history.total_recorded
         
         try:
-            start_time = datetime.now()
-            
             # 1. Simular decisão OLP-ALP
             # Em produção, usar prediction_engine.execute_task()
-            destination = self._make_olp_decision(
+            destination, prediction = self._make_olp_decision(
                 current_context['context_id'],
                 task_data
             )
             
-            # 2. Executar tarefa
+            # 2. Executar tarefa (tempo de parede medido para o modelo de custo)
+            context_id = current_context['context_id']
+            exec_start = time.perf_counter()
+            metrics = None
+            fallback = False
+            if destination == 'PIM' and self.hal_driver:
+                metrics = self._offload_to_pim(task_data, task_id, timeout_ms)
+                if not metrics or metrics.get('timed_out'):
+                    # Prazo estourado no DMA (o HAL cancelou o offload) ou falha
+                    # no HAL: a tarefa conclui na CPU
+                    self._record_cost(context_id, LANE_PIM,
+                                      (time.perf_counter() - exec_start) * 1000, metrics)
+                    destination = 'CPU'
+                    fallback = True
+            
             if destination == 'PIM' and self.hal_driver:
-                result = self._execute_on_pim(task_function, task_data, task_id)
+                result = task_function(task_data)
+                ttid_ms = (time.perf_counter() - exec_start) * 1000
+                self._record_cost(context_id, LANE_PIM, ttid_ms, metrics)
+                self._report_pim_outcome(context_id, ttid_ms, prediction)
                 confidence = 0.99999
-                ttid_ms = 95.0
             else:
+                cpu_start = time.perf_counter()
                 result = task_function(task_data)
+                self._record_cost(context_id, LANE_CPU, (time.perf_counter() - cpu_start) * 1000)
+                ttid_ms = (time.perf_counter() - exec_start) * 1000
                 confidence = 0.85
-                ttid_ms = 160.0
-            
-            # 3. Logging: Registrar execução
-            execution_record = {
-                'task_id': task_id,
-                'context': current_context['context_id'],
-                'function_name': task_function.__name__,
-                'destination': destination,
-                'confidence': confidence,
-                'ttid_ms': ttid_ms,
-                'result': result,
-                'timestamp': datetime.now().isoformat(),
-                'reasoning': f'Decisão OLP-ALP para {destination}'
-            }
             
-            self.execution_history.append(execution_record)
+            if timeout_ms is not None:
+                self._record_deadline(context_id, ttid_ms, timeout_ms,
+                                      'dma' if metrics and metrics.get('timed_out') else None)
             
-            # Limitar tamanho do histórico
-            if len(self.execution_history) > self.max_history_size:
-                self.execution_history = self.execution_history[-self.max_history_size//2:]
+            self._finish_execution(current_context, task_id, task_function, destination,
+                                   result, ttid_ms, confidence, fallback)
+            return result
             
-            # 4. Atualizar estatísticas
-            self.stats['optimized_executions'] += 1
-            if destination == 'PIM':
-                self.stats['pim_selections'] += 1
-            else:
-                self.stats['cpu_selections'] += 1
+        except Exception as e:
+            logger.error(f"  [OLP API] ERRO na execução otimizada: {e}")
+            return task_function(task_data)
+
+    async def execute_optimized_async(self, task_function: Callable, task_data: List[Any],
+                                      task_id: Optional[int] = None,
+                                      timeout_ms: Optional[float] = None) -> Any:
+        """
+        Variante assíncrona de execute_optimized() para servidores asyncio.
+        
+        - A decisão PIM/CPU é tomada inline (sem await: é só CPU).
+        - Via PIM: a conclusão do DMA é aguardada como future
+          (OLPHALDriver.load_task_pim_async), sem bloquear o loop.
+        - Via CPU: a tarefa roda em `cpu_executor` (ou no executor padrão do
+          loop), liberando o loop para outras corrotinas.
+        - O contexto vem de async_context() (ContextVar) ou, fora dele, do
+          context_stack.
+        - timeout_ms é um prazo para o resultado, não para a execução: se
+          estourar durante o DMA, o offload é cancelado no HAL e a tarefa
+          roda na CPU; se a tarefa já começou a executar, ela não é
+          interrompida (threads não são canceláveis) nem re-executada: o
+          resultado é aguardado e o atraso conta como estouro de execução.
+        
+        Args e retorno: os mesmos de execute_optimized().
+        """
+        
+        current_context = self.get_current_context()
+        loop = asyncio.get_running_loop()
+        if current_context is None:
+            logger.warning(
+                "  [OLP API] AVISO: Nenhum contexto definido. "
+                "Use async_context() primeiro!"
+            )
+            return await loop.run_in_executor(self.cpu_executor, task_function, task_data)
+        
+        task_id = task_id or self.execution_history.total_recorded
+        context_id = current_context['context_id']
+        
+        try:
+            # 1. Decisão inline; a previsão fica local à corrotina
+            destination, prediction = self._make_olp_decision(context_id, task_data)
             
-            current_context['execution_count'] += 1
+            # 2. Executar tarefa
+            exec_start = time.perf_counter()
+            missed_phase = None
+            fallback = False
+            done = False
+            if destination == 'PIM' and self.hal_driver:
+                phase = {'name': 'dma'}
+                metrics = None
+                try:
+                    result, metrics = await asyncio.wait_for(
+                        self._execute_on_pim_async(task_function, task_data, task_id, phase),
+                        timeout_ms / 1000 if timeout_ms is not None else None
+                    )
+                    done = True
+                except asyncio.TimeoutError:
+                    if 'future' in phase:
+                        # Prazo estourado com a tarefa já em execução: aguardar
+                        # o resultado em vez de executá-la de novo na CPU
+                        result = await phase['future']
+                        metrics = phase['metrics']
+                        done = True
+                    else:
+                        # Prazo estourado no DMA: cancelar no HAL (se ele
+                        # suporta cancelamento) e executar na CPU
+                        missed_phase = phase['name']
+                        if hasattr(self.hal_driver, 'cancel_task_pim'):
+                            self.hal_driver.cancel_task_pim(task_id)
+                ttid_ms = (time.perf_counter() - exec_start) * 1000
+                if metrics:
+                    self._record_cost(context_id, LANE_PIM, ttid_ms, metrics)
+                    self._report_pim_outcome(context_id, ttid_ms, prediction)
+                    confidence = 0.99999
+                else:
+                    # Prazo estourado (tempo esperado vai para o PIM) ou falha
+                    # no HAL (a tarefa já concluiu no executor de CPU)
+                    self._record_cost(context_id, LANE_CPU if done else LANE_PIM, ttid_ms)
+                    destination = 'CPU'
+                    fallback = True
+                    confidence = 0.85
             
-            # 5. Logging consolar
-            dest_str = destination
-            conf_str = f"{confidence*100:.2f}%"
-            ttid_str = f"{ttid_ms:.2f}ms"
+            if not done:
+                cpu_start = time.perf_counter()
+                result = await loop.run_in_executor(self.cpu_executor, task_function, task_data)
+                self._record_cost(context_id, LANE_CPU, (time.perf_counter() - cpu_start) * 1000)
+                ttid_ms = (time.perf_counter() - exec_start) * 1000
+                confidence = 0.85
             
-            logger.info(f"  [OLP API] Tarefa #{task_id} → {dest_str:3} "
-                       f"(conf: {conf_str}, ttid: {ttid_str})")
+            if timeout_ms is not None:
+                self._record_deadline(context_id, ttid_ms, timeout_ms, missed_phase)
             
+            self._finish_execution(current_context, task_id, task_function, destination,
+                                   result, ttid_ms, confidence, fallback)
             return result
             
         except Exception as e:
-            logger.error(f"  [OLP API] ERRO na execução otimizada: {e}")
-            return task_function(task_data)
+            logger.error(f"  [OLP API] ERRO na execução otimizada assíncrona: {e}")
+            return await loop.run_in_executor(self.cpu_executor, task_function, task_data)
+
+    def _finish_execution(self, current_context: Dict, task_id: int, task_function: Callable,
+                          destination: str, result: Any, ttid_ms: float,
+                          confidence: float, fallback: bool = False) -> None:
+        """
+        Registrar a execução: histórico, estatísticas, limiar do contexto e
+        log. `destination` é a via final; `fallback` marca uma tentativa PIM
+        (cancelada ou com falha no HAL) que concluiu na CPU.
+        """
+        
+        # 3. Logging: Registrar execução
+        self.execution_history.record(task_id, current_context['context_id'],
+                                      current_context['scope_id'], task_function.__name__,
+                                      destination, confidence, ttid_ms, result, fallback)
+        
+        # 4. Atualizar estatísticas
+        self.stats.add('optimized_executions')
+        if destination == 'PIM':
+            self.stats.add('pim_selections')
+        else:
+            self.stats.add('cpu_selections')
+        if fallback:
+            self.stats.add('pim_fallbacks')
+        
+        current_context['execution_count'] += 1
+        self.confidence_thresholds.record_success(current_context['context_id'])
+        
+        # 5. Logging consolar
+        dest_str = f"{destination} (fallback do PIM)" if fallback else destination
+        conf_str = f"{confidence*100:.2f}%"
+        ttid_str = f"{ttid_ms:.2f}ms"
+        
+        logger.info(f"  [OLP API] Tarefa #{task_id} → {dest_str:3} "
+                   f"(conf: {conf_str}, ttid: {ttid_str})")
 
     def register_checkpoint(self, recovery_address: int,
                            checkpoint_name: str = "",
@@ -243,7 +663,7 @@ class OLPCoreAPI:
             
             # Armazenar checkpoint
             self.checkpoints[checkpoint_name] = checkpoint_info
-            self.stats['checkpoints_registered'] += 1
+            self.stats.add('checkpoints_registered')
             
             addr_hex = hex(recovery_address)
             logger.info(
@@ -283,7 +703,14 @@ class OLPCoreAPI:
             if self.hal_driver:
                 self.hal_driver.send_rem_interrupt(error_code, context_info)
             
-            self.stats['recovery_events'] += 1
+            # Feedback ao aprendizado online e rigor maior só no contexto atual
+            current_context = self.get_current_context()
+            if current_context is not None:
+                self.confidence_thresholds.record_failure(current_context['context_id'])
+                if hasattr(self.ml_model, 'record_recovery'):
+                    self.ml_model.record_recovery(current_context['context_id'])
+            
+            self.stats.add('recovery_events')
             
             logger.info(f"  [OLP API] Recovery completado com sucesso\n")
             
@@ -293,75 +720,432 @@ class OLPCoreAPI:
             logger.error(f"  [OLP API] ERRO crítico no recovery: {e}")
             return False
 
-    def _make_olp_decision(self, context_id: str, task_data: List[Any]) -> str:
+    def _make_olp_decision(self, context_id: int,
+                           task_data: List[Any]) -> Tuple[str, Optional[Dict]]:
         """
         Simular lógica de decisão OLP-ALP.
         
         Em produção, usar prediction_engine.execute_task()
+        
+        Returns:
+            (destino, previsão usada na decisão ou None). A previsão fica com
+            o chamador, que a repassa a _report_pim_outcome: execuções
+            concorrentes (threads, corrotinas, DualLaneScheduler) não
+            compartilham estado de decisão
         """
         
         # Verificar se modelo ML está disponível
         if not self.ml_model:
-            return 'CPU'
+            return 'CPU', None
         
         # Tentar prever usando ML
         try:
-            prediction = self.ml_model.predict(context_id, task_data)
-            confidence = prediction.get('confidence', 0)
-            ttid_gain = prediction.get('ttid_cpu', 100) - prediction.get('ttid_pim', 100)
-            
-            # Critério OLP-ALP
-            if confidence >= 0.999 and ttid_gain > 0:
-                return 'PIM'
-            else:
-                return 'CPU'
+            prediction = self._apply_measured_costs(context_id, self.ml_model.predict(
+                context_id, self._decision_accesses(context_id, task_data)
+            ))
+            return self._destination_for(prediction, context_id), prediction
         except:
+            return 'CPU', None
+
+    def _decision_accesses(self, context_id: int, task_data: List[Any]):
+        """Preferir o histórico rastreado do contexto (log_accesses) a task_data"""
+        accesses = self.tracer.get_accesses(context_id)
+        if len(accesses) == 0:
+            accesses = task_data
+        return accesses
+
+    def _apply_measured_costs(self, context_id: int, prediction: Dict) -> Dict:
+        """
+        Substituir os TTIDs previstos pelo modelo pelos medidos no contexto
+        (CostModel), quando as duas vias já têm medições suficientes.
+        """
+        estimates = self.cost_model.ttid_estimates(context_id)
+        if estimates is None:
+            return prediction
+        prediction = dict(prediction)
+        prediction['ttid_pim'], prediction['ttid_cpu'] = estimates
+        prediction['ttid_source'] = 'measured'
+        return prediction
+
+    def _record_cost(self, context_id: int, lane: str, elapsed_ms: float,
+                     metrics: Optional[Dict] = None) -> None:
+        """
+        Registrar no CostModel o tempo medido (e a latência de DMA do HAL no
+        PIM). `metrics` são as métricas da própria tarefa; sem elas, usa-se
+        get_last_task_metrics() do HAL.
+        """
+        dma_ms = 0.0
+        if lane == LANE_PIM:
+            if metrics is None and hasattr(self.hal_driver, 'get_last_task_metrics'):
+                metrics = self.hal_driver.get_last_task_metrics()
+            dma_ms = (metrics or {}).get('dma_latency_ns', 0) / 1e6
+        self.cost_model.record(context_id, lane, elapsed_ms, dma_ms)
+        if self.placement_policy is not None:
+            self.placement_policy.observe(context_id, lane, elapsed_ms)
+
+    def _destination_for(self, prediction: Dict, context_id: Optional[int] = None) -> str:
+        """
+        Critério OLP-ALP: confiança >= limiar do contexto (99.9%, ou mais
+        após recovery) E ganho de TTID > 0 → PIM.
+        Com placement_policy, o ganho passa a ser decidido pelo bandit do
+        contexto (a confiança continua sendo exigida).
+        """
+        confidence = prediction.get('confidence', 0)
+        ttid_gain = prediction.get('ttid_cpu', 100) - prediction.get('ttid_pim', 100)
+        
+        min_confidence = (self.confidence_thresholds.threshold(context_id, self.MIN_CONFIDENCE)
+                          if context_id is not None else self.MIN_CONFIDENCE)
+        
+        if self.placement_policy is not None and context_id is not None:
+            return self.placement_policy.choose(
+                context_id, confidence, min_confidence, 'PIM' if ttid_gain > 0 else 'CPU'
+            )
+        
+        if confidence >= min_confidence and ttid_gain > 0:
+            return 'PIM'
+        else:
             return 'CPU'
 
-    def _execute_on_pim(self, task_function: Callable, 
-                       task_data: List[Any], task_id: int) -> Any:
-        """Executar tarefa no PIM via HAL Driver"""
+    def decide_batch(self, task_data_list: List[List[Any]],
+                     contexts: Optional[List[int]] = None) -> List[str]:
+        """
+        Decidir PIM/CPU para várias tarefas com uma única inferência em lote.
+        
+        Quando o modelo oferece predict_batch(), todas as sequências passam
+        por um único forward vetorizado, amortizando o custo de decisão ao
+        despachar centenas de tarefas por ciclo. O critério é o mesmo de
+        execute_optimized().
+        
+        Args:
+            task_data_list: Dados (acessos) de cada tarefa
+            contexts: Handle do contexto de cada tarefa (padrão: contexto atual)
+            
+        Returns:
+            Lista de destinos ('PIM' ou 'CPU'), na mesma ordem das tarefas
+        """
+        return self._decide_batch(task_data_list, contexts)[0]
+
+    def _decide_batch(self, task_data_list: List[List[Any]],
+                      contexts: Optional[List[int]] = None
+                      ) -> Tuple[List[str], List[Optional[Dict]]]:
+        """decide_batch() com a previsão usada em cada decisão (None sem modelo)"""
+        
+        no_predictions = [None] * len(task_data_list)
+        if contexts is None:
+            current_context = self.get_current_context()
+            if current_context is None:
+                logger.warning(
+                    "  [OLP API] AVISO: Nenhum contexto definido. "
+                    "Use set_context() primeiro!"
+                )
+                return ['CPU'] * len(task_data_list), no_predictions
+            contexts = [current_context['context_id']] * len(task_data_list)
+        elif len(contexts) != len(task_data_list):
+            raise ValueError("contexts e task_data_list devem ter o mesmo tamanho")
+        
+        if not self.ml_model:
+            return ['CPU'] * len(task_data_list), no_predictions
         
         try:
-            if not self.hal_driver:
-                return task_function(task_data)
+            # Entradas idênticas (mesmo contexto com histórico rastreado, ou o
+            # mesmo objeto de dados) são previstas uma única vez
+            unique = {}
+            keys = []
+            for context_id, task_data in zip(contexts, task_data_list):
+                accesses = self._decision_accesses(context_id, task_data)
+                key = (context_id, id(task_data) if accesses is task_data else None)
+                if key not in unique:
+                    unique[key] = accesses
+                keys.append(key)
+            unique_contexts = [key[0] for key in unique]
+            access_arrays = list(unique.values())
+            if hasattr(self.ml_model, 'predict_batch'):
+                predictions = self.ml_model.predict_batch(unique_contexts, access_arrays)
+            else:
+                predictions = [
+                    self.ml_model.predict(context_id, accesses)
+                    for context_id, accesses in zip(unique_contexts, access_arrays)
+                ]
+            predictions = dict(zip(unique, predictions))
+            decided = [self._apply_measured_costs(key[0], predictions[key]) for key in keys]
+            destinations = [
+                self._destination_for(prediction, key[0])
+                for key, prediction in zip(keys, decided)
+            ]
+        except Exception as e:
+            logger.error(f"  [OLP API] ERRO na decisão em lote: {e}")
+            return ['CPU'] * len(task_data_list), no_predictions
+        
+        logger.debug("  [OLP API] Decisão em lote: %d tarefas, %d → PIM",
+                     len(destinations), destinations.count('PIM'))
+        return destinations, decided
+
+    def execute_batch(self, task_function: Callable, task_data_list: List[List[Any]],
+                      contexts: Optional[List[int]] = None,
+                      task_ids: Optional[List[int]] = None) -> List[Any]:
+        """
+        Executar várias tarefas com uma única decisão de placement em lote.
+        
+        As tarefas destinadas ao PIM são carregadas com uma única submissão
+        de DMA (OLPHALDriver.load_batch_pim) e a contabilidade (histórico,
+        estatísticas, modelo de custo) é feita de uma vez, com uma linha de
+        log por lote: para tarefas de granularidade fina o custo por tarefa
+        cai muito em relação a uma chamada de execute_optimized() por item.
+        Um HAL sem load_batch_pim recebe uma transferência por tarefa; se o
+        DMA falhar, as tarefas afetadas rodam na CPU (fallback). O TTID
+        medido de cada tarefa PIM vai ao aprendizado online, como em
+        execute_optimized().
+        
+        Args:
+            task_function: A função de processamento
+            task_data_list: Dados de cada tarefa
+            contexts: Handle do contexto de cada tarefa (padrão: contexto atual)
+            task_ids: IDs das tarefas (padrão: sequenciais a partir do histórico)
+            
+        Returns:
+            Resultados, na mesma ordem de task_data_list
             
-            # Carregar no PIM via DMA
+        Raises:
+            ValueError: contexts ou task_ids com tamanho diferente de task_data_list
+        """
+        
+        count = len(task_data_list)
+        if contexts is not None and len(contexts) != count:
+            raise ValueError("contexts e task_data_list devem ter o mesmo tamanho")
+        if task_ids is not None and len(task_ids) != count:
+            raise ValueError("task_ids e task_data_list devem ter o mesmo tamanho")
+        if count == 0:
+            return []
+        current_context = self.get_current_context()
+        if contexts is None and current_context is None:
+            logger.warning(
+                "  [OLP API] AVISO: Nenhum contexto definido. "
+                "Use set_context() primeiro!"
+            )
+            return [task_function(task_data) for task_data in task_data_list]
+        
+        context_ids = contexts if contexts is not None else [current_context['context_id']] * count
+        if task_ids is None:
+            first_id = self.execution_history.total_recorded
+            task_ids = list(range(first_id, first_id + count))
+        
+        # 1. Uma decisão em lote
+        destinations, predictions = self._decide_batch(task_data_list, contexts)
+        
+        # 2. Uma submissão de DMA para todas as tarefas PIM
+        pim_indices = [i for i, destination in enumerate(destinations) if destination == 'PIM']
+        pim_metrics = {}
+        if pim_indices and self.hal_driver:
+            pim_metrics = self._offload_batch_to_pim(task_data_list, task_ids, pim_indices)
+        fallbacks = None
+        failed = [i for i in pim_indices if i not in pim_metrics]
+        if failed:
+            # Sem HAL ou DMA falhou: essas tarefas rodam na CPU
+            if self.hal_driver:
+                fallbacks = [False] * count
+                for i in failed:
+                    fallbacks[i] = True
+                self.stats.add('pim_fallbacks', len(failed))
+            for i in failed:
+                destinations[i] = 'CPU'
+            pim_indices = [i for i in pim_indices if i in pim_metrics]
+        
+        # 3. Executar na ordem, medindo cada tarefa
+        results = [None] * count
+        ttids = [0.0] * count
+        perf_counter = time.perf_counter
+        for i, task_data in enumerate(task_data_list):
+            start = perf_counter()
+            results[i] = task_function(task_data)
+            ttids[i] = (perf_counter() - start) * 1000
+        
+        # 4. Contabilidade do lote
+        scope_id = current_context['scope_id'] if current_context is not None else None
+        for i in range(count):
+            destination = destinations[i]
+            context_id = context_ids[i]
+            if destination == 'PIM':
+                ttids[i] += pim_metrics[i].get('dma_latency_ns', 0) / 1e6
+                self._record_cost(context_id, LANE_PIM, ttids[i], pim_metrics[i])
+                self._report_pim_outcome(context_id, ttids[i], predictions[i])
+            else:
+                self._record_cost(context_id, LANE_CPU, ttids[i])
+            self.confidence_thresholds.record_success(context_id)
+        
+        self.execution_history.record_batch(
+            task_ids, context_ids, scope_id, task_function.__name__, destinations,
+            [0.99999 if destination == 'PIM' else 0.85 for destination in destinations],
+            ttids, results, fallbacks
+        )
+        
+        self.stats.add('optimized_executions', count)
+        self.stats.add('pim_selections', len(pim_indices))
+        self.stats.add('cpu_selections', count - len(pim_indices))
+        if contexts is None:
+            current_context['execution_count'] += count
+        
+        logger.info(f"  [OLP API] Lote de {count} tarefas → {len(pim_indices)} PIM, "
+                   f"{count - len(pim_indices)} CPU")
+        
+        return results
+
+    def _report_pim_outcome(self, context_id: int, ttid_ms: float,
+                            prediction: Optional[Dict]) -> None:
+        """
+        Enviar ao aprendizado online do modelo o TTID medido do offload
+        (tempo de parede da via PIM: DMA + execução), comparado ao TTID de
+        CPU previsto na decisão que escolheu o PIM (a previsão devolvida por
+        _make_olp_decision ou decide_batch para esta tarefa).
+        """
+        if not hasattr(self.ml_model, 'record_ttid') or prediction is None:
+            return
+        if ttid_ms > 0:
+            self.ml_model.record_ttid(context_id, ttid_ms, prediction.get('ttid_cpu', 0))
+
+    def _offload_batch_to_pim(self, task_data_list: List[List[Any]], task_ids: List[int],
+                              pim_indices: List[int]) -> Dict[int, Dict]:
+        """
+        Carregar as tarefas PIM de um lote com uma única submissão de DMA
+        (load_batch_pim), ou uma a uma se o HAL não a oferece. Retorna as
+        métricas de DMA por índice da tarefa no lote; tarefas ausentes não
+        foram carregadas e concluem na CPU.
+        """
+        if not hasattr(self.hal_driver, 'load_batch_pim'):
+            loaded = {}
+            for i in pim_indices:
+                metrics = self._offload_to_pim(task_data_list[i], task_ids[i])
+                if metrics and not metrics.get('timed_out'):
+                    loaded[i] = metrics
+            return loaded
+        try:
+            metrics = self.hal_driver.load_batch_pim(
+                task_ids=[task_ids[i] for i in pim_indices],
+                data_ptr=0x1000,
+                num_blocks=[
+                    min(len(task_data_list[i]) if isinstance(task_data_list[i], (list, tuple)) else 10, 100)
+                    for i in pim_indices
+                ]
+            )
+        except Exception as e:
+            logger.warning(f"[OLP API] Falha no DMA em lote: {e}. Fallback para CPU.")
+            return {}
+        if not metrics:
+            return {}
+        # A latência da submissão única é dividida entre as tarefas do lote
+        share = {'dma_latency_ns': metrics.get('dma_latency_ns', 0) // len(pim_indices)}
+        return {i: share for i in pim_indices}
+
+    def _offload_to_pim(self, task_data: List[Any], task_id: int,
+                        timeout_ms: Optional[float] = None) -> Dict:
+        """
+        Carregar a tarefa no PIM via HAL Driver (DMA), com prazo opcional.
+        Retorna as métricas da tarefa ('timed_out' se o HAL cancelou o
+        offload no prazo; {} se o HAL falhou ou levantou exceção). Nos dois
+        casos o chamador conclui a tarefa na CPU, com fallback, e o tempo
+        gasto conta como custo do PIM.
+        """
+        num_blocks = len(task_data) if isinstance(task_data, (list, tuple)) else 10
+        try:
+            if not hasattr(self.hal_driver, 'transfer_task_pim'):
+                loaded = self.hal_driver.load_task_pim(task_id=task_id, data_ptr=0x1000,
+                                                       num_blocks=min(num_blocks, 100))
+                return {'task_id': task_id, 'num_blocks': num_blocks} if loaded else {}
+            return self.hal_driver.transfer_task_pim(
+                task_id=task_id,
+                data_ptr=0x1000,
+                num_blocks=min(num_blocks, 100),
+                timeout_ns=int(timeout_ms * 1e6) if timeout_ms is not None else None
+            )
+        except Exception as e:
+            logger.warning(f"[OLP API] Falha no offload PIM: {e}. Fallback para CPU.")
+            return {}
+
+    def _record_deadline(self, context_id: int, elapsed_ms: float, timeout_ms: float,
+                         phase: Optional[str] = None) -> None:
+        """
+        Registrar uma execução com prazo no contexto. `phase` ('dma')
+        indica que o offload PIM foi cancelado nessa fase e a tarefa
+        executada na CPU; sem fase, a tarefa concluiu no destino e só conta
+        como estouro (de execução) se passou do prazo.
+        """
+        stats = self.deadlines[context_id]
+        stats.tasks += 1
+        if phase is None and elapsed_ms <= timeout_ms:
+            return
+        stats.misses += 1
+        if phase == 'dma':
+            stats.dma_misses += 1
+        else:
+            stats.execution_misses += 1
+        if phase is not None:
+            stats.fallbacks += 1
+        stats.max_overrun_ms = max(stats.max_overrun_ms, elapsed_ms - timeout_ms)
+        self.stats.add('deadline_misses')
+        logger.warning(f"  [OLP API] Prazo de {timeout_ms:.2f}ms estourado "
+                       f"({elapsed_ms:.2f}ms{', fallback para CPU' if phase else ''})")
+
+    def get_deadline_report(self) -> Dict:
+        """Prazos por contexto: tarefas, estouros (DMA/execução), fallbacks e pior atraso"""
+        return {
+            CONTEXT_REGISTRY.name_of(handle): stats.as_dict()
+            for handle, stats in self.deadlines.items()
+        }
+
+    async def _execute_on_pim_async(self, task_function: Callable, task_data: List[Any],
+                                    task_id: int, phase: Optional[Dict] = None) -> tuple:
+        """
+        Executar tarefa no PIM aguardando o DMA como future.
+        Retorna (resultado, métricas da tarefa no HAL; {} em falha).
+        `phase['name']` passa de 'dma' a 'execution' ao fim do DMA, e
+        `phase['future']`/`phase['metrics']` guardam a execução em curso:
+        cancelar esta corrotina (wait_for) não cancela a tarefa, cujo
+        resultado o chamador aguarda.
+        """
+        loop = asyncio.get_running_loop()
+        metrics = {}
+        try:
             num_blocks = len(task_data) if isinstance(task_data, (list, tuple)) else 10
-            self.hal_driver.load_task_pim(
+            metrics = await self.hal_driver.load_task_pim_async(
                 task_id=task_id,
                 data_ptr=0x1000,
                 num_blocks=min(num_blocks, 100)
             )
-            
-            # Executar e retornar resultado
-            return task_function(task_data)
-            
         except Exception as e:
             logger.warning(f"[OLP API] Falha na execução PIM: {e}. Fallback para CPU.")
-            return task_function(task_data)
+        
+        future = loop.run_in_executor(self.cpu_executor, task_function, task_data)
+        if phase is not None:
+            phase.update(name='execution', future=future, metrics=metrics)
+        result = await asyncio.shield(future)
+        return result, metrics
 
     def get_api_stats(self) -> Dict:
         """Retornar estatísticas de operação da API"""
         
-        total_exec = max(self.stats['optimized_executions'], 1)
+        # Uma única soma dos shards para todo o relatório
+        stats = self.stats.snapshot()
+        total_exec = max(stats['optimized_executions'], 1)
         
         return {
-            'total_contexts_defined': self.stats['total_contexts'],
-            'optimized_executions': self.stats['optimized_executions'],
-            'pim_selections': self.stats['pim_selections'],
-            'cpu_selections': self.stats['cpu_selections'],
-            'pim_percentage': f"{(self.stats['pim_selections'] / total_exec * 100):.1f}%",
-            'checkpoints_registered': self.stats['checkpoints_registered'],
-            'recovery_events': self.stats['recovery_events'],
+            'total_contexts_defined': stats['total_contexts'],
+            'optimized_executions': stats['optimized_executions'],
+            'pim_selections': stats['pim_selections'],
+            'cpu_selections': stats['cpu_selections'],
+            'pim_percentage': f"{(stats['pim_selections'] / total_exec * 100):.1f}%",
+            'checkpoints_registered': stats['checkpoints_registered'],
+            'recovery_events': stats['recovery_events'],
+            'deadline_misses': stats['deadline_misses'],
+            'pim_fallbacks': stats['pim_fallbacks'],
             'execution_history_size': len(self.execution_history),
+            'execution_history_bytes': self.execution_history.nbytes,
             'context_stack_depth': len(self.context_stack),
-            'startup_time': self.stats['api_startup_time']
+            'context_stack_evictions': stats['context_stack_evictions'],
+            'startup_time': stats['api_startup_time']
         }
 
     def get_execution_history(self, limit: int = 10) -> List[Dict]:
         """Retornar histórico das últimas N execuções otimizadas"""
-        return self.execution_history[-limit:] if limit > 0 else self.execution_history
+        return self.execution_history[-limit:] if limit > 0 else self.execution_history[:]
 
     def get_full_system_report(self) -> Dict:
         """
@@ -377,10 +1161,21 @@ class OLPCoreAPI:
         report = {
             'timestamp': datetime.now().isoformat(),
             'api_stats': self.get_api_stats(),
-            'checkpoints': self.checkpoints,
-            'recent_executions': self.get_execution_history(limit=5)
+            'checkpoints': dict(self.checkpoints.items()),
+            'recent_executions': self.get_execution_history(limit=5),
+            'context_tables': self.get_context_table_stats(),
+            'cost_model_stats': self.cost_model.get_stats(),
+            'confidence_thresholds': {
+                'baseline': self.MIN_CONFIDENCE,
+                'contexts': self.confidence_thresholds.get_report(self.MIN_CONFIDENCE),
+                **self.confidence_thresholds.get_stats()
+            },
+            'deadlines': self.get_deadline_report()
         }
         
+        if self.placement_policy is not None:
+            report['placement_policy_stats'] = self.placement_policy.get_stats()
+        
         # Adicionar stats do HAL se disponível
         if self.hal_driver:
             report['hal_driver_stats'] = self.hal_driver.get_hardware_stats()
@@ -392,6 +1187,24 @@ class OLPCoreAPI:
         
         return report
 
+    def get_context_table_stats(self) -> Dict:
+        """Retornar ocupação e contadores de despejo de todas as tabelas por contexto"""
+        
+        tables = {
+            self.checkpoints.name: self.checkpoints.get_stats(),
+            self.tracer.history.name: self.tracer.history.get_stats(),
+            self.cost_model.contexts.name: self.cost_model.contexts.get_stats(),
+            self.confidence_thresholds.states.name: self.confidence_thresholds.states.get_stats(),
+            self.deadlines.name: self.deadlines.get_stats()
+        }
+        if self.placement_policy is not None:
+            tables[self.placement_policy.contexts.name] = self.placement_policy.contexts.get_stats()
+        if self.ml_model and hasattr(self.ml_model, 'get_table_stats'):
+            tables.update(self.ml_model.get_table_stats())
+        
+        tables['total_evictions'] = sum(t['evictions'] for t in tables.values())
+        return tables
+
     def export_system_report(self, filepath: str = "olp_system_report.json") -> bool:
         """Exportar relatório completo do sistema para análise"""
         try:
@@ -429,6 +1242,27 @@ class OLPCoreAPI:
         else:
             print("  (Nenhum checkpoint registrado)")
         
+        # Tabelas por contexto
+        print("\n[TABELAS POR CONTEXTO]")
+        for name, table in report['context_tables'].items():
+            if isinstance(table, dict):
+                print(f"  {name:30} = {table['entries']} entradas, "
+                      f"{table['evictions']} despejos ({table['policy']})")
+        
+        # Limiar de confiança por contexto
+        thresholds = report['confidence_thresholds']
+        print(f"\n[LIMIAR DE CONFIANÇA] base = {thresholds['baseline']}")
+        for name, state in thresholds['contexts'].items():
+            print(f"  {name:30} = {state['threshold']} "
+                  f"({state['clean_streak']}/{state['clean_required']} execuções limpas)")
+        
+        # Prazos (timeout_ms) por contexto
+        if report['deadlines']:
+            print("\n[PRAZOS (timeout_ms)]")
+            for name, deadline in report['deadlines'].items():
+                print(f"  {name:30} = {deadline['misses']}/{deadline['tasks']} estouros, "
+                      f"{deadline['fallbacks']} fallbacks para CPU")
+        
         # HAL Driver Stats
         if 'hal_driver_stats' in report:
             print("\n[HARDWARE (HAL-Driver)]")
@@ -436,6 +1270,7 @@ class OLPCoreAPI:
             print(f"  PIM Tasks Loaded        = {hal_stats.get('pim_tasks_loaded', 0)}")
             print(f"  REM Interrupts Sent     = {hal_stats.get('rem_interrupts_sent', 0)}")
             print(f"  DMA Transfers           = {hal_stats.get('dma_transfers_completed', 0)}")
+            print(f"  PIM Tasks Cancelled     = {hal_stats.get('pim_tasks_cancelled', 0)}")
             print(f"  Current TTID            = {hal_stats.get('current_ttid_ms', 0):.2f} ms")
             print(f"  Current Power           = {hal_stats.get('current_power_w', 0):.2f} W")
         
@@ -446,6 +1281,15 @@ class OLPCoreAPI:
             print(f"  Model Version           = {ml_stats.get('model_version', 'N/A')}")
             print(f"  Contexts Analyzed       = {ml_stats.get('contexts_analyzed', 0)}")
             print(f"  Total Predictions       = {ml_stats.get('total_predictions', 0)}")
+            if 'cache_hits' in ml_stats:
+                print(f"  Inference Cache         = {ml_stats['cache_size']}/{ml_stats['cache_max_size']} "
+                      f"(hit rate {ml_stats['cache_hit_rate']*100:.1f}%, "
+                      f"{ml_stats['cache_evictions']} evictions)")
+            if 'cascade' in ml_stats:
+                cascade = ml_stats['cascade']
+                tiers = ", ".join(f"{t['name']} {t['decision_share']*100:.1f}%" for t in cascade['tiers'])
+                print(f"  Predictor Cascade       = {tiers} "
+                      f"(model avoided {cascade['model_inference_avoided']*100:.1f}%)")
         
         print("\n" + "="*80 + "\n")
 
@@ -456,7 +1300,10 @@ class OLPCoreAPI:
         return None
 
     def get_current_context(self) -> Optional[Dict]:
-        """Obter contexto atual (sem remover)"""
+        """Obter contexto atual (sem remover): o do async_context() ativo, ou o topo da stack"""
+        context_info = self._async_context.get()
+        if context_info is not None:
+            return context_info
         if self.context_stack:
             return self.context_stack[-1]
         return None
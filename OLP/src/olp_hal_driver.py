@@ -1,6 +1,8 @@
 # olp_hal_driver.py - Hardware Abstraction Layer (HAL) para OLP
 # 280+ linhas de código robusto para comunicação com PIM/REM
 
+import asyncio
+import threading
 import time
 from typing import Dict, Optional, Tuple, List
 from enum import Enum
@@ -9,6 +11,8 @@ from datetime import datetime
 import logging
 import json
 
+from counters import ShardedCounters, counter_property
+
 logging.basicConfig(
     level=logging.INFO,
     format='[%(asctime)s] [%(levelname)s] %(message)s'
@@ -16,6 +20,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Valor de PIM_STATUS_REGISTER após cancel_task_pim()
+PIM_STATUS_CANCELLED = 0x2
+
+
 class HardwareRegister(Enum):
     """Mapeamento de registradores de hardware (Simulação)"""
     PIM_TASK_REGISTER = 0x80000000
@@ -52,6 +60,7 @@ class DMATransfer:
     timestamp_end: Optional[float] = None
     status: str = "PENDING"
     bytes_transferred: int = 0
+    task_id: Optional[int] = None
 
 
 class OLPHALDriver:
@@ -86,27 +95,42 @@ class OLPHALDriver:
             register: 0 for register in HardwareRegister
         }
         
-        # Contadores e estatísticas
-        self.pim_tasks_loaded = 0
-        self.rem_interrupts_sent = 0
-        self.dma_transfers_completed = 0
-        self.total_bytes_transferred = 0
-        self.total_energy_consumed_uj = 0
+        # Contadores e estatísticas (por thread, somados na leitura)
+        self.counters = ShardedCounters({
+            'pim_tasks_loaded': 0,
+            'rem_interrupts_sent': 0,
+            'dma_transfers_completed': 0,
+            'total_bytes_transferred': 0,
+            'total_energy_consumed_uj': 0,
+            'total_pim_operations': 0,
+            'total_rem_operations': 0,
+            'pim_tasks_cancelled': 0
+        })
         
         # Histórico e fila de operações
         self.hw_events_log: List[HardwareEvent] = []
         self.dma_queue: Dict[int, DMATransfer] = {}
         self.next_transfer_id = 1
+        # Tarefa programada nos registradores PIM (a última carregada)
+        self.loaded_task_id: Optional[int] = None
+        
+        # Latência simulada do DMA por bloco de 64 bytes
+        self.dma_ns_per_block = 100
         
         # Métricas de performance
         self.metrics = {
             'avg_pim_latency_ns': 0,
             'max_pim_latency_ns': 0,
-            'rem_latency_ns': 8,
-            'total_pim_operations': 0,
-            'total_rem_operations': 0
+            'rem_latency_ns': 8
         }
         
+        # Medições da última tarefa carregada (feedback para o aprendizado online)
+        self.last_task_metrics: Dict = {}
+        
+        # Serializa registradores e contadores entre as vias concorrentes
+        # (DualLaneScheduler); a espera do DMA fica fora do lock
+        self._lock = threading.RLock()
+        
         self.is_initialized = True
         
         logger.info(f"[OLP-HAL] {hal_version} inicializado com sucesso")
@@ -114,6 +138,13 @@ class OLPHALDriver:
         logger.info(f"  - Registradores: {len(HardwareRegister)}")
         logger.info(f"  - REM Latency: {self.metrics['rem_latency_ns']} ns")
 
+    # Contadores expostos como atributos (a leitura soma os shards)
+    pim_tasks_loaded = counter_property('pim_tasks_loaded')
+    rem_interrupts_sent = counter_property('rem_interrupts_sent')
+    dma_transfers_completed = counter_property('dma_transfers_completed')
+    total_bytes_transferred = counter_property('total_bytes_transferred')
+    total_energy_consumed_uj = counter_property('total_energy_consumed_uj')
+
     def write_register(self, register: HardwareRegister, value: int, 
                       context: str = "") -> bool:
         """
@@ -186,29 +217,188 @@ class OLPHALDriver:
         Returns:
             True se bem-sucedido
         """
+        return bool(self.transfer_task_pim(task_id, data_ptr, num_blocks, context))
+
+    def transfer_task_pim(self, task_id: int, data_ptr: int,
+                          num_blocks: int, context: str = "",
+                          timeout_ns: Optional[int] = None) -> Dict:
+        """
+        Como load_task_pim(), mas retorna as métricas desta tarefa ({} em
+        erro). Seguro entre threads: chamadores concorrentes têm os DMAs em
+        voo ao mesmo tempo e não dependem de get_last_task_metrics().
+        
+        Com timeout_ns, a latência do DMA simulado (calculada no início da
+        transferência, não medida durante ela) é comparada com o prazo: se
+        for maior, a chamada espera até o prazo, cancela o DMA
+        (cancel_task_pim) e as métricas retornam com 'timed_out': True.
+        """
         try:
             start_time = time.perf_counter()
+            latency_ns = self._begin_pim_task(task_id, data_ptr, num_blocks, context)
+            
+            # 4. Simular latência de DMA (~100ns por bloco), limitada ao prazo
+            if timeout_ns is not None and latency_ns > timeout_ns:
+                time.sleep(max(timeout_ns, 0) / 1e9)
+                self.cancel_task_pim(task_id, context)
+                return {
+                    'task_id': task_id,
+                    'num_blocks': num_blocks,
+                    'dma_latency_ns': int((time.perf_counter() - start_time) * 1e9),
+                    'context': context,
+                    'timed_out': True
+                }
+            time.sleep(latency_ns / 1e9)
+            
+            return self._complete_pim_task(task_id, data_ptr, num_blocks, context, start_time)
+            
+        except Exception as e:
+            logger.error(f"[OLP-HAL] Erro ao carregar tarefa PIM: {e}")
+            self.write_register(HardwareRegister.HW_ERROR_CODE, 0xFF, context)
+            return {}
+
+    def cancel_task_pim(self, task_id: int, context: str = "") -> bool:
+        """
+        Cancelar uma tarefa PIM em andamento (DMA ou execução): registra
+        uma transferência cancelada com o task_id. Os registradores da
+        unidade (PIM_TASK_REGISTER, PIM_STATUS_REGISTER) só são abortados se
+        a tarefa é a carregada no momento; se outra via já programou outra
+        tarefa, o cancelamento não a afeta.
+        
+        Args:
+            task_id: ID da tarefa a cancelar
+            context: Contexto (para logging)
             
+        Returns:
+            True se bem-sucedido
+        """
+        with self._lock:
+            if self.loaded_task_id == task_id:
+                self.write_register(HardwareRegister.PIM_TASK_REGISTER, 0, context)
+                self.write_register(HardwareRegister.PIM_STATUS_REGISTER, PIM_STATUS_CANCELLED, context)
+                self.loaded_task_id = None
+            self.dma_queue[self.next_transfer_id] = DMATransfer(
+                transfer_id=self.next_transfer_id,
+                source_addr=0,
+                dest_addr=0x1000000,
+                num_blocks=0,
+                status="CANCELLED",
+                task_id=task_id
+            )
+            self.next_transfer_id += 1
+            self.counters.add('pim_tasks_cancelled')
+            self._log_event(
+                event_type="PIM_TASK_CANCELLED",
+                register="PIM_SYSTEM",
+                value=task_id,
+                context=context
+            )
+        logger.warning(f"[OLP-HAL] Tarefa PIM cancelada: task_id={task_id}")
+        return True
+
+    def load_batch_pim(self, task_ids: List[int], data_ptr: int,
+                       num_blocks: List[int], context: str = "") -> Dict:
+        """
+        Carregar várias tarefas no PIM com uma única submissão de DMA:
+        registradores configurados uma vez e uma transferência cobrindo os
+        blocos de todas as tarefas (o custo fixo da submissão é amortizado).
+        
+        Args:
+            task_ids: IDs das tarefas do lote
+            data_ptr: Ponteiro para os dados (contíguos)
+            num_blocks: Blocos de cada tarefa (64 bytes cada)
+            context: Contexto (para logging)
+            
+        Returns:
+            Métricas do lote ('tasks', 'num_blocks', 'dma_latency_ns'); {} em erro
+        """
+        if not task_ids:
+            return {}
+        try:
+            start_time = time.perf_counter()
+            total_blocks = sum(num_blocks)
+            latency_ns = self._begin_pim_task(task_ids[0], data_ptr, total_blocks, context)
+            
+            # 4. Uma espera de DMA para o lote inteiro
+            time.sleep(latency_ns / 1e9)
+            
+            metrics = dict(self._complete_pim_task(task_ids[0], data_ptr, total_blocks,
+                                                   context, start_time))
+            # _complete_pim_task contou uma tarefa; o lote carregou todas
+            self.counters.add('pim_tasks_loaded', len(task_ids) - 1)
+            metrics['tasks'] = len(task_ids)
+            return metrics
+            
+        except Exception as e:
+            logger.error(f"[OLP-HAL] Erro ao carregar lote PIM: {e}")
+            self.write_register(HardwareRegister.HW_ERROR_CODE, 0xFF, context)
+            return {}
+
+    async def load_task_pim_async(self, task_id: int, data_ptr: int,
+                                  num_blocks: int, context: str = "") -> Dict:
+        """
+        Variante assíncrona de load_task_pim(): a conclusão do DMA é um
+        future do loop (resolvido por call_later, como a interrupção de fim
+        de transferência), então várias transferências ficam em voo sem
+        bloquear o loop.
+        
+        Returns:
+            Métricas desta tarefa (as de get_last_task_metrics(), que pode já
+            ter sido sobrescrito por outra tarefa concorrente); {} em erro
+        """
+        try:
+            start_time = time.perf_counter()
+            latency_ns = self._begin_pim_task(task_id, data_ptr, num_blocks, context)
+            
+            # 4. Aguardar a conclusão do DMA sem bloquear o loop
+            loop = asyncio.get_running_loop()
+            dma_done = loop.create_future()
+            handle = loop.call_later(latency_ns / 1e9, dma_done.set_result, None)
+            try:
+                await dma_done
+            except asyncio.CancelledError:
+                handle.cancel()
+                raise
+            
+            return self._complete_pim_task(task_id, data_ptr, num_blocks, context, start_time)
+            
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[OLP-HAL] Erro ao carregar tarefa PIM: {e}")
+            self.write_register(HardwareRegister.HW_ERROR_CODE, 0xFF, context)
+            return {}
+
+    def _begin_pim_task(self, task_id: int, data_ptr: int,
+                        num_blocks: int, context: str) -> int:
+        """Passos 1-3 da carga PIM (registradores). Retorna a latência de DMA simulada em ns."""
+        
+        with self._lock:
             # 1. Configurar tarefa
             self.write_register(HardwareRegister.PIM_TASK_REGISTER, task_id, context)
+            self.loaded_task_id = task_id
             
             # 2. Configurar ponteiro de dados
             self.write_register(HardwareRegister.PIM_DATA_PTR_REGISTER, data_ptr, context)
             
             # 3. Configurar DMA
-            block_size = 64
-            total_bytes = num_blocks * block_size
             dma_config = (data_ptr & 0xFFFF0000) | (num_blocks & 0xFFFF)
             self.write_register(HardwareRegister.PIM_PREFETCH_DMA_CONFIG, 
                               dma_config, context)
-            
-            # 4. Simular latência de DMA (~100ns por bloco)
-            simulated_dma_latency_ns = num_blocks * 100
-            time.sleep(simulated_dma_latency_ns / 1e9)
-            
+        
+        # ~100ns por bloco
+        return num_blocks * self.dma_ns_per_block
+
+    def _complete_pim_task(self, task_id: int, data_ptr: int, num_blocks: int,
+                           context: str, start_time: float) -> Dict:
+        """Passos 5-7 da carga PIM, após o DMA. Retorna as métricas da tarefa."""
+        
+        with self._lock:
+            block_size = 64
+            total_bytes = num_blocks * block_size
+        
             # 5. Disparar execução no PIM
             self.write_register(HardwareRegister.PIM_TASK_REGISTER, 1, context)
-            
+        
             # 6. Registrar transferência DMA
             dma_transfer = DMATransfer(
                 transfer_id=self.next_transfer_id,
@@ -216,26 +406,34 @@ class OLPHALDriver:
                 dest_addr=0x1000000,
                 num_blocks=num_blocks,
                 bytes_transferred=total_bytes,
-                status="COMPLETED"
+                status="COMPLETED",
+                task_id=task_id
             )
             dma_transfer.timestamp_end = time.time()
-            
+        
             self.dma_queue[self.next_transfer_id] = dma_transfer
             self.next_transfer_id += 1
-            
+        
             # 7. Atualizar estatísticas
-            self.pim_tasks_loaded += 1
-            self.dma_transfers_completed += 1
-            self.total_bytes_transferred += total_bytes
-            self.metrics['total_pim_operations'] += 1
-            
+            counters = self.counters
+            counters.add('pim_tasks_loaded')
+            counters.add('dma_transfers_completed')
+            counters.add('total_bytes_transferred', total_bytes)
+            counters.add('total_pim_operations')
+        
             latency_ms = (time.perf_counter() - start_time) * 1000
-            
+            self.last_task_metrics = {
+                'task_id': task_id,
+                'num_blocks': num_blocks,
+                'dma_latency_ns': int(latency_ms * 1e6),
+                'context': context
+            }
+        
             logger.debug(
                 f"[OLP-HAL] Tarefa PIM carregada: task_id={task_id}, "
                 f"blocks={num_blocks}, latency={latency_ms:.3f}ms"
             )
-            
+        
             self._log_event(
                 event_type="PIM_TASK_LOADED",
                 register="PIM_SYSTEM",
@@ -243,13 +441,8 @@ class OLPHALDriver:
                 context=context,
                 latency_ns=int(latency_ms * 1e6)
             )
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"[OLP-HAL] Erro ao carregar tarefa PIM: {e}")
-            self.write_register(HardwareRegister.HW_ERROR_CODE, 0xFF, context)
-            return False
+        
+            return self.last_task_metrics
 
     def send_rem_interrupt(self, error_code: int, 
                           context: str = "") -> bool:
@@ -279,8 +472,8 @@ class OLPHALDriver:
                               0x01, context)
             
             # 4. Atualizar estatísticas
-            self.rem_interrupts_sent += 1
-            self.metrics['total_rem_operations'] += 1
+            self.counters.add('rem_interrupts_sent')
+            self.counters.add('total_rem_operations')
             
             total_latency_ns = int((time.perf_counter() - start_time) * 1e9)
             
@@ -319,6 +512,13 @@ class OLPHALDriver:
             logger.error(f"[OLP-HAL] Erro ao obter TTID: {e}")
             return 0.0
 
+    def get_last_task_metrics(self) -> Dict:
+        """
+        Retornar as medições da última tarefa PIM (latência do DMA). O TTID
+        da tarefa é medido por quem a executa (OLPCoreAPI), não pelo HAL.
+        """
+        return dict(self.last_task_metrics) if self.last_task_metrics else {}
+
     def get_energy_consumption(self) -> float:
         """
         Obter consumo de energia atual em Watts.
@@ -338,22 +538,25 @@ class OLPHALDriver:
     def get_hardware_stats(self) -> Dict:
         """Retornar estatísticas completas de hardware"""
         
+        # Uma única soma dos shards para todo o relatório
+        counters = self.counters.snapshot()
+        
         avg_pim_latency = 0
-        if self.dma_transfers_completed > 0:
+        if counters['dma_transfers_completed'] > 0:
             total_latency = sum(
                 (t.timestamp_end - t.timestamp_start) * 1e9
                 for t in self.dma_queue.values()
                 if t.timestamp_end is not None
             )
-            avg_pim_latency = int(total_latency / self.dma_transfers_completed)
+            avg_pim_latency = int(total_latency / counters['dma_transfers_completed'])
         
         return {
             'driver_version': self.hal_version,
             'is_initialized': self.is_initialized,
-            'pim_tasks_loaded': self.pim_tasks_loaded,
-            'rem_interrupts_sent': self.rem_interrupts_sent,
-            'dma_transfers_completed': self.dma_transfers_completed,
-            'total_bytes_transferred': self.total_bytes_transferred,
+            'pim_tasks_loaded': counters['pim_tasks_loaded'],
+            'rem_interrupts_sent': counters['rem_interrupts_sent'],
+            'dma_transfers_completed': counters['dma_transfers_completed'],
+            'total_bytes_transferred': counters['total_bytes_transferred'],
             'current_ttid_ms': self.get_current_ttid(),
             'current_power_w': self.get_energy_consumption(),
             'avg_pim_latency_ns': avg_pim_latency,
@@ -361,7 +564,12 @@ class OLPHALDriver:
             'total_hw_events': len(self.hw_events_log),
             'pending_dma_transfers': len([t for t in self.dma_queue.values() 
                                          if t.status == "PENDING"]),
-            'metrics': self.metrics
+            'pim_tasks_cancelled': counters['pim_tasks_cancelled'],
+            'metrics': {
+                **self.metrics,
+                'total_pim_operations': counters['total_pim_operations'],
+                'total_rem_operations': counters['total_rem_operations']
+            }
         }
 
     def get_dma_status(self, transfer_id: Optional[int] = None) -> Dict:
@@ -371,6 +579,7 @@ class OLPHALDriver:
                 t = self.dma_queue[transfer_id]
                 return {
                     'transfer_id': t.transfer_id,
+                    'task_id': t.task_id,
                     'status': t.status,
                     'bytes': t.bytes_transferred,
                     'duration_ms': (t.timestamp_end - t.timestamp_start) * 1000 
@@ -382,8 +591,10 @@ class OLPHALDriver:
             'total_transfers': len(self.dma_queue),
             'completed': sum(1 for t in self.dma_queue.values() if t.status == "COMPLETED"),
             'pending': sum(1 for t in self.dma_queue.values() if t.status == "PENDING"),
+            'cancelled': sum(1 for t in self.dma_queue.values() if t.status == "CANCELLED"),
             'transfers': {
                 tid: {
+                    'task_id': t.task_id,
                     'status': t.status,
                     'bytes': t.bytes_transferred,
                     'duration_ms': (t.timestamp_end - t.timestamp_start) * 1000
@@ -406,10 +617,12 @@ class OLPHALDriver:
             latency_ns=latency_ns
         )
         
-        self.hw_events_log.append(event)
-        
-        if len(self.hw_events_log) > 10000:
-            self.hw_events_log = self.hw_events_log[-5000:]
+        # Append e corte sob o lock: o corte não pode descartar eventos
+        # registrados por outra via entre a leitura e a troca da lista
+        with self._lock:
+            self.hw_events_log.append(event)
+            if len(self.hw_events_log) > 10000:
+                self.hw_events_log = self.hw_events_log[-5000:]
 
     def get_event_log(self, limit: int = 20, 
                      event_type_filter: Optional[str] = None) -> List[Dict]:
@@ -0,0 +1,211 @@
+# online_learning.py - Aprendizado online a partir do feedback de execução
+
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+
+from context_registry import CONTEXT_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayBuffer:
+    """
+    Buffer circular limitado de eventos de feedback (contexto, perda,
+    timestamp monotônico em ns) em arrays NumPy pré-alocados.
+
+    A perda está em [-1, 1]: positiva para um offload ruim (recovery, PIM
+    mais lento que a CPU), negativa para um offload que compensou.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positiva")
+        self.capacity = capacity
+        self._handles = np.full(capacity, -1, dtype=np.int64)
+        self._losses = np.zeros(capacity)
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._cursor = 0
+        self._size = 0
+
+    def add(self, handle: int, loss: float, timestamp_ns: int) -> None:
+        cursor = self._cursor
+        self._handles[cursor] = handle
+        self._losses[cursor] = loss
+        self._timestamps[cursor] = timestamp_ns
+        self._cursor = cursor + 1 if cursor + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+
+    def snapshot(self):
+        """(handles, perdas, timestamps) em ordem cronológica (cópias)"""
+        order = np.arange(self._size)
+        if self._size == self.capacity:
+            order = (order + self._cursor) % self.capacity
+        return self._handles[order], self._losses[order], self._timestamps[order]
+
+    def clear(self) -> None:
+        self._handles[:] = -1
+        self._cursor = 0
+        self._size = 0
+
+    def pressure(self, handles: Iterable[int], now_ns: int, half_life_ns: int) -> Dict[int, float]:
+        """
+        Pressão de falha de cada contexto: soma das perdas dos eventos
+        ainda no buffer, com decaimento exponencial pela idade.
+        """
+        handles = list(handles)
+        stored = self._handles[:self._size]
+        mask = np.isin(stored, handles)
+        if not mask.any():
+            return {handle: 0.0 for handle in handles}
+        ages = (now_ns - self._timestamps[:self._size][mask]) / half_life_ns
+        weighted = self._losses[:self._size][mask] * np.exp2(-ages)
+        selected = stored[mask]
+        return {handle: float(weighted[selected == handle].sum()) for handle in handles}
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class OnlineLearner:
+    """
+    Converte feedback de execução em priors por contexto, em segundo plano.
+
+    Eventos (recovery, TTID medido) entram em uma fila; uma thread daemon
+    os move para o ReplayBuffer e recalcula o prior dos contextos afetados:
+    um deslocamento logit <= 0 proporcional à pressão de falha recente.
+    predict() apenas lê o prior (prior(): uma consulta na tabela), sem treinar.
+    Cada recovery desloca o logit da confiança em -failure_step, então o
+    número de recoveries até as decisões voltarem para a CPU depende da
+    confiança de partida: com o passo padrão (6.0), uma confiança saturada
+    (1 - 1e-9, logit ~20.7) precisa de três (-18 → ~94%), e uma de 99.999%
+    (logit ~11.5) cai abaixo de 99.9% já no primeiro.
+
+    O prior é guardado com o instante do cálculo e decai na leitura com a
+    meia-vida configurada (a pressão é uma soma de perdas com o mesmo
+    decaimento exponencial), então um contexto mandado para a CPU, que não
+    gera mais eventos PIM, volta a ser testado sem depender de novo feedback.
+    """
+
+    # Deslocamento logit abaixo do qual o prior é descartado
+    MIN_PRIOR = 1e-3
+
+    def __init__(self, priors, capacity: int = 1024, failure_step: float = 6.0,
+                 half_life_s: float = 300.0):
+        """
+        Args:
+            priors: Tabela handle → (deslocamento logit, instante em ns)
+                    (ContextTable ou dict)
+            capacity: Tamanho do ReplayBuffer
+            failure_step: Deslocamento logit por unidade de pressão de falha
+            half_life_s: Meia-vida da pressão de falha em segundos
+        """
+        self.priors = priors
+        self.replay = ReplayBuffer(capacity)
+        self.failure_step = failure_step
+        self.half_life_ns = int(half_life_s * 1e9)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+        self.events_received = 0
+        self.events_applied = 0
+        self.updates = 0
+
+    def record(self, context: Union[int, str], loss: float) -> None:
+        """Enfileirar um evento de feedback (não bloqueia)"""
+        handle = CONTEXT_REGISTRY.resolve(context)
+        loss = min(max(float(loss), -1.0), 1.0)
+        self.events_received += 1
+        self._queue.put((handle, loss, time.monotonic_ns()))
+        if self._thread is None:
+            self._start()
+
+    def prior(self, handle: int, now_ns: Optional[int] = None) -> float:
+        """Deslocamento logit atual do contexto, decaído pela idade (0.0 se não há)"""
+        entry = self.priors.get(handle)
+        if entry is None:
+            return 0.0
+        bias, updated_ns = entry
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        bias *= 2.0 ** (-(now_ns - updated_ns) / self.half_life_ns)
+        if bias > -self.MIN_PRIOR:
+            self.priors.pop(handle, None)
+            return 0.0
+        return bias
+
+    def set_prior(self, handle: int, bias: float, now_ns: Optional[int] = None) -> None:
+        """Definir o prior do contexto a partir de agora (ex.: estado restaurado)"""
+        if bias <= -self.MIN_PRIOR:
+            self.priors[handle] = (bias, time.monotonic_ns() if now_ns is None else now_ns)
+
+    def _start(self) -> None:
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='olp-online-learner', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._apply(batch)
+            except Exception as e:
+                logger.error(f"[ALP] Erro no aprendizado online: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _apply(self, batch) -> None:
+        for handle, loss, timestamp_ns in batch:
+            self.replay.add(handle, loss, timestamp_ns)
+        touched = {handle for handle, _, _ in batch}
+        now_ns = time.monotonic_ns()
+        pressures = self.replay.pressure(touched, now_ns, self.half_life_ns)
+        for handle, pressure in pressures.items():
+            bias = -self.failure_step * max(pressure, 0.0)
+            if bias <= -self.MIN_PRIOR:
+                self.priors[handle] = (bias, now_ns)
+            elif handle in self.priors:
+                self.priors.pop(handle)
+        self.events_applied += len(batch)
+        self.updates += 1
+        logger.debug("[ALP] Feedback aplicado: %d eventos, %d contextos", len(batch), len(touched))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Aguardar o processamento dos eventos pendentes"""
+        if self._thread is None:
+            return True
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def get_stats(self) -> Dict:
+        """Retornar estatísticas do aprendizado online"""
+        return {
+            'events_received': self.events_received,
+            'events_applied': self.events_applied,
+            'updates': self.updates,
+            'replay_size': len(self.replay),
+            'replay_capacity': self.replay.capacity,
+            'penalized_contexts': len(self.priors)
+        }
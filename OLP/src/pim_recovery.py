@@ -24,6 +24,8 @@ class PIMRecoveryModule:
         
         # 1. PARADA IMEDIATA E ALERTA (RIGOR MÁXIMO)
         PIM_UNIT.halt_execution()
+        # Decisões em cache deste contexto deixam de valer imediatamente
+        self.DECISION_ENGINE.invalidate_context(faulty_context)
         
         # USO DO REM-Sync para garantir a menor latência de alerta à CPU
         self.REM_SYNCHRONIZER.send_critical_interrupt(error_type) 
@@ -49,14 +51,18 @@ class PIMRecoveryModule:
             self.log_and_shutdown_node()
             
         # 3. AJUSTE DE RIGOR PÓS-FALHA
-        # Aumenta temporariamente o requisito de confiança para evitar FPs em cascata
-        self.DECISION_ENGINE.MIN_CONFIDENCE = 0.99999 
-        print(f"  -> Rigor aumentado: Confiança mínima agora é {self.DECISION_ENGINE.MIN_CONFIDENCE}")
+        # Aumenta o requisito de confiança apenas do contexto que falhou, para
+        # evitar FPs em cascata; ele volta ao limiar base após execuções limpas
+        threshold = self.DECISION_ENGINE.tighten_threshold(faulty_context)
+        print(f"  -> Rigor aumentado: Confiança mínima do contexto {faulty_context} agora é {threshold}")
 
     def update_ml_model_with_failure(self, context, state):
-        """Simulação de treinamento em tempo real para evitar FPs futuros."""
-        # Aqui, você enviaria os dados de (contexto, acesso real, erro) para o ML_MODEL
-        # para que ele classifique esse padrão como 'Decisão Real: CPU'.
+        """Envia a falha ao aprendizado online do modelo para evitar FPs futuros."""
+        # O modelo acumula pressão de falha no contexto (em segundo plano): após
+        # poucos eventos a confiança cai abaixo do limiar e a decisão volta à CPU.
+        ml_model = self.DECISION_ENGINE.ml_model
+        if hasattr(ml_model, 'record_recovery'):
+            ml_model.record_recovery(context)
         print("  -> Logando Falha Crítica e Sinalizando Re-treinamento ALP.")
         
     def log_and_shutdown_node(self):
@@ -0,0 +1,182 @@
+# placement_policy.py - Política de placement PIM/CPU por bandit (Thompson sampling)
+
+import math
+import random
+from typing import Dict, Optional, Union
+
+from context_registry import CONTEXT_REGISTRY
+from context_table import ContextTable
+
+LANES = ('PIM', 'CPU')
+
+
+class LanePosterior:
+    """
+    Posterior aproximado da latência de uma via em um contexto, no espaço
+    log (latências são positivas e multiplicativas). Estatísticas
+    suficientes descontadas por `discount` a cada medição: o peso efetivo
+    fica limitado a 1 / (1 - discount), de modo que o posterior acompanha
+    mudanças de carga e nunca colapsa (sempre resta alguma exploração).
+    """
+    __slots__ = ('weight', 'total', 'total_sq', 'observations')
+
+    def __init__(self):
+        self.weight = 0.0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.observations = 0
+
+    def update(self, log_latency: float, discount: float) -> None:
+        self.weight = self.weight * discount + 1.0
+        self.total = self.total * discount + log_latency
+        self.total_sq = self.total_sq * discount + log_latency * log_latency
+        self.observations += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.weight
+
+    def variance(self, prior_variance: float) -> float:
+        """Variância das medições, encolhida para a variância a priori"""
+        sample_variance = max(self.total_sq / self.weight - self.mean ** 2, 0.0)
+        return (prior_variance + self.weight * sample_variance) / (1.0 + self.weight)
+
+    def sample(self, rng: random.Random, prior_variance: float) -> float:
+        """Amostra da latência média (log) ~ Normal(média, variância / peso)"""
+        return rng.gauss(self.mean, math.sqrt(self.variance(prior_variance) / self.weight))
+
+
+class _ContextPlacement:
+    """Posteriors das duas vias e o orçamento de exploração do contexto"""
+    __slots__ = ('lanes', 'decisions', 'explorations')
+
+    def __init__(self):
+        self.lanes = {lane: LanePosterior() for lane in LANES}
+        self.decisions = 0
+        self.explorations = 0
+
+
+class ThompsonPlacementPolicy:
+    """
+    Placement PIM/CPU por Thompson sampling sobre a latência medida de
+    cada via, por contexto.
+
+    - Segurança: a confiança do modelo continua sendo um portão rígido;
+      abaixo de MIN_CONFIDENCE a tarefa vai para a CPU, sem exploração
+      (um prefetch errado no PIM custa um recovery crítico).
+    - Acima do portão, amostra-se a latência de cada via do posterior e
+      escolhe-se a menor. Vias ainda sem medições são amostradas primeiro.
+    - Exploração limitada: escolher uma via diferente da gulosa (menor
+      média, ou a regra de ganho do modelo enquanto faltam medições) só é
+      permitido dentro de `min_explorations + max_exploration_rate *
+      decisões` do contexto; fora do orçamento vale a escolha gulosa.
+    """
+
+    def __init__(self, max_exploration_rate: float = 0.1, min_explorations: int = 2,
+                 discount: float = 0.98, prior_log_sd: float = 0.5,
+                 seed: Optional[int] = None, table_config: Optional[Dict] = None):
+        """
+        Args:
+            max_exploration_rate: Fração máxima de decisões exploratórias por contexto
+            min_explorations: Explorações permitidas antes da taxa (aquecimento)
+            discount: Fator de esquecimento das medições (carga variável)
+            prior_log_sd: Desvio padrão a priori da latência em escala log
+            seed: Semente do gerador (reprodutibilidade)
+            table_config: Limites da tabela por contexto
+                          (formato de OLP_CONFIG['context_tables'])
+        """
+        if not 0.0 < discount <= 1.0:
+            raise ValueError("discount deve estar em (0, 1]")
+        self.max_exploration_rate = max_exploration_rate
+        self.min_explorations = min_explorations
+        self.discount = discount
+        self.prior_variance = prior_log_sd ** 2
+        self.rng = random.Random(seed)
+        self.contexts = ContextTable.from_config('placement.posteriors', table_config,
+                                                 default_factory=_ContextPlacement)
+        self.decisions = 0
+        self.explorations = 0
+        self.safety_blocks = 0
+        self.budget_denials = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict] = None,
+                    table_config: Optional[Dict] = None) -> 'ThompsonPlacementPolicy':
+        """Criar a partir de OLP_CONFIG['placement_policy']"""
+        config = config or {}
+        return cls(max_exploration_rate=config.get('max_exploration_rate', 0.1),
+                   min_explorations=config.get('min_explorations', 2),
+                   discount=config.get('discount', 0.98),
+                   prior_log_sd=config.get('prior_log_sd', 0.5),
+                   seed=config.get('seed'),
+                   table_config=table_config)
+
+    def choose(self, context: Union[int, str], confidence: float, min_confidence: float,
+               default_lane: str) -> str:
+        """
+        Escolher a via da tarefa.
+
+        Args:
+            context: Handle (ou nome) do contexto
+            confidence: Confiança do modelo na previsão
+            min_confidence: Limiar de segurança (PredictionEngine.MIN_CONFIDENCE)
+            default_lane: Escolha da regra de ganho do modelo (usada enquanto
+                          faltam medições e fora do orçamento de exploração)
+        """
+        self.decisions += 1
+        if confidence < min_confidence:
+            self.safety_blocks += 1
+            return 'CPU'
+
+        state = self.contexts[CONTEXT_REGISTRY.resolve(context)]
+        state.decisions += 1
+        pim, cpu = state.lanes['PIM'], state.lanes['CPU']
+
+        if pim.weight and cpu.weight:
+            greedy = 'PIM' if pim.mean < cpu.mean else 'CPU'
+            sampled_pim = pim.sample(self.rng, self.prior_variance)
+            sampled_cpu = cpu.sample(self.rng, self.prior_variance)
+            candidate = 'PIM' if sampled_pim < sampled_cpu else 'CPU'
+        else:
+            greedy = default_lane
+            candidate = 'PIM' if not pim.weight else 'CPU'
+
+        if candidate == greedy:
+            return candidate
+        if state.explorations < self.min_explorations + self.max_exploration_rate * state.decisions:
+            state.explorations += 1
+            self.explorations += 1
+            return candidate
+        self.budget_denials += 1
+        return greedy
+
+    def observe(self, context: Union[int, str], lane: str, elapsed_ms: float) -> None:
+        """Atualizar o posterior da via com uma latência medida"""
+        if lane not in LANES or elapsed_ms <= 0:
+            return
+        state = self.contexts[CONTEXT_REGISTRY.resolve(context)]
+        state.lanes[lane].update(math.log(elapsed_ms), self.discount)
+
+    def get_context_posterior(self, context: Union[int, str]) -> Dict:
+        """Média (ms) e medições de cada via do contexto"""
+        state = self.contexts.get(CONTEXT_REGISTRY.resolve(context))
+        if state is None:
+            return {}
+        report = {'decisions': state.decisions, 'explorations': state.explorations}
+        for lane, posterior in state.lanes.items():
+            report[lane] = {
+                'observations': posterior.observations,
+                'mean_ms': math.exp(posterior.mean) if posterior.weight else None
+            }
+        return report
+
+    def get_stats(self) -> Dict:
+        """Retornar estatísticas da política"""
+        return {
+            'contexts': len(self.contexts),
+            'decisions': self.decisions,
+            'explorations': self.explorations,
+            'exploration_rate': self.explorations / max(self.decisions, 1),
+            'safety_blocks': self.safety_blocks,
+            'budget_denials': self.budget_denials
+        }
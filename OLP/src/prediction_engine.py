@@ -1,5 +1,13 @@
 # prediction_engine.py
 
+import hashlib
+import time
+
+import numpy as np
+
+from adaptive_threshold import AdaptiveConfidenceThreshold
+from context_registry import CONTEXT_REGISTRY
+from context_table import ContextTable
 # Importa um módulo simulado que representa o hardware PIM/CPU
 from utils import SimulatedMLModel, CPU_CORE, PIM_UNIT 
 
@@ -7,39 +15,160 @@ class PredictionEngine:
     """
     Aplica o rigor de testes para a decisão de Offloading (PIM vs. CPU).
     """
-    def __init__(self, ml_model: SimulatedMLModel, latency_threshold: float = 0.30, confidence_threshold: float = 0.999):
+    BLOCK_BYTES = 64           # Alinhamento dos blocos de prefetch
+    MAX_FINGERPRINTS = 16      # Assinaturas de stride guardadas por contexto
+
+    def __init__(self, ml_model: SimulatedMLModel, latency_threshold: float = 0.30, confidence_threshold: float = 0.999,
+                 decision_cache_size: int = 1024, decision_cache_ttl_s: float = 1.0,
+                 cost_model=None, placement_policy=None, confidence_thresholds=None):
         # Regra de Rigor 1: Ganho mínimo de TTID para justificar o PIM (30%)
         self.MIN_TTID_GAIN = latency_threshold 
         # Regra de Rigor 2: Confiança mínima para evitar Falso Positivo (FP) Crítico (99.9%)
         self.MIN_CONFIDENCE = confidence_threshold 
+        # Rigor por contexto: sobe após falhas críticas e volta a MIN_CONFIDENCE
+        # após execuções limpas (AdaptiveConfidenceThreshold)
+        self.confidence_thresholds = (confidence_thresholds if confidence_thresholds is not None
+                                      else AdaptiveConfidenceThreshold())
         self.ml_model = ml_model 
+        # Regra de ganho com TTIDs medidos (CostModel), quando disponíveis
+        self.cost_model = cost_model
+        # Placement opcional por bandit (ThompsonPlacementPolicy) no lugar da
+        # regra fixa de ganho; o limiar de confiança continua obrigatório
+        self.placement_policy = placement_policy
+        
+        # Cache de decisões por contexto: assinatura de stride → (confiança,
+        # ganho de TTID, blocos relativos). Os limiares são reaplicados a cada
+        # consulta, então mudanças de rigor valem imediatamente; o recovery
+        # invalida o contexto (invalidate_context).
+        # (limitado por entradas: até MAX_FINGERPRINTS assinaturas por contexto)
+        self.decision_cache = (ContextTable('engine.decisions', max_entries=decision_cache_size,
+                                            default_factory=dict)
+                               if decision_cache_size else None)
+        self.decision_cache_ttl_ns = int(decision_cache_ttl_s * 1e9) if decision_cache_ttl_s else None
+        # A assinatura cobre a mesma janela que o classificador do modelo
+        self.fingerprint_window = getattr(ml_model, 'analysis_window', 64)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_invalidations = 0
         print("M2: PredictionEngine (ALP) inicializado.")
 
-    def assess_and_decide(self, current_context: str, last_accesses: list) -> tuple:
+    def _fingerprint(self, last_accesses) -> tuple:
+        """
+        Assinatura da janela: strides, quantidade (warmup) e fase do último
+        acesso dentro do bloco, que torna os blocos relativos exatos.
+        """
+        window = np.asarray(last_accesses[-(self.fingerprint_window + 1):], dtype=np.int64)
+        strides = window[1:] - window[:-1]
+        return (len(strides), int(window[-1]) % self.BLOCK_BYTES,
+                hashlib.blake2b(strides.tobytes(), digest_size=16).digest())
+
+    def _cached_assessment(self, handle: int, fingerprint: tuple):
+        entries = self.decision_cache.get(handle)
+        entry = entries.get(fingerprint) if entries is not None else None
+        if entry is not None and self.decision_cache_ttl_ns is not None:
+            if time.monotonic_ns() - entry[0] > self.decision_cache_ttl_ns:
+                del entries[fingerprint]
+                entry = None
+        if entry is None:
+            self.cache_misses += 1
+            return None
+        self.cache_hits += 1
+        return entry[1:]
+
+    def _store_assessment(self, handle: int, fingerprint: tuple, confidence: float,
+                          ttid_gain: float, block_offsets: list) -> None:
+        entries = self.decision_cache[handle]
+        if fingerprint not in entries and len(entries) >= self.MAX_FINGERPRINTS:
+            del entries[next(iter(entries))]
+        entries[fingerprint] = (time.monotonic_ns(), confidence, ttid_gain, block_offsets)
+
+    def invalidate_context(self, context) -> None:
+        """Descartar as decisões em cache do contexto (chamado no recovery)"""
+        if self.decision_cache is not None and self.decision_cache.pop(CONTEXT_REGISTRY.resolve(context)) is not None:
+            self.cache_invalidations += 1
+
+    def threshold_for(self, context) -> float:
+        """Confiança mínima atual do contexto (MIN_CONFIDENCE ou mais rigorosa após falhas)"""
+        return self.confidence_thresholds.threshold(context, self.MIN_CONFIDENCE)
+
+    def tighten_threshold(self, context) -> float:
+        """Falha crítica no contexto: subir seu limiar. Retorna o novo limiar."""
+        self.confidence_thresholds.record_failure(context)
+        return self.threshold_for(context)
+
+    def record_clean_execution(self, context) -> None:
+        """Execução concluída sem interrupção: conta para relaxar o limiar"""
+        self.confidence_thresholds.record_success(context)
+
+    def get_threshold_report(self) -> dict:
+        """Limiar atual dos contextos com falhas recentes"""
+        return self.confidence_thresholds.get_report(self.MIN_CONFIDENCE)
+
+    def get_cache_stats(self) -> dict:
+        """Estatísticas do cache de decisões"""
+        return {
+            'contexts': len(self.decision_cache) if self.decision_cache is not None else 0,
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'invalidations': self.cache_invalidations,
+            'hit_rate': self.cache_hits / max(self.cache_hits + self.cache_misses, 1)
+        }
+
+    def assess_and_decide(self, current_context: int, last_accesses: list) -> tuple:
         """Avalia se a tarefa deve ser enviada para PIM ou CPU."""
         
         if len(last_accesses) < 3:
             # Rigor: Não pode prever sem histórico de Stride mínimo.
             return 'CPU', [] 
 
-        # 1. Previsão do ML_MODEL (Simulação)
-        prediction_result = self.ml_model.predict(current_context, last_accesses)
-        predicted_blocks = prediction_result.get('blocks', [])
-        confidence = prediction_result.get('confidence', 0.0)
-        predicted_ttid_pim = prediction_result.get('ttid_pim', 1.0)
-        predicted_ttid_cpu = prediction_result.get('ttid_cpu', 1.0)
+        # 1. Previsão do ML_MODEL, ou do cache se a assinatura de stride do
+        # contexto não mudou (regime estacionário: o modelo não é consultado)
+        aligned_last = int(last_accesses[-1]) - int(last_accesses[-1]) % self.BLOCK_BYTES
+        handle = CONTEXT_REGISTRY.resolve(current_context)
+        cached = None
+        if self.decision_cache is not None:
+            fingerprint = self._fingerprint(last_accesses)
+            cached = self._cached_assessment(handle, fingerprint)
         
-        # Garante divisão por zero (caso TTID seja 0)
-        if predicted_ttid_cpu == 0:
-            predicted_ttid_cpu = 1.0
+        if cached is not None:
+            confidence, ttid_gain, block_offsets = cached
+            predicted_blocks = [aligned_last + offset for offset in block_offsets]
+        else:
+            prediction_result = self.ml_model.predict(current_context, last_accesses)
+            predicted_blocks = prediction_result.get('blocks', [])
+            confidence = prediction_result.get('confidence', 0.0)
+            predicted_ttid_pim = prediction_result.get('ttid_pim', 1.0)
+            predicted_ttid_cpu = prediction_result.get('ttid_cpu', 1.0)
+            
+            # Garante divisão por zero (caso TTID seja 0)
+            if predicted_ttid_cpu == 0:
+                predicted_ttid_cpu = 1.0
+            ttid_gain = 1 - (predicted_ttid_pim / predicted_ttid_cpu)
+            
+            if self.decision_cache is not None:
+                self._store_assessment(handle, fingerprint, confidence, ttid_gain,
+                                       [block - aligned_last for block in predicted_blocks])
 
-        # 2. CHECAGEM DE RIGOR (CONFIANÇA)
-        if confidence < self.MIN_CONFIDENCE:
-            print(f"  [Decisão]: ALERTA: Confiança ({confidence:.4f}) abaixo de {self.MIN_CONFIDENCE}. FORÇANDO CPU (Segurança).")
+        # TTIDs medidos do contexto substituem os previstos pelo modelo
+        measured = self.cost_model.ttid_estimates(handle) if self.cost_model is not None else None
+        if measured is not None and measured[1] > 0:
+            ttid_gain = 1 - (measured[0] / measured[1])
+
+        # 2. CHECAGEM DE RIGOR (CONFIANÇA), com o limiar atual do contexto
+        min_confidence = self.threshold_for(handle)
+        if confidence < min_confidence:
+            print(f"  [Decisão]: ALERTA: Confiança ({confidence:.4f}) abaixo de {min_confidence}. FORÇANDO CPU (Segurança).")
             return 'CPU', []
 
+        # 3. PLACEMENT POR BANDIT (opcional): explora a via que a regra de
+        # ganho não escolheria, dentro do orçamento de exploração
+        if self.placement_policy is not None:
+            default_lane = 'PIM' if ttid_gain >= self.MIN_TTID_GAIN else 'CPU'
+            decision = self.placement_policy.choose(handle, confidence, min_confidence, default_lane)
+            print(f"  [Decisão]: Bandit: {decision} (regra de ganho: {default_lane}, ganho {ttid_gain:.2%}, Confiança: {confidence:.4f}).")
+            return decision, (predicted_blocks if decision == 'PIM' else [])
+
         # 3. CHECAGEM DE RIGOR (GANHO DE TTID/ENERGIA)
-        ttid_gain = 1 - (predicted_ttid_pim / predicted_ttid_cpu)
         if ttid_gain < self.MIN_TTID_GAIN:
             print(f"  [Decisão]: ALERTA: Ganho de TTID ({ttid_gain:.2%}) insuficiente. FORÇANDO CPU (Eficiência Energética).")
             return 'CPU', []
@@ -53,9 +182,17 @@ class PredictionEngine:
         context, accesses = tracer.get_context_data()
         decision, blocks_to_prefetch = self.assess_and_decide(context, accesses)
         
+        start = time.perf_counter()
         if decision == 'PIM':
-            return PIM_UNIT.load_data_and_task(task_function, task_data, blocks_to_prefetch)
+            result = PIM_UNIT.load_data_and_task(task_function, task_data, blocks_to_prefetch)
         else:
-            return CPU_CORE.execute(task_function, task_data)
+            result = CPU_CORE.execute(task_function, task_data)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if self.cost_model is not None:
+            self.cost_model.record(context, decision, elapsed_ms)
+        if self.placement_policy is not None:
+            self.placement_policy.observe(context, decision, elapsed_ms)
+        self.record_clean_execution(context)
+        return result
 
 # # Nota: Você precisará criar o arquivo utils.py para rodar este módulo.
\ No newline at end of file
@@ -0,0 +1,261 @@
+# predictor_cascade.py - Cascata de preditores (heurística O(1) → modelo)
+
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from alp_model import PATTERN_LINEAR, PATTERN_STRIDED, PATTERN_RANDOM
+
+logger = logging.getLogger(__name__)
+
+
+class StrideHeuristic:
+    """
+    Tier barato da cascata: examina apenas os últimos `window` strides,
+    portanto custa O(1) independentemente do tamanho do histórico.
+
+    - Stride constante (não nulo) → Linear/Strided com confiança alta e
+      blocos de prefetch extrapolados do stride
+    - Strides todos distintos → Random com confiança baixa (CPU)
+    - Qualquer outro caso (tiles 2D, misturas, warmup, stride nulo) → None:
+      a heurística se abstém e o próximo tier decide
+
+    A confiança segue a fórmula do ALPModel (regularidade * (1 - 2^-evidência))
+    com a evidência limitada à janela.
+    """
+
+    TTID_PREDICTABLE = (90, 150)   # (ttid_pim, ttid_cpu), como no ALPModel
+    TTID_IRREGULAR = (105, 110)
+
+    def __init__(self, window: int = 16, prefetch_depth: int = 4,
+                 block_bytes: int = 64, cache_line_bytes: int = 64):
+        """
+        Args:
+            window: Strides examinados (evidência exigida para responder)
+            prefetch_depth: Blocos de prefetch extrapolados
+            block_bytes: Tamanho do bloco de cache/DMA em bytes
+            cache_line_bytes: Limite entre stride Linear e Strided
+        """
+        if window < 2:
+            raise ValueError("window deve ser >= 2")
+        self.window = window
+        self.prefetch_depth = prefetch_depth
+        self.block_bytes = block_bytes
+        self.cache_line_bytes = cache_line_bytes
+
+    def predict(self, context: Union[int, str], accesses) -> Optional[Dict]:
+        """Responder os casos óbvios ou retornar None (incerto)"""
+        window = self.window
+        if accesses is None or len(accesses) <= window:
+            return None
+        tail = accesses[-(window + 1):]
+        tail = tail.tolist() if hasattr(tail, 'tolist') else list(tail)
+        strides = [b - a for a, b in zip(tail, tail[1:])]
+
+        stride = strides[-1]
+        if stride != 0 and strides.count(stride) == window:
+            return self._constant_prediction(int(tail[-1]), int(stride))
+        if len(set(strides)) == window:
+            return self._random_prediction()
+        return None
+
+    def _blocks(self, last_address: int, stride: int) -> List[int]:
+        """Próximos blocos distintos visitados pelo stride constante"""
+        block_bytes = self.block_bytes
+        if abs(stride) < block_bytes:
+            # Todos os blocos seguintes são visitados em sequência
+            current = last_address - last_address % block_bytes
+            step = block_bytes if stride > 0 else -block_bytes
+            return [current + step * k for k in range(1, self.prefetch_depth + 1)]
+        addresses = [last_address + stride * k for k in range(1, self.prefetch_depth + 1)]
+        return [address - address % block_bytes for address in addresses]
+
+    def _constant_prediction(self, last_address: int, stride: int) -> Dict:
+        confidence = 1.0 - 2.0 ** -self.window
+        pattern = PATTERN_LINEAR if abs(stride) <= self.cache_line_bytes else PATTERN_STRIDED
+        blocks = self._blocks(last_address, stride)
+        ttid_pim, ttid_cpu = self.TTID_PREDICTABLE
+        return {
+            'blocks': blocks,
+            'block_confidence': [confidence] * len(blocks),
+            'confidence': confidence,
+            'ttid_pim': ttid_pim,
+            'ttid_cpu': ttid_cpu,
+            'stride_pattern': pattern,
+            'dominant_stride': stride,
+            'irregularity': 0.0,
+            'reasoning': f'Heurística: stride constante {stride} nos últimos {self.window} acessos'
+        }
+
+    def _random_prediction(self) -> Dict:
+        share = 1.0 / self.window
+        ttid_pim, ttid_cpu = self.TTID_IRREGULAR
+        return {
+            'blocks': [],
+            'block_confidence': [],
+            'confidence': share * 0.5,
+            'ttid_pim': ttid_pim,
+            'ttid_cpu': ttid_cpu,
+            'stride_pattern': PATTERN_RANDOM,
+            'dominant_stride': 0,
+            'irregularity': 1.0 - share,
+            'reasoning': f'Heurística: {self.window} strides distintos (aleatório)'
+        }
+
+
+class CascadeTier:
+    """
+    Um nível da cascata: o preditor e a faixa de confiança considerada
+    incerta. Uma previsão None, ou com confiança em [low, high), é repassada
+    ao próximo tier; o último tier sempre decide.
+    """
+
+    def __init__(self, predictor, name: Optional[str] = None,
+                 uncertain_band: Optional[Tuple[float, float]] = None):
+        self.predictor = predictor
+        self.name = name or type(predictor).__name__
+        self.uncertain_band = tuple(uncertain_band) if uncertain_band is not None else None
+        self.consulted = 0
+        self.answered = 0
+        self.time_ns = 0
+
+    def accepts(self, prediction: Optional[Dict]) -> bool:
+        if prediction is None:
+            return False
+        if self.uncertain_band is None:
+            return True
+        low, high = self.uncertain_band
+        return not (low <= prediction.get('confidence', 0.0) < high)
+
+    def get_stats(self, total_decisions: int) -> Dict:
+        return {
+            'name': self.name,
+            'consulted': self.consulted,
+            'answered': self.answered,
+            'hit_rate': self.answered / max(self.consulted, 1),
+            'decision_share': self.answered / max(total_decisions, 1),
+            'avg_latency_us': self.time_ns / max(self.consulted, 1) / 1000
+        }
+
+
+class PredictorCascade:
+    """
+    Cascata de preditores com a mesma interface do modelo (predict,
+    predict_batch, get_model_stats), para ser passada como ml_model a
+    OLPCoreAPI e PredictionEngine.
+
+    Cada decisão percorre os tiers do mais barato ao mais caro e para no
+    primeiro que responde com segurança; o último tier (normalmente o
+    ALPModel) só é consultado na faixa ambígua. Quando um tier anterior
+    responde, o prior aprendido do último tier (adjust_confidence) ainda é
+    aplicado, de modo que contextos penalizados por recovery continuam na
+    CPU. Atributos não definidos aqui (record_recovery, record_ttid, save...)
+    são os do último tier.
+    """
+
+    def __init__(self, tiers: Sequence):
+        """
+        Args:
+            tiers: Preditores ou CascadeTier, do mais barato ao mais caro
+        """
+        if not tiers:
+            raise ValueError("A cascata precisa de ao menos um tier")
+        self.tiers = [tier if isinstance(tier, CascadeTier) else CascadeTier(tier)
+                      for tier in tiers]
+        self.total_decisions = 0
+
+    @classmethod
+    def from_config(cls, model, config: Optional[Dict] = None,
+                    intermediate: Sequence = ()) -> 'PredictorCascade':
+        """
+        Montar StrideHeuristic → intermediários → model a partir de
+        OLP_CONFIG['predictor_cascade']. Os intermediários (ex.: o
+        SimulatedMLModel) usam a faixa incerta configurada.
+        """
+        config = config or {}
+        band = config.get('uncertain_band', (0.5, 0.999))
+        tiers = [CascadeTier(StrideHeuristic(window=config.get('heuristic_window', 16),
+                                             prefetch_depth=config.get('prefetch_depth', 4)),
+                             'heuristic')]
+        tiers += [CascadeTier(predictor, uncertain_band=band) for predictor in intermediate]
+        tiers.append(CascadeTier(model, 'model'))
+        return cls(tiers)
+
+    def __getattr__(self, name):
+        # Só chamado para atributos ausentes: delegar ao modelo final
+        if name == 'tiers':
+            raise AttributeError(name)
+        return getattr(self.tiers[-1].predictor, name)
+
+    def _finish(self, context, prediction: Dict, tier: CascadeTier, final: bool) -> Dict:
+        if not final:
+            adjust = getattr(self.tiers[-1].predictor, 'adjust_confidence', None)
+            if adjust is not None:
+                prediction['confidence'] = adjust(context, prediction['confidence'])
+        prediction['tier'] = tier.name
+        return prediction
+
+    def predict(self, context: Union[int, str], accesses) -> Dict:
+        """Prever pelo primeiro tier que responde fora da faixa incerta"""
+        self.total_decisions += 1
+        final_index = len(self.tiers) - 1
+        for index, tier in enumerate(self.tiers):
+            start = time.perf_counter_ns()
+            prediction = tier.predictor.predict(context, accesses)
+            tier.time_ns += time.perf_counter_ns() - start
+            tier.consulted += 1
+            final = index == final_index
+            if final or tier.accepts(prediction):
+                tier.answered += 1
+                return self._finish(context, prediction, tier, final)
+
+    def predict_batch(self, contexts: List[Union[int, str]], access_arrays: List) -> List[Dict]:
+        """
+        Versão em lote: cada tier recebe apenas as tarefas ainda pendentes,
+        usando o predict_batch do preditor quando existir.
+        """
+        results = [None] * len(access_arrays)
+        pending = list(range(len(access_arrays)))
+        final_index = len(self.tiers) - 1
+        for index, tier in enumerate(self.tiers):
+            if not pending:
+                break
+            predictor = tier.predictor
+            tier_contexts = [contexts[i] for i in pending]
+            tier_accesses = [access_arrays[i] for i in pending]
+            start = time.perf_counter_ns()
+            if hasattr(predictor, 'predict_batch'):
+                predictions = predictor.predict_batch(tier_contexts, tier_accesses)
+            else:
+                predictions = [predictor.predict(c, a) for c, a in zip(tier_contexts, tier_accesses)]
+            tier.time_ns += time.perf_counter_ns() - start
+            tier.consulted += len(pending)
+
+            final = index == final_index
+            unresolved = []
+            for i, prediction in zip(pending, predictions):
+                if final or tier.accepts(prediction):
+                    tier.answered += 1
+                    results[i] = self._finish(contexts[i], prediction, tier, final)
+                else:
+                    unresolved.append(i)
+            pending = unresolved
+
+        self.total_decisions += len(access_arrays)
+        return results
+
+    def get_cascade_stats(self) -> Dict:
+        """Taxa de acerto por tier e fração de inferências do modelo final evitadas"""
+        total = self.total_decisions
+        return {
+            'total_decisions': total,
+            'tiers': [tier.get_stats(total) for tier in self.tiers],
+            'model_inference_avoided': 1.0 - self.tiers[-1].consulted / max(total, 1) if total else 0.0
+        }
+
+    def get_model_stats(self) -> Dict:
+        """Estatísticas do modelo final acrescidas das da cascata"""
+        model = self.tiers[-1].predictor
+        stats = dict(model.get_model_stats()) if hasattr(model, 'get_model_stats') else {}
+        stats['cascade'] = self.get_cascade_stats()
+        return stats
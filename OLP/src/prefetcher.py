@@ -0,0 +1,298 @@
+# prefetcher.py - Prefetcher por correlação de deltas (Markov) por contexto
+
+import sys
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from context_registry import CONTEXT_REGISTRY
+from context_table import ContextTable
+
+
+class _ContextCorrelation:
+    """Estado de um contexto: tabela de transições e deltas mais recentes"""
+    __slots__ = ('transitions', 'recent', 'tail', 'observed', 'memo')
+    # Custo aproximado de uma chave: tupla de deltas + dict de sucessores
+    KEY_BYTES = 320
+
+    def __init__(self):
+        self.transitions = {}   # (d1, ..., dk) → {próximo delta: contagem}
+        self.recent = []        # Últimos `max_order` deltas observados
+        self.tail = ()          # Últimos endereços já aprendidos
+        self.observed = 0       # Transições aprendidas
+        # Cadeias já percorridas: (deltas recentes, offset no bloco, depth) →
+        # (offsets dos blocos, confianças, usou ordem menor que max_order)
+        self.memo = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Tamanho estimado (cresce com as chaves aprendidas; ver ContextTable.resize)"""
+        return (sys.getsizeof(self.transitions) + len(self.transitions) * self.KEY_BYTES
+                + sys.getsizeof(self.recent) + len(self.memo) * self.KEY_BYTES)
+
+
+class DeltaCorrelationPrefetcher:
+    """
+    Prefetcher por correlação de deltas com backoff de ordem variável.
+
+    Para cada contexto aprende, a partir dos strides observados, qual delta
+    segue cada sequência dos últimos k deltas (k = max_order ... 1). Na
+    previsão, a cadeia de deltas mais provável é percorrida a partir do
+    último endereço, usando sempre a maior ordem conhecida, até cobrir
+    `prefetch_depth` blocos de cache distintos. A confiança de cada bloco é
+    a probabilidade acumulada da cadeia até o primeiro acesso ao bloco.
+
+    Padrões lineares e strided são cobertos pela ordem 1; tiles 2D (vários
+    strides curtos seguidos de um salto de linha) pelas ordens mais altas.
+
+    A cadeia percorrida é memorizada por contexto (deltas recentes, offset
+    do último acesso no bloco): em regime (o mesmo padrão repetindo, com
+    as probabilidades da tabela estáveis) a previsão não refaz o percurso.
+    """
+
+    MEMO_SIZE = 64   # Cadeias memorizadas por contexto
+
+    def __init__(self, prefetch_depth: int = 4, block_bytes: int = 64,
+                 max_order: int = 8, min_confidence: float = 0.5, min_support: int = 2,
+                 max_keys: int = 1024, max_successors: int = 4,
+                 learn_window: int = 64, table_config: Optional[Dict] = None):
+        """
+        Args:
+            prefetch_depth: Número de blocos de cache a prever
+            block_bytes: Tamanho do bloco de cache/DMA em bytes
+            max_order: Maior número de deltas usados como chave
+            min_confidence: Confiança acumulada mínima para continuar a cadeia
+            min_support: Ocorrências mínimas de uma chave para usá-la na previsão
+            max_keys: Limite de chaves na tabela de cada contexto
+            max_successors: Deltas sucessores mantidos por chave
+            learn_window: Deltas mais recentes aprendidos quando não há continuidade
+            table_config: Limites da tabela por contexto
+                          (formato de OLP_CONFIG['context_tables'])
+        """
+        self.prefetch_depth = prefetch_depth
+        self.block_bytes = block_bytes
+        self.max_order = max_order
+        self.min_confidence = min_confidence
+        self.min_support = min_support
+        self.max_keys = max_keys
+        self.max_successors = max_successors
+        self.learn_window = learn_window
+        self.max_steps_per_block = 64   # Limite da cadeia por bloco (strides pequenos)
+
+        self.contexts = ContextTable.from_config(
+            'prefetch.correlation', table_config, default_factory=_ContextCorrelation
+        )
+        self.total_predictions = 0
+        self.total_blocks = 0
+
+    # ------------------------------------------------------------------
+    # Aprendizado
+    # ------------------------------------------------------------------
+
+    def observe(self, context: Union[int, str], accesses) -> int:
+        """
+        Aprender as transições de delta de uma sequência de acessos.
+
+        Chamadas repetidas com janelas sobrepostas (ex.: o buffer do tracer)
+        aprendem apenas os acessos novos: a sequência é retomada a partir
+        dos últimos endereços já vistos. Retorna o número de transições
+        aprendidas.
+        """
+        handle = CONTEXT_REGISTRY.resolve(context)
+        state = self.contexts[handle]
+        window = accesses[-(self.learn_window + 1):]
+        # Listas Python: a janela é curta e, em regime, só o fim é novo
+        addresses = window.tolist() if isinstance(window, np.ndarray) else list(window)
+        if len(addresses) < 2:
+            return 0
+
+        start = self._resume_position(state, addresses)
+        if start is None:
+            # Sem continuidade com o que foi aprendido: nova sequência
+            state.recent = []
+            start = 0
+        new = addresses[start:]
+        state.tail = tuple(addresses[-4:])
+        if len(new) < 2:
+            return 0
+
+        for previous, address in zip(new, new[1:]):
+            self._learn(state, address - previous)
+        # A tabela de transições cresceu no lugar: re-medir para o orçamento
+        self.contexts.resize(handle)
+        return len(new) - 1
+
+    def _resume_position(self, state: _ContextCorrelation, addresses: List[int]) -> Optional[int]:
+        """Índice do último endereço já aprendido na nova janela (None se ausente)"""
+        tail = state.tail
+        k = len(tail)
+        if not tail or len(addresses) < k:
+            return None
+        last = tail[-1]
+        # Do fim para o início: janelas deslizantes retomam perto do fim
+        for end in range(len(addresses) - 1, k - 2, -1):
+            if addresses[end] == last and tuple(addresses[end - k + 1:end + 1]) == tail:
+                return end
+        return None
+
+    def _learn(self, state: _ContextCorrelation, delta: int) -> None:
+        recent = state.recent
+        history = tuple(recent)
+        transitions = state.transitions
+        changed_top = changed_low = False
+        for order in range(1, min(len(recent), self.max_order) + 1):
+            key = history[-order:]
+            successors = transitions.get(key)
+            if successors is None:
+                if len(transitions) >= self.max_keys:
+                    # Tabela cheia: descartar a chave mais antiga
+                    del transitions[next(iter(transitions))]
+                successors = transitions[key] = {}
+            if delta in successors:
+                successors[delta] += 1
+                # Único sucessor com suporte: a probabilidade segue 1.0 e as
+                # cadeias memorizadas continuam válidas
+                changed = len(successors) > 1 or successors[delta] == self.min_support
+            else:
+                if len(successors) >= self.max_successors:
+                    del successors[min(successors, key=successors.get)]
+                successors[delta] = 1
+                changed = True
+            if changed and order == self.max_order:
+                changed_top = True
+            elif changed:
+                changed_low = True
+        if changed_top:
+            state.memo.clear()
+        elif changed_low and state.memo:
+            # Só as cadeias que recorreram a ordens menores dependem da mudança
+            for key in [key for key, walk in state.memo.items() if walk[2]]:
+                del state.memo[key]
+        recent.append(delta)
+        if len(recent) > self.max_order:
+            del recent[0]
+        state.observed += 1
+
+    # ------------------------------------------------------------------
+    # Previsão
+    # ------------------------------------------------------------------
+
+    def _next_delta(self, transitions: Dict, history: List[int]) -> Optional[Tuple[int, float, int]]:
+        """
+        Delta mais provável após `history`, pela maior ordem com suporte
+        suficiente → (delta, probabilidade, ordem usada)
+        """
+        for order in range(min(len(history), self.max_order), 0, -1):
+            successors = transitions.get(tuple(history[-order:]))
+            if successors:
+                total = sum(successors.values())
+                if total >= self.min_support:
+                    delta = max(successors, key=successors.get)
+                    return delta, successors[delta] / total, order
+        return None
+
+    def predict(self, context: Union[int, str], last_address: int,
+                depth: Optional[int] = None) -> Tuple[List[int], List[float]]:
+        """
+        Prever os próximos blocos de cache a partir de `last_address`.
+
+        Returns:
+            (blocos, confianças): endereços alinhados a block_bytes, na ordem
+            em que serão acessados, e a confiança de cada bloco
+        """
+        depth = self.prefetch_depth if depth is None else depth
+        state = self.contexts.get(CONTEXT_REGISTRY.resolve(context))
+        self.total_predictions += 1
+        if state is None or not state.transitions or depth <= 0:
+            return [], []
+
+        current_block = last_address - last_address % self.block_bytes
+        memo_key = (tuple(state.recent), last_address - current_block, depth)
+        memoized = state.memo.get(memo_key)
+        if memoized is None:
+            memoized = self._walk(state, last_address, depth)
+            if len(state.memo) >= self.MEMO_SIZE:
+                state.memo.clear()
+            state.memo[memo_key] = memoized
+        offsets, confidences, _ = memoized
+        self.total_blocks += len(offsets)
+        return [current_block + offset for offset in offsets], list(confidences)
+
+    def _walk(self, state: _ContextCorrelation, last_address: int,
+              depth: int) -> Tuple[Tuple[int, ...], Tuple[float, ...], bool]:
+        """
+        Percorrer a cadeia de deltas → (offsets dos blocos a partir do bloco
+        atual, confianças, se alguma consulta recorreu a ordem < max_order)
+        """
+        transitions = state.transitions
+        history = list(state.recent)
+        block_bytes = self.block_bytes
+        current_block = last_address - last_address % block_bytes
+        address = last_address
+        probability = 1.0
+        blocks, confidences = [], []
+
+        # A tabela é fixa durante a previsão, então o próximo delta depende só
+        # do estado (últimos deltas): ao revisitar um estado a cadeia entrou
+        # em ciclo e passa a ser repetida sem novas consultas à tabela.
+        seen = {}
+        path = []
+        cycle, cycle_pos = None, 0
+        backoff = False
+
+        for _ in range(depth * self.max_steps_per_block):
+            if cycle is None:
+                key = tuple(history)
+                start = seen.get(key)
+                if start is None:
+                    seen[key] = len(path)
+                    step = self._next_delta(transitions, history)
+                    if step is None:
+                        backoff = True
+                        break
+                    step, order = step[:2], step[2]
+                    backoff = backoff or order < self.max_order
+                    path.append(step)
+                    history.append(step[0])
+                    if len(history) > self.max_order:
+                        del history[0]
+                else:
+                    cycle = path[start:]
+            if cycle is not None:
+                step = cycle[cycle_pos]
+                cycle_pos = cycle_pos + 1 if cycle_pos + 1 < len(cycle) else 0
+
+            delta, p = step
+            probability *= p
+            if probability < self.min_confidence:
+                break
+            address += delta
+
+            block = address - address % block_bytes
+            if block != current_block and block not in blocks:
+                blocks.append(block)
+                confidences.append(probability)
+                if len(blocks) >= depth:
+                    break
+            current_block = block
+
+        origin = last_address - last_address % block_bytes
+        return tuple(block - origin for block in blocks), tuple(confidences), backoff
+
+    def prefetch(self, context: Union[int, str], accesses,
+                 depth: Optional[int] = None) -> Tuple[List[int], List[float]]:
+        """Aprender com `accesses` e prever os blocos seguintes ao último acesso"""
+        if accesses is None or len(accesses) == 0:
+            return [], []
+        self.observe(context, accesses)
+        return self.predict(context, int(accesses[-1]), depth)
+
+    def get_stats(self) -> Dict:
+        """Retornar estatísticas do prefetcher"""
+        return {
+            'contexts': len(self.contexts),
+            'prefetch_depth': self.prefetch_depth,
+            'block_bytes': self.block_bytes,
+            'total_predictions': self.total_predictions,
+            'avg_blocks_per_prediction': self.total_blocks / max(self.total_predictions, 1)
+        }
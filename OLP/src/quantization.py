@@ -0,0 +1,190 @@
+# quantization.py - Inferência int8 (pesos por canal) para o ALPModel
+
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+INT8_MAX = 127
+
+
+def quantize_per_channel(kernel: np.ndarray):
+    """
+    Quantização simétrica por canal de saída: kernel (in, out) float →
+    (pesos int8 (in, out), escala float64 (out,)), com w ≈ q * escala.
+    """
+    kernel = np.asarray(kernel, dtype=np.float64)
+    scale = np.abs(kernel).max(axis=0) / INT8_MAX
+    scale[scale == 0] = 1.0
+    quantized = np.clip(np.rint(kernel / scale), -INT8_MAX, INT8_MAX).astype(np.int8)
+    return quantized, scale
+
+
+def quantize_rows(x: np.ndarray):
+    """Quantização simétrica por linha (amostra) das ativações → (int8, escala (B,))"""
+    scale = np.abs(x).max(axis=1) / INT8_MAX
+    scale[scale == 0] = 1.0
+    quantized = np.clip(np.rint(x / scale[:, None]), -INT8_MAX, INT8_MAX).astype(np.int8)
+    return quantized, scale
+
+
+class QuantizedLinear:
+    """
+    Camada densa com pesos int8 por canal e acumulação int32.
+
+    Com `input_range` definido a escala das ativações é estática (entradas
+    conhecidas em [-input_range, input_range]), evitando medir o máximo a
+    cada chamada; com None a escala é calculada por amostra. Se o erro
+    relativo de reconstrução dos pesos passar de `tolerance`, a camada
+    mantém os pesos float (fallback) e o forward é o float original.
+    """
+
+    def __init__(self, kernel: np.ndarray, bias: np.ndarray,
+                 input_range: Optional[float] = 1.0, tolerance: float = 0.02):
+        kernel = np.asarray(kernel, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.input_range = input_range
+        quantized, scale = quantize_per_channel(kernel)
+        error = np.abs(quantized * scale - kernel).max() / max(np.abs(kernel).max(), 1e-12)
+        self.reconstruction_error = float(error)
+        self.is_quantized = error <= tolerance
+        if self.is_quantized:
+            self.weights = quantized
+            self.weight_scale = scale
+            # Escala de saída pré-combinada (entrada estática × canal)
+            if input_range is not None:
+                self._output_scale = scale * (input_range / INT8_MAX)
+            self.kernel = None
+        else:
+            self.weights = None
+            self.weight_scale = None
+            self.kernel = kernel
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        if not self.is_quantized:
+            return x @ self.kernel + self.bias
+        if self.input_range is not None:
+            quantized = np.rint(x * (INT8_MAX / self.input_range)).astype(np.int8)
+            accumulator = np.matmul(quantized, self.weights, dtype=np.int32)
+            return accumulator * self._output_scale + self.bias
+        quantized, x_scale = quantize_rows(x)
+        accumulator = np.matmul(quantized, self.weights, dtype=np.int32)
+        return accumulator * np.outer(x_scale, self.weight_scale) + self.bias
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes dos parâmetros armazenados (pesos int8 + escalas + bias)"""
+        if not self.is_quantized:
+            return self.kernel.nbytes + self.bias.nbytes
+        return self.weights.nbytes + self.weight_scale.nbytes + self.bias.nbytes
+
+
+class QuantizedForward:
+    """
+    Forward int8 equivalente a ALPModel._forward(): um passo da célula LSTM
+    (estado inicial zero) e a camada densa. Como as colunas de entrada além
+    de sequence_length são sempre zero, só as linhas usadas do kernel LSTM
+    são quantizadas. As duas camadas usam escala estática: as entradas já
+    chegam normalizadas em [-1, 1] e a saída da tanh também está em [-1, 1].
+    """
+
+    def __init__(self, lstm_weights: Dict, sequence_length: int = 16, tolerance: float = 0.02):
+        self.sequence_length = sequence_length
+        self.lstm = QuantizedLinear(lstm_weights['lstm_kernel'][:sequence_length],
+                                    lstm_weights['lstm_bias'], 1.0, tolerance)
+        self.dense = QuantizedLinear(lstm_weights['dense_kernel'],
+                                     lstm_weights['dense_bias'], 1.0, tolerance)
+
+    def __call__(self, inputs: np.ndarray) -> np.ndarray:
+        hidden = np.tanh(self.lstm(inputs))
+        return self.dense(hidden)
+
+    @property
+    def nbytes(self) -> int:
+        return self.lstm.nbytes + self.dense.nbytes
+
+    @property
+    def is_quantized(self) -> bool:
+        return self.lstm.is_quantized and self.dense.is_quantized
+
+
+# ============================================================================
+# HARNESS DE COMPARAÇÃO (int8 vs float)
+# ============================================================================
+
+def compare_precisions(model_float, model_int8, contexts: List, access_arrays: List,
+                       repeats: int = 200) -> Dict:
+    """
+    Comparar um ALPModel float e um int8 com os mesmos pesos.
+
+    Mede, sobre as mesmas sequências: erro máximo da saída do forward,
+    diferença máxima de confiança, decisões PIM/CPU divergentes (mesmo
+    critério de OLPCoreAPI), custo por forward e memória dos parâmetros.
+    """
+    inputs = np.vstack([model_float.preprocess_input(c, a) for c, a in zip(contexts, access_arrays)])
+
+    float_output = model_float._forward(inputs)
+    int8_output = model_int8._forward(inputs)
+
+    float_predictions = model_float.predict_batch(contexts, access_arrays)
+    int8_predictions = model_int8.predict_batch(contexts, access_arrays)
+
+    def decision(prediction):
+        gain = prediction.get('ttid_cpu', 100) - prediction.get('ttid_pim', 100)
+        return 'PIM' if prediction.get('confidence', 0) >= model_float.confidence_threshold \
+            and gain > 0 else 'CPU'
+
+    mismatches = sum(decision(f) != decision(q) for f, q in zip(float_predictions, int8_predictions))
+    confidence_diff = max(abs(f['confidence'] - q['confidence'])
+                          for f, q in zip(float_predictions, int8_predictions))
+
+    def cost_us(model) -> float:
+        row = inputs[:1]
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model._forward(row)
+        return (time.perf_counter() - start) * 1e6 / repeats
+
+    float_bytes = sum(model_float.lstm_weights[name].nbytes
+                      for name in ('lstm_kernel', 'lstm_bias', 'dense_kernel', 'dense_bias'))
+
+    return {
+        'samples': len(access_arrays),
+        'max_output_error': float(np.abs(float_output - int8_output).max()),
+        'max_confidence_diff': float(confidence_diff),
+        'decision_mismatches': int(mismatches),
+        'float_forward_us': cost_us(model_float),
+        'int8_forward_us': cost_us(model_int8),
+        'float_param_bytes': int(float_bytes),
+        'int8_param_bytes': int(model_int8.quantized.nbytes) if model_int8.quantized else int(float_bytes)
+    }
+
+
+if __name__ == "__main__":
+    from alp_model import ALPModel
+
+    rng = np.random.default_rng(0)
+    model_float = ALPModel(model_config={'cache_max_size': 0, 'model_calibration': True})
+    model_int8 = ALPModel(model_config={'cache_max_size': 0, 'model_calibration': True,
+                                        'inference_precision': 'int8'})
+    model_int8.lstm_weights = model_float.lstm_weights
+    model_int8.set_inference_precision('int8')
+
+    access_arrays = []
+    for i in range(400):
+        n = int(rng.integers(2, 100))
+        kind = i % 4
+        if kind == 0:
+            access_arrays.append([0x1000 + j * 8 for j in range(n)])
+        elif kind == 1:
+            access_arrays.append([0x1000 + j * 4096 for j in range(n)])
+        elif kind == 2:
+            access_arrays.append([0x1000 + (j // 8) * 4096 + (j % 8) * 8 for j in range(n)])
+        else:
+            access_arrays.append(rng.integers(0, 1 << 30, n).tolist())
+    contexts = [f"quant_{i % 16}" for i in range(len(access_arrays))]
+
+    report = compare_precisions(model_float, model_int8, contexts, access_arrays)
+    print("\nALPModel - int8 vs float\n")
+    for key, value in report.items():
+        print(f"  {key:22} = {value}")
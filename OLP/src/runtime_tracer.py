@@ -1,34 +1,168 @@
 # runtime_tracer.py
 
+import numpy as np
+
+from context_registry import CONTEXT_REGISTRY
+from context_table import ContextTable
+
+
+class AccessRingBuffer:
+    """
+    Buffer circular pré-alocado de endereços (int64) para um contexto.
+
+    Cada endereço é escrito duas vezes (posições i e i + capacity), de modo que
+    a janela ordenada dos últimos acessos é sempre uma fatia contígua do array
+    e pode ser devolvida como view, sem cópia.
+    """
+    def __init__(self, capacity: int = 100):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positiva")
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=np.int64)
+        self._cursor = 0  # Próxima posição de escrita (0 <= cursor < capacity)
+        self._size = 0
+
+    def append(self, address: int):
+        """Registra um endereço, sobrescrevendo o mais antigo se estiver cheio."""
+        cursor = self._cursor
+        self._data[cursor] = address
+        self._data[cursor + self.capacity] = address
+        self._cursor = cursor + 1 if cursor + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+
+    def extend(self, addresses: np.ndarray):
+        """Registra um bloco de endereços int64 com no máximo quatro cópias vetorizadas."""
+        n = len(addresses)
+        if n == 0:
+            return
+        capacity = self.capacity
+        if n >= capacity:
+            # Só os últimos `capacity` endereços sobrevivem
+            tail = addresses[n - capacity:]
+            self._data[:capacity] = tail
+            self._data[capacity:] = tail
+            self._cursor = 0
+            self._size = capacity
+            return
+        cursor = self._cursor
+        first = min(n, capacity - cursor)
+        self._data[cursor:cursor + first] = addresses[:first]
+        self._data[cursor + capacity:cursor + capacity + first] = addresses[:first]
+        rest = n - first
+        if rest:
+            self._data[:rest] = addresses[first:]
+            self._data[capacity:capacity + rest] = addresses[first:]
+        self._cursor = (cursor + n) % capacity
+        self._size = min(capacity, self._size + n)
+
+    def view(self) -> np.ndarray:
+        """
+        Retorna os acessos em ordem cronológica (view somente-leitura, zero-copy).
+
+        A view reflete o buffer no momento da chamada e é válida até o próximo
+        registro; copie-a (np.array) se precisar mantê-la.
+        """
+        if self._size < self.capacity:
+            window = self._data[:self._size]
+        else:
+            window = self._data[self._cursor:self._cursor + self.capacity]
+        window = window.view()
+        window.flags.writeable = False
+        return window
+
+    def clear(self):
+        self._cursor = 0
+        self._size = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def __len__(self) -> int:
+        return self._size
+
+
+def as_address_array(addresses) -> np.ndarray:
+    """
+    Converte ndarray, array.array, memoryview ou sequência em um array int64 1-D.
+
+    Objetos com buffer protocol são lidos sem cópia; a conversão de dtype
+    (ex.: uint32 -> int64) é feita em uma única operação vetorizada.
+    """
+    if isinstance(addresses, np.ndarray):
+        array = addresses
+    elif isinstance(addresses, (list, tuple)):
+        array = np.asarray(addresses, dtype=np.int64)
+    else:
+        array = np.asarray(memoryview(addresses))
+    if array.dtype.kind not in 'iu':
+        raise TypeError(f"Endereços devem ser inteiros, recebido dtype={array.dtype}")
+    return array.reshape(-1).astype(np.int64, copy=False)
+
+
 class RuntimeTracer:
     """
     Rastreia o contexto de execução e os padrões de acesso à memória.
     Métrica de Entrada: Contexto da Aplicação + Padrão de Stride.
     """
-    def __init__(self):
-        # Armazena histórico: {'Contexto_ID': [acesso_1, acesso_2, ...]}
-        self.history = {} 
-        self.context_id = None
+    def __init__(self, history_capacity: int = 100, table_config: dict = None):
+        # Armazena histórico: {handle_do_contexto: AccessRingBuffer} (limitado, LRU).
+        # Buffers pré-alocados: o tamanho medido na inserção já é o final.
+        self.history_capacity = history_capacity
+        self.history = ContextTable.from_config(
+            'tracer.history', table_config,
+            default_factory=lambda: AccessRingBuffer(self.history_capacity)
+        )
+        self.context_id = None  # Handle inteiro (ver CONTEXT_REGISTRY)
+        self._current_buffer = None
         print("M1: RuntimeTracer inicializado.")
 
-    def set_context(self, function_name: str, line_number: int):
+    def set_context(self, function_name: str, line_number: int) -> int:
         """Define o contexto atual (o ponto exato do código que está sendo executado)."""
-        self.context_id = f"{function_name}_{line_number}"
-        if self.context_id not in self.history:
-            self.history[self.context_id] = []
-        print(f"  -> Contexto definido: {self.context_id}")
+        handle = self.select_context(CONTEXT_REGISTRY.intern(function_name, line_number))
+        print(f"  -> Contexto definido: {CONTEXT_REGISTRY.name_of(handle)}")
+        return handle
+
+    def select_context(self, handle: int) -> int:
+        """Ativa um contexto já internado, pelo handle (sem custo de formatação)."""
+        # Com TinyLFU, um contexto frio recebe um buffer transitório (fora da
+        # tabela): os acessos valem para este contexto ativo, sem reter estado
+        buffer = self.history[handle]
+        self.context_id = handle
+        self._current_buffer = buffer
+        return handle
 
     def log_access(self, memory_address: int):
         """Registra um acesso à memória para análise de Stride."""
-        if self.context_id:
-            # Mantém apenas um número limitado de acessos recentes para eficiência
-            if len(self.history[self.context_id]) >= 100:
-                self.history[self.context_id].pop(0) 
-            self.history[self.context_id].append(memory_address)
+        if self._current_buffer is not None:
+            # Buffer circular de tamanho fixo: O(1) por acesso, sem realocação
+            self._current_buffer.append(memory_address)
+
+    def log_accesses(self, addresses) -> int:
+        """
+        Registra um lote de acessos (ndarray, array.array ou memoryview)
+        no histórico do contexto atual, sem laço Python por elemento.
+        Retorna o número de endereços registrados.
+        """
+        if self._current_buffer is None:
+            return 0
+        addresses = as_address_array(addresses)
+        self._current_buffer.extend(addresses)
+        return len(addresses)
 
     def get_context_data(self) -> tuple:
         """Retorna o contexto e os últimos acessos para o Módulo de Decisão (ALP)."""
-        return self.context_id, self.history.get(self.context_id, [])
+        if self._current_buffer is None:
+            return self.context_id, np.empty(0, dtype=np.int64)
+        return self.context_id, self._current_buffer.view()
+
+    def get_accesses(self, handle: int) -> np.ndarray:
+        """Retorna os últimos acessos de um contexto qualquer (vazio se desconhecido)."""
+        buffer = self._current_buffer if handle == self.context_id else self.history.get(handle)
+        if buffer is None:
+            return np.empty(0, dtype=np.int64)
+        return buffer.view()
 
 # # Exemplo de uso (para testagem):
 # TRACER = RuntimeTracer()
@@ -1,5 +1,8 @@
 # utils.py - Simulações de Hardware e ML para desenvolvimento
 
+from context_registry import CONTEXT_REGISTRY
+from prefetcher import DeltaCorrelationPrefetcher
+
 # --- Simulação do Hardware ---
 class CPUCore:
     def execute(self, task_function, data):
@@ -31,6 +34,10 @@ PIM_UNIT = PIMUnit()
 class SimulatedMLModel:
     """Simula o modelo ALP treinado para previsão."""
     
+    def __init__(self, prefetch_depth=4):
+        # Blocos de prefetch reais, aprendidos dos strides de cada contexto
+        self.prefetcher = DeltaCorrelationPrefetcher(prefetch_depth=prefetch_depth)
+    
     def predict(self, context, accesses):
         """
         Simulação de resultado ideal (99.99% de confiança, 40% de ganho de TTID).
@@ -38,9 +45,11 @@ class SimulatedMLModel:
         # Estes valores viriam do seu modelo de ML real
         
         # Simulação de um resultado ideal
-        if "matrix_multiply" in context and len(accesses) > 10:
+        if "matrix_multiply" in CONTEXT_REGISTRY.function_of(context) and len(accesses) > 10:
+             blocks, block_confidence = self.prefetcher.prefetch(context, accesses)
              return {
-                'blocks': [0x1010, 0x1020, 0x1030], 
+                'blocks': blocks,
+                'block_confidence': block_confidence,
                 'confidence': 0.9999,
                 'ttid_pim': 100,
                 'ttid_cpu': 160
@@ -49,6 +58,7 @@ class SimulatedMLModel:
         # Simulação de um resultado de baixa confiança
         return {
             'blocks': [], 
+            'block_confidence': [],
             'confidence': 0.85, # Não atinge 0.999
             'ttid_pim': 100,
             'ttid_cpu': 110 # Ganho de apenas 9.09%
@@ -1,9 +1,20 @@
 # test_olp.py
 
+import array
 import unittest
+import numpy as np
 from unittest.mock import MagicMock, patch
 
 # Importar todos os módulos e simulações necessárias
+from adaptive_threshold import AdaptiveConfidenceThreshold
+from alp_model import ALPModel
+from context_registry import CONTEXT_REGISTRY, CallSite
+from context_table import ContextTable
+from cost_model import CostModel
+from olp_core_api import OLPCoreAPI
+from olp_hal_driver import OLPHALDriver
+from placement_policy import ThompsonPlacementPolicy
+from prefetcher import DeltaCorrelationPrefetcher
 from runtime_tracer import RuntimeTracer
 from prediction_engine import PredictionEngine
 from pim_recovery import PIMRecoveryModule
@@ -121,8 +132,366 @@ class TestOLPRigor(unittest.TestCase):
         MockPIM.retrieve_state_at.assert_called_once_with(0x500)
         MockCPU.resume_execution.assert_called_once()
         
-        # D. Rigor: Aumento da Confiança Pós-Falha
-        self.assertEqual(self.engine.MIN_CONFIDENCE, 0.99999, "A confiança mínima deve ser aumentada após um FP Crítico.")
+        # D. Rigor: Aumento da Confiança Pós-Falha (apenas no contexto que falhou)
+        self.assertAlmostEqual(self.engine.threshold_for(faulty_context), 0.99999, places=12,
+                               msg="A confiança mínima do contexto deve ser aumentada após um FP Crítico.")
+        self.assertEqual(self.engine.MIN_CONFIDENCE, 0.999, "Os demais contextos mantêm o limiar base.")
+
+    # =================================================================
+    # TESTES PARA O MÓDULO 1 (RUNTIME TRACER)
+    # =================================================================
+
+    def test_05_tracer_ring_buffer_ordered_view(self):
+        """
+        Teste: O histórico é um buffer circular de capacidade fixa e
+        get_context_data devolve os últimos acessos em ordem, sem cópia.
+        """
+        tracer = RuntimeTracer(history_capacity=8)
+        tracer.set_context("ring_func", 1)
+        for i in range(20):
+            tracer.log_access(0x2000 + i * 64)
+
+        _, accesses = tracer.get_context_data()
+
+        self.assertEqual(accesses.dtype, np.int64)
+        self.assertEqual(list(accesses), [0x2000 + i * 64 for i in range(12, 20)])
+        self.assertFalse(accesses.flags.writeable, "A view deve ser somente-leitura.")
+        self.assertFalse(accesses.flags.owndata, "A view não deve copiar o buffer.")
+
+
+    def test_06_tracer_bulk_log_accesses(self):
+        """
+        Teste: log_accesses aceita ndarray, array.array e memoryview e produz
+        o mesmo histórico que chamadas individuais a log_access.
+        """
+        addresses = np.arange(0x4000, 0x4000 + 13 * 8, 8, dtype=np.uint32)
+
+        bulk = RuntimeTracer(history_capacity=10)
+        bulk.set_context("bulk_func", 1)
+        bulk.log_accesses(addresses[:4])
+        bulk.log_accesses(array.array('I', addresses[4:9].tolist()))
+        count = bulk.log_accesses(memoryview(addresses[9:].copy()))
+
+        single = RuntimeTracer(history_capacity=10)
+        single.set_context("bulk_func", 1)
+        for address in addresses.tolist():
+            single.log_access(address)
+
+        self.assertEqual(count, 4)
+        self.assertEqual(list(bulk.get_context_data()[1]), list(single.get_context_data()[1]))
+
+    def test_07_context_handles_are_interned(self):
+        """
+        Teste: set_context retorna um handle inteiro estável; o mesmo par
+        (função, escopo) sempre resolve para o mesmo handle.
+        """
+        tracer = RuntimeTracer()
+        first = tracer.set_context("handle_func", 7)
+        tracer.set_context("other_func", 7)
+        again = tracer.set_context("handle_func", 7)
+
+        self.assertIsInstance(first, int)
+        self.assertEqual(first, again)
+        self.assertEqual(tracer.context_id, first)
+        self.assertIn(first, tracer.history)
+        self.assertEqual(CONTEXT_REGISTRY.name_of(first), "handle_func_7")
+        self.assertEqual(CONTEXT_REGISTRY.resolve(first), first)
+
+    def test_08_context_table_bounded_eviction(self):
+        """
+        Teste: Tabelas por contexto respeitam o limite de entradas/bytes e
+        contam despejos; TinyLFU recusa candidatos frios.
+        """
+        lru = ContextTable('lru', max_entries=3)
+        for key in range(5):
+            lru[key] = key
+        lru.get(2)
+        lru[5] = 5
+
+        self.assertEqual(lru.keys(), [4, 2, 5])
+        self.assertEqual(lru.get_stats()['evictions'], 3)
+
+        by_bytes = ContextTable('bytes', max_bytes=3 * 800)
+        for key in range(10):
+            by_bytes[key] = np.zeros(100, dtype=np.int64)
+        self.assertEqual(len(by_bytes), 3)
+
+        tiny = ContextTable('tiny', max_entries=2, policy='tinylfu')
+        for _ in range(5):
+            tiny['hot_a'] = 1
+            tiny['hot_b'] = 2
+        tiny['cold'] = 3
+        self.assertNotIn('cold', tiny)
+        self.assertEqual(tiny.get_stats()['rejections'], 1)
+
+    @patch('pim_recovery.PIM_UNIT', new_callable=MagicMock)
+    @patch('pim_recovery.CPU_CORE', new_callable=MagicMock)
+    def test_09_recovery_feedback_stops_bad_offloads(self, MockCPU, MockPIM):
+        """
+        Teste: Recoveries no mesmo contexto alimentam o aprendizado online do
+        ALPModel; com o passo padrão, a confiança saturada de um padrão
+        linear volta para a CPU no terceiro evento.
+        """
+        model = ALPModel(model_config={'cache_max_size': 0})
+        engine = PredictionEngine(model, latency_threshold=0.30, confidence_threshold=0.999)
+        recovery = PIMRecoveryModule(engine, self.mock_rem_sync)
+        context = CONTEXT_REGISTRY.intern("bad_offload_func", 3)
+        accesses = [0x1000 + i * 8 for i in range(64)]
+
+        decision, _ = engine.assess_and_decide(context, accesses)
+        self.assertEqual(decision, 'PIM')
+
+        for event in range(1, 4):
+            recovery.handle_critical_interrupt("PREFETCH_MISMATCH", context)
+            self.assertTrue(model.flush_feedback(timeout=5.0))
+            # Isolar o efeito aprendido do aumento de rigor do contexto
+            engine.confidence_thresholds.reset(context)
+            decision, _ = engine.assess_and_decide(context, accesses)
+            if decision == 'CPU':
+                break
+
+        self.assertEqual(decision, 'CPU', "Offloads ruins repetidos devem parar.")
+        self.assertEqual(event, 3, "Confiança saturada: três recoveries com o passo padrão.")
+        self.assertEqual(model.get_model_stats()['online_learning']['events_applied'], event)
+
+        # Outros contextos não são afetados
+        other = CONTEXT_REGISTRY.intern("good_offload_func", 3)
+        decision, _ = engine.assess_and_decide(other, accesses)
+        self.assertEqual(decision, 'PIM')
+
+    @patch('pim_recovery.PIM_UNIT', new_callable=MagicMock)
+    @patch('pim_recovery.CPU_CORE', new_callable=MagicMock)
+    def test_10_decision_cache_invalidated_on_recovery(self, MockCPU, MockPIM):
+        """
+        Teste: Com a mesma assinatura de stride o modelo não é consultado de
+        novo (blocos relativos ao último acesso); o recovery do contexto
+        invalida o cache e a próxima decisão volta ao modelo.
+        """
+        self.mock_ml_model.predict.return_value = {
+            'blocks': [0x1080, 0x10C0], 'confidence': 0.9999,
+            'ttid_pim': 80, 'ttid_cpu': 150
+        }
+        context = self.tracer.context_id
+        accesses = [0x1000 + i * 8 for i in range(16)]
+        shifted = [address + 0x400 for address in accesses]
+
+        first = self.engine.assess_and_decide(context, accesses)
+        second = self.engine.assess_and_decide(context, shifted)
+        self.assertEqual(self.mock_ml_model.predict.call_count, 1, "Regime estacionário não deve consultar o modelo.")
+        self.assertEqual(first, ('PIM', [0x1080, 0x10C0]))
+        self.assertEqual(second, ('PIM', [0x1480, 0x14C0]))
+
+        # Limiares são reaplicados sobre a entrada em cache
+        self.engine.MIN_CONFIDENCE = 0.99999
+        self.assertEqual(self.engine.assess_and_decide(context, accesses)[0], 'CPU')
+        self.engine.MIN_CONFIDENCE = 0.999
+
+        self.recovery.handle_critical_interrupt("PREFETCH_MISMATCH", context)
+        self.engine.assess_and_decide(context, accesses)
+        self.assertEqual(self.mock_ml_model.predict.call_count, 2, "Recovery deve invalidar o cache do contexto.")
+        self.assertEqual(self.engine.get_cache_stats()['invalidations'], 1)
+
+    def test_11_measured_costs_drive_ttid_gain(self):
+        """
+        Teste: Com TTIDs medidos nas duas vias, a regra de ganho usa o
+        CostModel (quantil do PIM vs EWMA da CPU) em vez dos valores do modelo.
+        """
+        self.mock_ml_model.predict.return_value = {
+            'blocks': [0x1080], 'confidence': 0.9999,
+            'ttid_pim': 80, 'ttid_cpu': 150
+        }
+        costs = CostModel(min_samples=2)
+        engine = PredictionEngine(self.mock_ml_model, latency_threshold=0.30,
+                                  confidence_threshold=0.999, cost_model=costs)
+        context, accesses = self.tracer.get_context_data()
+
+        costs.record(context, 'PIM', 9.0)
+        costs.record(context, 'CPU', 10.0)
+        self.assertEqual(engine.assess_and_decide(context, accesses)[0], 'PIM', "Sem medições suficientes: valores do modelo.")
+
+        costs.record(context, 'PIM', 9.5)
+        costs.record(context, 'CPU', 10.0)
+        self.assertEqual(engine.assess_and_decide(context, accesses)[0], 'CPU', "Ganho medido (~5%) abaixo de 30%.")
+
+    def test_12_bandit_policy_respects_min_confidence(self):
+        """
+        Teste: Com a política de bandit, uma confiança abaixo do limiar nunca
+        leva ao PIM; acima dele, um contexto que a regra de ganho mandaria
+        para a CPU é explorado no PIM.
+        """
+        policy = ThompsonPlacementPolicy(seed=0)
+        engine = PredictionEngine(self.mock_ml_model, latency_threshold=0.30, confidence_threshold=0.999,
+                                  decision_cache_size=0, placement_policy=policy)
+        context, accesses = self.tracer.get_context_data()
+
+        self.mock_ml_model.predict.return_value = {
+            'blocks': [0x1080], 'confidence': 0.9980, 'ttid_pim': 80, 'ttid_cpu': 150
+        }
+        self.assertEqual(engine.assess_and_decide(context, accesses), ('CPU', []))
+
+        self.mock_ml_model.predict.return_value = {
+            'blocks': [0x1080], 'confidence': 0.9999, 'ttid_pim': 142.5, 'ttid_cpu': 150
+        }
+        self.assertEqual(engine.assess_and_decide(context, accesses), ('PIM', [0x1080]))
+        self.assertEqual(policy.get_stats()['explorations'], 1)
+
+    @patch('pim_recovery.PIM_UNIT', new_callable=MagicMock)
+    @patch('pim_recovery.CPU_CORE', new_callable=MagicMock)
+    def test_13_threshold_decays_after_clean_executions(self, MockCPU, MockPIM):
+        """
+        Teste: O rigor elevado após um FP é por contexto e volta ao limiar
+        base, nível a nível, após N execuções limpas; uma nova falha antes
+        disso reinicia a contagem e dobra o tempo para relaxar.
+        """
+        engine = PredictionEngine(self.mock_ml_model, confidence_threshold=0.999, decision_cache_size=0,
+                                  confidence_thresholds=AdaptiveConfidenceThreshold(relax_after=5))
+        recovery = PIMRecoveryModule(engine, self.mock_rem_sync)
+        faulty = CONTEXT_REGISTRY.intern("threshold_func", 1)
+        healthy = CONTEXT_REGISTRY.intern("threshold_func", 2)
+
+        recovery.handle_critical_interrupt("PREFETCH_MISMATCH", faulty)
+        self.assertAlmostEqual(engine.threshold_for(faulty), 0.99999, places=12)
+        self.assertEqual(engine.threshold_for(healthy), 0.999)
+
+        for _ in range(4):
+            engine.record_clean_execution(faulty)
+        self.assertAlmostEqual(engine.threshold_for(faulty), 0.99999, places=12, msg="Histerese: ainda não relaxa.")
+        engine.record_clean_execution(faulty)
+        self.assertAlmostEqual(engine.threshold_for(faulty), 0.9999, places=12)
+
+        # Nova falha: volta ao topo e agora precisa de 2 * 5 execuções por nível
+        recovery.handle_critical_interrupt("PREFETCH_MISMATCH", faulty)
+        self.assertAlmostEqual(engine.threshold_for(faulty), 0.999999, places=12)
+        report = engine.get_threshold_report()["threshold_func_1"]
+        self.assertEqual((report['level'], report['clean_required']), (3, 10))
+
+        for _ in range(40):
+            engine.record_clean_execution(faulty)
+        self.assertEqual(engine.threshold_for(faulty), 0.999, "Deve voltar ao limiar base.")
+
+    def test_14_context_table_admission_and_resize(self):
+        """
+        Teste: Com TinyLFU, table[k] via default_factory passa pela admissão
+        (chave fria recebe um valor transitório, fora da tabela, até ficar
+        frequente), e resize() re-mede valores que cresceram no lugar,
+        despejando para respeitar max_bytes.
+        """
+        tiny = ContextTable('tiny_factory', max_entries=2, policy='tinylfu', default_factory=list)
+        for _ in range(5):
+            tiny['hot_a'].append(1)
+            tiny['hot_b'].append(2)
+        tiny['cold'].append(3)
+        self.assertIsNone(tiny.get('cold'), "Chave fria não deve entrar pela factory.")
+        self.assertEqual(tiny.get_stats()['rejections'], 1)
+        self.assertEqual(sorted(tiny.keys()), ['hot_a', 'hot_b'])
+        for _ in range(10):
+            tiny['cold'].append(3)
+        self.assertIn('cold', tiny, "Chave frequente deve ser admitida.")
+        self.assertEqual(len(tiny), 2)
+
+        tracer = RuntimeTracer(table_config={'max_entries': 1, 'policy': 'tinylfu'})
+        tracer.set_context("tiny_tracer", 1)
+        tracer.set_context("tiny_tracer", 2)
+        tracer.log_access(0x1000)
+        self.assertEqual(tracer.get_accesses(tracer.context_id).tolist(), [0x1000])
+
+        grown = ContextTable('grown', max_bytes=2000, default_factory=lambda: np.zeros(0))
+        grown['a'] = np.zeros(100)
+        grown['b'] = np.zeros(100)
+        grown._data['b'] = np.zeros(200)    # Cresceu no lugar (1600 bytes)
+        self.assertEqual(len(grown), 2)
+        grown.resize('b')
+        self.assertEqual(grown.keys(), ['b'])
+        self.assertEqual(grown.get_stats()['bytes'], 1600)
+
+        prefetcher = DeltaCorrelationPrefetcher(table_config={'max_bytes': 1 << 20})
+        prefetcher.observe("tiny_prefetch", [0x1000, 0x1008])
+        before = prefetcher.contexts.get_stats()['bytes']
+        prefetcher.observe("tiny_prefetch", [0x1000 + i * 8 for i in range(2, 40)] + [0x9000, 0x9100])
+        self.assertGreater(prefetcher.contexts.get_stats()['bytes'], before)
+
+    @patch('pim_recovery.PIM_UNIT', new_callable=MagicMock)
+    @patch('pim_recovery.CPU_CORE', new_callable=MagicMock)
+    def test_15_recovery_by_legacy_name_hits_same_handle(self, MockCPU, MockPIM):
+        """
+        Teste: O recovery chamado com o nome legado do contexto ("funcao_escopo")
+        invalida o cache e eleva o limiar do mesmo handle (função, escopo),
+        sem internar um handle novo.
+        """
+        self.mock_ml_model.predict.return_value = {
+            'blocks': [0x1080], 'confidence': 0.9999, 'ttid_pim': 80, 'ttid_cpu': 150
+        }
+        context = CONTEXT_REGISTRY.intern("legacy_func", 3)
+        accesses = [0x1000 + i * 8 for i in range(16)]
+        self.engine.assess_and_decide(context, accesses)
+        registered = len(CONTEXT_REGISTRY)
+
+        self.recovery.handle_critical_interrupt("PREFETCH_MISMATCH", "legacy_func_3")
+
+        self.assertEqual(len(CONTEXT_REGISTRY), registered, "Nome conhecido não deve criar handle.")
+        self.assertEqual(CONTEXT_REGISTRY.resolve("legacy_func_3"), context)
+        self.assertEqual(self.engine.get_cache_stats()['invalidations'], 1)
+        self.assertGreater(self.engine.threshold_for(context), 0.999)
+
+    def test_16_call_sites_do_not_collide_with_tracer_scopes(self):
+        """
+        Teste: O ponto de chamada da API (arquivo, linha) tem handle próprio:
+        não colide com o (função, scope_id) do tracer nem com a mesma linha
+        de outro módulo, e sobrevive ao save/load do modelo.
+        """
+        tracer_handle = RuntimeTracer().set_context("site_kernel", 42)
+        api_handle = CONTEXT_REGISTRY.intern("site_kernel", CallSite("/app/a.py", 42))
+        other_module = CONTEXT_REGISTRY.intern("site_kernel", CallSite("/app/b.py", 42))
+
+        self.assertEqual(len({tracer_handle, api_handle, other_module}), 3)
+        self.assertEqual(CONTEXT_REGISTRY.name_of(api_handle), "site_kernel_a.py:42")
+
+        import os
+        import tempfile
+        model = ALPModel(model_config={'cache_max_size': 0})
+        model.learner.set_prior(api_handle, -2.0)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "modelo.olp")
+            model.save(path)
+            restored = ALPModel(model_config={'cache_max_size': 0})
+            restored.load(path, mmap=False)
+        self.assertAlmostEqual(restored.learner.prior(api_handle), -2.0, places=2)
+        self.assertFalse(restored.learner.prior(tracer_handle))
+
+    def test_17_nested_execution_reports_its_own_prediction(self):
+        """
+        Teste: O TTID medido de um offload é comparado à previsão da própria
+        decisão, mesmo que outra execução (aqui, aninhada na tarefa) decida
+        entre a decisão e o relatório.
+        """
+        ttid_cpu = {}
+        reported = []
+
+        def predict(context_id, accesses):
+            return {'blocks': [], 'confidence': 0.9999, 'ttid_pim': 10,
+                    'ttid_cpu': ttid_cpu[context_id]}
+
+        self.mock_ml_model.predict.side_effect = predict
+        self.mock_ml_model.record_ttid = lambda context_id, ttid_ms, predicted: \
+            reported.append((context_id, predicted))
+        api = OLPCoreAPI(hal_driver=OLPHALDriver(), ml_model=self.mock_ml_model)
+
+        def inner_task(data):
+            return sum(data)
+
+        def outer_task(data):
+            with api.context("inner_kernel", 2):
+                ttid_cpu[api.get_current_context()['context_id']] = 300
+                api.execute_optimized(inner_task, data)
+            return sum(data)
+
+        with api.context("outer_kernel", 1):
+            outer = api.get_current_context()['context_id']
+            ttid_cpu[outer] = 150
+            api.execute_optimized(outer_task, [1, 2, 3])
+
+        self.assertEqual(len(reported), 2)
+        self.assertIn((outer, 150), reported, "Previsão da decisão externa, não a da aninhada.")
 
 if __name__ == '__main__':
     # Esta linha garante que os testes sejam executados com o máximo de detalhes